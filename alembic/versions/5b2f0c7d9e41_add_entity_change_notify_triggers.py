@@ -0,0 +1,45 @@
+"""Add entity change notify triggers
+
+Revision ID: 5b2f0c7d9e41
+Revises: 13eb6d4206b1
+Create Date: 2026-10-18 09:12:00.000000
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "5b2f0c7d9e41"
+down_revision = "13eb6d4206b1"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION notify_entity_change() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify(
+                'entity_change',
+                TG_TABLE_NAME || ':' || (CASE TG_OP WHEN 'DELETE' THEN OLD.id ELSE NEW.id END)::text
+            );
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        "CREATE TRIGGER client_entity_change AFTER UPDATE OR DELETE ON client "
+        "FOR EACH ROW EXECUTE FUNCTION notify_entity_change()"
+    )
+    op.execute(
+        "CREATE TRIGGER network_entity_change AFTER UPDATE OR DELETE ON network "
+        "FOR EACH ROW EXECUTE FUNCTION notify_entity_change()"
+    )
+
+
+def downgrade():
+    op.execute("DROP TRIGGER IF EXISTS network_entity_change ON network")
+    op.execute("DROP TRIGGER IF EXISTS client_entity_change ON client")
+    op.execute("DROP FUNCTION IF EXISTS notify_entity_change()")
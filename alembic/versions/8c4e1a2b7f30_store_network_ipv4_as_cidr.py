@@ -0,0 +1,60 @@
+"""Store network ipv4 as cidr
+
+Revision ID: 8c4e1a2b7f30
+Revises: 5b2f0c7d9e41
+Create Date: 2026-10-18 11:40:00.000000
+
+"""
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "8c4e1a2b7f30"
+down_revision = "5b2f0c7d9e41"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Fails on rows that are not valid IPv4 networks (or have host bits set); fix those first
+    op.alter_column(
+        "network",
+        "ipv4",
+        type_=postgresql.CIDR(),
+        existing_type=sa.String(length=18),
+        existing_nullable=True,
+        postgresql_using="ipv4::cidr",
+    )
+    op.create_index(
+        "ix_network_ipv4_gist",
+        "network",
+        ["ipv4"],
+        postgresql_using="gist",
+        postgresql_ops={"ipv4": "inet_ops"},
+    )
+    # Inserts are published too so that every worker can add new networks to its lookup index
+    op.execute("DROP TRIGGER network_entity_change ON network")
+    op.execute(
+        "CREATE TRIGGER network_entity_change AFTER INSERT OR UPDATE OR DELETE ON network "
+        "FOR EACH ROW EXECUTE FUNCTION notify_entity_change()"
+    )
+
+
+def downgrade():
+    op.execute("DROP TRIGGER network_entity_change ON network")
+    op.execute(
+        "CREATE TRIGGER network_entity_change AFTER UPDATE OR DELETE ON network "
+        "FOR EACH ROW EXECUTE FUNCTION notify_entity_change()"
+    )
+    op.drop_index("ix_network_ipv4_gist", table_name="network")
+    op.alter_column(
+        "network",
+        "ipv4",
+        type_=sa.String(length=18),
+        existing_type=postgresql.CIDR(),
+        existing_nullable=True,
+        postgresql_using="ipv4::text",
+    )
@@ -0,0 +1,50 @@
+"""Cascade client_network links and index network_id
+
+Revision ID: a3d9e5f12c68
+Revises: 8c4e1a2b7f30
+Create Date: 2026-10-18 14:05:00.000000
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "a3d9e5f12c68"
+down_revision = "8c4e1a2b7f30"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The initial migration created the foreign keys without the ON DELETE CASCADE of the model
+    op.drop_constraint("client_network_client_id_fkey", "client_network", type_="foreignkey")
+    op.drop_constraint("client_network_network_id_fkey", "client_network", type_="foreignkey")
+    op.create_foreign_key(
+        "client_network_client_id_fkey",
+        "client_network",
+        "client",
+        ["client_id"],
+        ["id"],
+        ondelete="CASCADE",
+    )
+    op.create_foreign_key(
+        "client_network_network_id_fkey",
+        "client_network",
+        "network",
+        ["network_id"],
+        ["id"],
+        ondelete="CASCADE",
+    )
+    op.create_index("ix_client_network_network_id", "client_network", ["network_id"])
+
+
+def downgrade():
+    op.drop_index("ix_client_network_network_id", table_name="client_network")
+    op.drop_constraint("client_network_network_id_fkey", "client_network", type_="foreignkey")
+    op.drop_constraint("client_network_client_id_fkey", "client_network", type_="foreignkey")
+    op.create_foreign_key(
+        "client_network_client_id_fkey", "client_network", "client", ["client_id"], ["id"]
+    )
+    op.create_foreign_key(
+        "client_network_network_id_fkey", "client_network", "network", ["network_id"], ["id"]
+    )
@@ -0,0 +1,87 @@
+"""Add change outbox table and triggers for the change feed
+
+Revision ID: b8e3f1a7c5d2
+Revises: f2b6d8e0a4c7
+Create Date: 2026-10-18 21:10:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "b8e3f1a7c5d2"
+down_revision = "f2b6d8e0a4c7"
+branch_labels = None
+depends_on = None
+
+TABLES = ("client", "network", "client_network")
+TRIGGERS = (
+    ("insert", "NEW TABLE AS new_rows"),
+    ("update", "NEW TABLE AS new_rows"),
+    ("delete", "OLD TABLE AS old_rows"),
+)
+
+
+def upgrade():
+    op.create_table(
+        "change",
+        sa.Column("id", sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column("xid", sa.BigInteger(), nullable=False),
+        sa.Column("table_name", sa.Text(), nullable=False),
+        sa.Column("op", sa.Text(), nullable=False),
+        sa.Column("entity_id", sa.Text(), nullable=False),
+        sa.Column("data", postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column(
+            "changed_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_change_xid_id", "change", ["xid", "id"], unique=False)
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION record_changes() RETURNS trigger AS $$
+        DECLARE
+            recorded integer;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                INSERT INTO change (xid, table_name, op, entity_id, data)
+                SELECT
+                    pg_current_xact_id()::text::bigint, TG_TABLE_NAME, 'delete', o.id::text,
+                    to_jsonb(o)
+                FROM old_rows o;
+            ELSE
+                INSERT INTO change (xid, table_name, op, entity_id, data)
+                SELECT
+                    pg_current_xact_id()::text::bigint, TG_TABLE_NAME, lower(TG_OP), n.id::text,
+                    to_jsonb(n)
+                FROM new_rows n;
+            END IF;
+            GET DIAGNOSTICS recorded = ROW_COUNT;
+            IF recorded > 0 THEN
+                PERFORM pg_notify('change_feed', '');
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    for table in TABLES:
+        for operation, transition in TRIGGERS:
+            op.execute(
+                f"CREATE TRIGGER {table}_record_{operation} AFTER {operation.upper()} ON {table} "
+                f"REFERENCING {transition} FOR EACH STATEMENT EXECUTE FUNCTION record_changes()"
+            )
+
+
+def downgrade():
+    for table in reversed(TABLES):
+        for operation, _ in TRIGGERS:
+            op.execute(f"DROP TRIGGER IF EXISTS {table}_record_{operation} ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS record_changes()")
+    op.drop_index("ix_change_xid_id", table_name="change")
+    op.drop_table("change")
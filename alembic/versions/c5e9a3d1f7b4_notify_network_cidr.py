@@ -0,0 +1,61 @@
+"""Carry the cidr of inserted and updated networks in entity notifications
+
+Revision ID: c5e9a3d1f7b4
+Revises: b8e3f1a7c5d2
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "c5e9a3d1f7b4"
+down_revision = "b8e3f1a7c5d2"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION notify_entity_change() RETURNS trigger AS $$
+        DECLARE
+            payload text;
+        BEGIN
+            -- Bulk loads send a single reset instead of one notification per row
+            IF current_setting('app.suppress_notify', true) = 'on' THEN
+                RETURN NULL;
+            END IF;
+            IF TG_OP = 'DELETE' THEN
+                payload := TG_TABLE_NAME || ':' || OLD.id::text;
+            ELSIF TG_TABLE_NAME = 'network' THEN
+                payload := 'network:' || NEW.id::text || ':' || coalesce(NEW.ipv4::text, '');
+            ELSE
+                payload := TG_TABLE_NAME || ':' || NEW.id::text;
+            END IF;
+            PERFORM pg_notify('entity_change', payload);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+
+
+def downgrade():
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION notify_entity_change() RETURNS trigger AS $$
+        BEGIN
+            -- Bulk loads send a single reset instead of one notification per row
+            IF current_setting('app.suppress_notify', true) = 'on' THEN
+                RETURN NULL;
+            END IF;
+            PERFORM pg_notify(
+                'entity_change',
+                TG_TABLE_NAME || ':' || (CASE TG_OP WHEN 'DELETE' THEN OLD.id ELSE NEW.id END)::text
+            );
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
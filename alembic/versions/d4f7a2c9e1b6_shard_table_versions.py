@@ -0,0 +1,97 @@
+"""Shard the per-table write counters and skip statements that change no rows
+
+Revision ID: d4f7a2c9e1b6
+Revises: c5e9a3d1f7b4
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "d4f7a2c9e1b6"
+down_revision = "c5e9a3d1f7b4"
+branch_labels = None
+depends_on = None
+
+TABLES = ("client", "network")
+OPERATIONS = (
+    ("INSERT", "NEW TABLE AS new_rows"),
+    ("UPDATE", "NEW TABLE AS new_rows"),
+    ("DELETE", "OLD TABLE AS old_rows"),
+)
+
+
+def upgrade():
+    for table in TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_table_version ON {table}")
+    op.add_column(
+        "table_version",
+        sa.Column("shard", sa.SmallInteger(), server_default=sa.text("0"), nullable=False),
+    )
+    op.alter_column("table_version", "shard", server_default=None)
+    op.drop_constraint("table_version_pkey", "table_version", type_="primary")
+    op.create_primary_key("table_version_pkey", "table_version", ["table_name", "shard"])
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                PERFORM FROM old_rows LIMIT 1;
+            ELSE
+                PERFORM FROM new_rows LIMIT 1;
+            END IF;
+            IF NOT FOUND THEN
+                RETURN NULL;
+            END IF;
+            INSERT INTO table_version (table_name, shard, version)
+            VALUES (TG_TABLE_NAME, pg_backend_pid() % 16, 1)
+            ON CONFLICT (table_name, shard) DO UPDATE SET version = table_version.version + 1;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    for table in TABLES:
+        for operation, transition in OPERATIONS:
+            op.execute(
+                f"CREATE TRIGGER {table}_version_{operation.lower()} "
+                f"AFTER {operation} ON {table} REFERENCING {transition} "
+                "FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version()"
+            )
+
+
+def downgrade():
+    for table in TABLES:
+        for operation, _ in OPERATIONS:
+            op.execute(f"DROP TRIGGER IF EXISTS {table}_version_{operation.lower()} ON {table}")
+    # Fold the shards back into one row per table; the sums keep growing from where they were
+    op.execute(
+        """
+        WITH folded AS (
+            DELETE FROM table_version RETURNING table_name, version
+        )
+        INSERT INTO table_version (table_name, shard, version)
+        SELECT table_name, 0, sum(version) FROM folded GROUP BY table_name
+        """
+    )
+    op.drop_constraint("table_version_pkey", "table_version", type_="primary")
+    op.drop_column("table_version", "shard")
+    op.create_primary_key("table_version_pkey", "table_version", ["table_name"])
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO table_version (table_name, version) VALUES (TG_TABLE_NAME, 1)
+            ON CONFLICT (table_name) DO UPDATE SET version = table_version.version + 1;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    for table in TABLES:
+        op.execute(
+            f"CREATE TRIGGER {table}_table_version AFTER INSERT OR UPDATE OR DELETE ON {table} "
+            "FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version()"
+        )
@@ -0,0 +1,38 @@
+"""Add client name search indexes
+
+Revision ID: d7f1b9c3a5e2
+Revises: a3d9e5f12c68
+Create Date: 2026-10-18 16:40:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "d7f1b9c3a5e2"
+down_revision = "a3d9e5f12c68"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        "ix_client_name_prefix",
+        "client",
+        [sa.text("lower(name) text_pattern_ops")],
+    )
+    op.create_index(
+        "ix_client_name_trgm",
+        "client",
+        ["name"],
+        postgresql_using="gin",
+        postgresql_ops={"name": "gin_trgm_ops"},
+    )
+
+
+def downgrade():
+    op.drop_index("ix_client_name_trgm", table_name="client")
+    op.drop_index("ix_client_name_prefix", table_name="client")
+    # The extension is left installed: other objects may depend on it
@@ -0,0 +1,51 @@
+"""Allow bulk loads to suppress per-row entity notifications
+
+Revision ID: e4a8c2d6f913
+Revises: d7f1b9c3a5e2
+Create Date: 2026-10-18 18:20:00.000000
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "e4a8c2d6f913"
+down_revision = "d7f1b9c3a5e2"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION notify_entity_change() RETURNS trigger AS $$
+        BEGIN
+            -- Bulk loads send a single reset instead of one notification per row
+            IF current_setting('app.suppress_notify', true) = 'on' THEN
+                RETURN NULL;
+            END IF;
+            PERFORM pg_notify(
+                'entity_change',
+                TG_TABLE_NAME || ':' || (CASE TG_OP WHEN 'DELETE' THEN OLD.id ELSE NEW.id END)::text
+            );
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+
+
+def downgrade():
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION notify_entity_change() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify(
+                'entity_change',
+                TG_TABLE_NAME || ':' || (CASE TG_OP WHEN 'DELETE' THEN OLD.id ELSE NEW.id END)::text
+            );
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
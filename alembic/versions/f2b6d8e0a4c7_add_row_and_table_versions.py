@@ -0,0 +1,55 @@
+"""Add row versions and per-table write counters for ETags
+
+Revision ID: f2b6d8e0a4c7
+Revises: e4a8c2d6f913
+Create Date: 2026-10-18 20:05:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "f2b6d8e0a4c7"
+down_revision = "e4a8c2d6f913"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ("client", "network"):
+        op.add_column(
+            table,
+            sa.Column("version", sa.Integer(), server_default=sa.text("1"), nullable=False),
+        )
+    op.create_table(
+        "table_version",
+        sa.Column("table_name", sa.Text(), nullable=False),
+        sa.Column("version", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("table_name"),
+    )
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO table_version (table_name, version) VALUES (TG_TABLE_NAME, 1)
+            ON CONFLICT (table_name) DO UPDATE SET version = table_version.version + 1;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    for table in ("client", "network"):
+        op.execute(
+            f"CREATE TRIGGER {table}_table_version AFTER INSERT OR UPDATE OR DELETE ON {table} "
+            "FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version()"
+        )
+
+
+def downgrade():
+    for table in ("network", "client"):
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_table_version ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS bump_table_version()")
+    op.drop_table("table_version")
+    op.drop_column("network", "version")
+    op.drop_column("client", "version")
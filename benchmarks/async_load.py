@@ -0,0 +1,99 @@
+"""Compare throughput and latency of the sync and async (DB_ASYNC) route handlers.
+
+Starts the API under uvicorn once per mode against the database at DATABASE_URL, drives
+concurrent GET /clients/{id} and GET /clients/ requests for a fixed duration and prints
+requests per second with p50/p99 latency.
+
+    PYTHONPATH=. uv run python benchmarks/async_load.py --concurrency 200 --duration 20
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+PORT = 8765
+BASE_URL = f"http://127.0.0.1:{PORT}"
+
+
+async def wait_until_healthy(client: httpx.AsyncClient) -> None:
+    for _ in range(100):
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+async def drive(client: httpx.AsyncClient, ids: list, concurrency: int, duration: float) -> list:
+    latencies = []
+    deadline = time.perf_counter() + duration
+
+    async def worker() -> None:
+        while time.perf_counter() < deadline:
+            if random.random() < 0.8:
+                path = f"/clients/{random.choice(ids)}"
+            else:
+                path = "/clients/?limit=50"
+            start = time.perf_counter()
+            response = await client.get(path)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies
+
+
+async def run_mode(async_db: bool, args: argparse.Namespace) -> None:
+    env = dict(os.environ, DB_ASYNC="true" if async_db else "false")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "copilot_integration_example.api:app",
+         "--port", str(PORT), "--log-level", "warning"],
+        env=env,
+    )
+    limits = httpx.Limits(max_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=BASE_URL, limits=limits, timeout=60) as client:
+            await wait_until_healthy(client)
+            ids = []
+            for i in range(args.clients):
+                response = await client.post("/clients/", json={"name": f"load-{async_db}-{i}"})
+                ids.append(response.json()["id"])
+            await drive(client, ids, args.concurrency, 2)  # warm up pools
+            latencies = await drive(client, ids, args.concurrency, args.duration)
+            for client_id in ids:
+                await client.delete(f"/clients/{client_id}")
+    finally:
+        server.terminate()
+        server.wait()
+
+    latencies.sort()
+    print(
+        f"{'async' if async_db else 'sync':>6} {len(latencies) / args.duration:>10.0f} "
+        f"{statistics.median(latencies) * 1000:>8.1f} "
+        f"{latencies[int(len(latencies) * 0.99)] * 1000:>8.1f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--clients", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'mode':>6} {'req/s':>10} {'p50 ms':>8} {'p99 ms':>8}")
+    for async_db in (False, True):
+        asyncio.run(run_mode(async_db, args))
+
+
+if __name__ == "__main__":
+    main()
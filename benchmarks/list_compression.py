@@ -0,0 +1,75 @@
+"""Measure bytes on the wire and CPU time of client list pages by fieldset and encoding.
+
+Seeds the client table of the database at DATABASE_URL, then requests ``GET /clients/?limit=N``
+in-process with all fields and with ``fields=id``, each uncompressed, gzip and brotli. Prints the
+response size as sent and the median CPU time per request (this process runs both client and
+server, so the client's share is the same in every row; the body is read raw, not decompressed).
+Removes the seeded clients again.
+
+    PYTHONPATH=. uv run python benchmarks/list_compression.py --limit 1000
+"""
+
+import argparse
+import statistics
+import time
+
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from copilot_integration_example.api import app
+from copilot_integration_example.database import SessionLocal
+
+NAME_PREFIX = "compression-bench-"
+FIELDSETS = ((None, "all"), ("id", "id"))
+ENCODINGS = ("identity", "gzip", "br")
+
+
+def measure(client: TestClient, limit: int, fields, encoding: str, repeat: int):
+    params = {"limit": limit}
+    if fields is not None:
+        params["fields"] = fields
+    samples = []
+    for _ in range(repeat):
+        start = time.process_time()
+        headers = {"Accept-Encoding": encoding}
+        with client.stream("GET", "/clients/", params=params, headers=headers) as response:
+            size = len(b"".join(response.iter_raw()))
+        samples.append((time.process_time() - start) * 1000)
+        assert response.status_code == 200
+    return size, statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--limit", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        db.execute(
+            text(
+                "INSERT INTO client (id, name) "
+                "SELECT gen_random_uuid(), :prefix || g || ' ' || md5(g::text) "
+                "FROM generate_series(1, :rows) AS g"
+            ),
+            {"prefix": NAME_PREFIX, "rows": args.limit},
+        )
+        db.commit()
+    try:
+        client = TestClient(app)
+        measure(client, args.limit, None, "identity", 1)  # fill the connection pool
+        print(f"{'fields':>6} {'encoding':>9} {'bytes':>9} {'cpu ms':>8}")
+        for fields, label in FIELDSETS:
+            for encoding in ENCODINGS:
+                size, cpu_ms = measure(client, args.limit, fields, encoding, args.repeat)
+                print(f"{label:>6} {encoding:>9} {size:>9} {cpu_ms:>8.2f}")
+    finally:
+        with SessionLocal() as db:
+            db.execute(
+                text("DELETE FROM client WHERE name LIKE :prefix"), {"prefix": f"{NAME_PREFIX}%"}
+            )
+            db.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Compare list page latency of ORM + response_model serialization with the plain-row fast path.
+
+Seeds the network table of the database at DATABASE_URL with synthetic /32 prefixes, then
+requests ``GET /networks/?limit=N`` in-process from two apps: one with the previous handler
+(ORM entities validated against ``List[schemas.Network]``) and the real app, which serializes
+Core rows with a precompiled TypeAdapter. Prints the median latency of each per page size and
+removes the seeded rows again.
+
+    PYTHONPATH=. uv run python benchmarks/list_serialization.py --rows 20000
+"""
+
+import argparse
+import statistics
+import time
+from typing import List
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from copilot_integration_example import models, schemas
+from copilot_integration_example.api import app
+from copilot_integration_example.database import SessionLocal, get_db
+
+# Carrier-grade NAT space, as in pagination.py
+SEED_PREFIX = "100.64.0.0/10"
+PAGE_SIZES = (100, 1000, 10000)
+
+
+def orm_app() -> FastAPI:
+    legacy = FastAPI()
+
+    @legacy.get("/networks/", response_model=List[schemas.Network])
+    def read_networks(limit: int = 100, db: Session = Depends(get_db)):
+        return db.query(models.Network).order_by(models.Network.id).limit(limit).all()
+
+    return legacy
+
+
+def time_ms(client: TestClient, limit: int, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get("/networks/", params={"limit": limit})
+        samples.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200 and len(response.json()) == limit
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=max(PAGE_SIZES))
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        db.execute(
+            text(
+                "INSERT INTO network (ipv4) "
+                "SELECT set_masklen(CAST(:prefix AS inet) + g, 32)::cidr "
+                "FROM generate_series(0, :rows - 1) AS g ON CONFLICT DO NOTHING"
+            ),
+            {"prefix": SEED_PREFIX, "rows": args.rows},
+        )
+        db.commit()
+    try:
+        before, after = TestClient(orm_app()), TestClient(app)
+        print(f"{'rows':>8} {'orm ms':>10} {'fast ms':>10} {'speedup':>8}")
+        for limit in PAGE_SIZES:
+            if limit > args.rows:
+                break
+            # One untimed round each to fill the connection pools
+            time_ms(before, limit, 1)
+            time_ms(after, limit, 1)
+            orm_ms = time_ms(before, limit, args.repeat)
+            fast_ms = time_ms(after, limit, args.repeat)
+            print(f"{limit:>8} {orm_ms:>10.2f} {fast_ms:>10.2f} {orm_ms / fast_ms:>7.1f}x")
+    finally:
+        with SessionLocal() as db:
+            db.execute(text("DELETE FROM network WHERE ipv4 <<= :prefix"), {"prefix": SEED_PREFIX})
+            db.commit()
+
+
+if __name__ == "__main__":
+    main()
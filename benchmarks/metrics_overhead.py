@@ -0,0 +1,77 @@
+"""Measure the per-request cost of the route metrics instrumentation.
+
+Calls a minimal FastAPI app directly through ASGI, without a server or database, once as is
+and once with ``instrument_routes`` applied, and prints the time per request of each.
+
+    PYTHONPATH=. uv run python benchmarks/metrics_overhead.py --requests 50000
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from fastapi import FastAPI
+
+from copilot_integration_example.metrics import instrument_routes
+
+
+def make_app(instrumented: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def read_item(item_id: int):
+        return {"id": item_id}
+
+    if instrumented:
+        instrument_routes(app)
+    return app
+
+
+async def run(app: FastAPI, requests: int) -> float:
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for i in range(requests):
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": f"/items/{i}",
+            "raw_path": f"/items/{i}".encode(),
+            "root_path": "",
+            "query_string": b"",
+            "headers": [],
+            "server": ("testserver", 80),
+        }
+        await app(scope, receive, send)
+    return (time.perf_counter() - start) / requests
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    results = {}
+    for instrumented in (False, True):
+        app = make_app(instrumented)
+        asyncio.run(run(app, 1000))  # warm up
+        results[instrumented] = statistics.median(
+            asyncio.run(run(app, args.requests)) for _ in range(args.rounds)
+        )
+    overhead = results[True] - results[False]
+    print(f"plain:        {results[False] * 1e6:8.1f} us/request")
+    print(f"instrumented: {results[True] * 1e6:8.1f} us/request")
+    print(f"overhead:     {overhead * 1e6:8.1f} us/request ({overhead / results[False]:.1%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Time overlap detection and aggregation over the networks table.
+
+Inserts random IPv4 prefixes (lengths /16 to /32) into the database at DATABASE_URL, then times
+loading them into arrays, finding the networks inside wider ones and aggregating them into the
+fewest covering prefixes. For comparison, aggregation is also timed with the standard library's
+``ipaddress.collapse_addresses``. The inserted networks and their change feed entries are removed
+afterwards.
+
+    PYTHONPATH=. uv run python benchmarks/network_analysis.py --prefixes 1000000
+"""
+
+import argparse
+import time
+from ipaddress import IPv4Network, collapse_addresses
+
+from sqlalchemy import text
+
+from copilot_integration_example import crud
+from copilot_integration_example.database import SessionLocal
+from copilot_integration_example.network_analysis import aggregate, find_overlaps, load_prefixes
+
+INSERT_PREFIXES = text(
+    """
+    INSERT INTO network (ipv4)
+    SELECT network(
+        set_masklen('0.0.0.0'::inet + (random() * 4294967295)::bigint, 16 + (random() * 16)::int)
+    )
+    FROM generate_series(1, :count)
+    ON CONFLICT DO NOTHING
+    """
+)
+
+
+def timed(label: str, function):
+    start = time.perf_counter()
+    result = function()
+    print(f"{label:<28} {time.perf_counter() - start:>8.2f}s")
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--prefixes", type=int, default=1000000)
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        last_network = db.execute(text("SELECT coalesce(max(id), 0) FROM network")).scalar()
+        last_change = db.execute(text("SELECT coalesce(max(id), 0) FROM change")).scalar()
+        db.execute(INSERT_PREFIXES, {"count": args.prefixes})
+        db.commit()
+        try:
+            prefixes = timed("load", lambda: load_prefixes(crud.get_network_prefixes(db)))
+            db.rollback()
+            print(f"{len(prefixes.ids)} networks")
+            covered, _ = timed("overlaps", lambda: find_overlaps(prefixes))
+            print(f"{len(covered)} networks inside wider ones")
+            starts, _, _ = timed("aggregate", lambda: aggregate(prefixes))
+            print(f"{len(starts)} aggregate prefixes")
+
+            statement = text("SELECT ipv4 FROM network WHERE ipv4 IS NOT NULL")
+            rows = db.execute(statement).scalars().all()
+            db.rollback()
+            timed("collapse_addresses", lambda: list(collapse_addresses(map(IPv4Network, rows))))
+        finally:
+            db.execute(text("DELETE FROM network WHERE id > :id"), {"id": last_network})
+            db.execute(text("DELETE FROM change WHERE id > :id"), {"id": last_change})
+            db.commit()
+
+
+if __name__ == "__main__":
+    main()
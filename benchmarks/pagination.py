@@ -0,0 +1,91 @@
+"""Compare OFFSET and keyset page latency as the page number grows.
+
+Seeds the network table of the database at DATABASE_URL with synthetic /32 prefixes,
+times ``crud.get_networks`` at increasing page depths in both modes and removes the
+seeded rows again.
+
+    PYTHONPATH=. uv run python benchmarks/pagination.py --rows 1000000
+"""
+
+import argparse
+import statistics
+import time
+
+from sqlalchemy import text
+
+from copilot_integration_example import crud
+from copilot_integration_example.database import SessionLocal
+
+# Carrier-grade NAT space, large enough for four million distinct /32 seed rows.
+SEED_PREFIX = "100.64.0.0/10"
+
+
+def seed(db, rows: int) -> None:
+    db.execute(
+        text(
+            "INSERT INTO network (ipv4) "
+            "SELECT set_masklen(CAST(:prefix AS inet) + g, 32)::cidr "
+            "FROM generate_series(0, :rows - 1) AS g ON CONFLICT DO NOTHING"
+        ),
+        {"prefix": SEED_PREFIX, "rows": rows},
+    )
+    db.execute(text("ANALYZE network"))
+    db.commit()
+
+
+def cleanup(db) -> None:
+    db.execute(
+        text("DELETE FROM network WHERE ipv4 <<= :prefix"), {"prefix": SEED_PREFIX}
+    )
+    db.commit()
+
+
+def time_ms(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        seed(db, args.rows)
+        print(f"{'page':>8} {'offset ms':>10} {'keyset ms':>10}")
+        page = 1
+        while page * args.limit <= args.rows:
+            skip = (page - 1) * args.limit
+            # The keyset cursor for a page is the last id of the previous one; look it up untimed.
+            after = None
+            if skip:
+                after = db.execute(
+                    text("SELECT id FROM network ORDER BY id OFFSET :skip LIMIT 1"),
+                    {"skip": skip - 1},
+                ).scalar_one()
+            offset_ms = time_ms(
+                lambda skip=skip: crud.get_networks(db, skip=skip, limit=args.limit),
+                args.repeat,
+            )
+            keyset_ms = time_ms(
+                lambda after=after: crud.get_networks(db, limit=args.limit, after=after),
+                args.repeat,
+            )
+            db.expunge_all()
+            print(f"{page:>8} {offset_ms:>10.2f} {keyset_ms:>10.2f}")
+            page *= 10
+    finally:
+        db.rollback()
+        cleanup(db)
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Time longest-prefix lookups in the in-memory network index.
+
+Loads random IPv4 prefixes (lengths /8 to /32) into a ``PrefixIndex`` without touching the
+database and reports the per-lookup latency for random addresses.
+
+    PYTHONPATH=. uv run python benchmarks/prefix_lookup.py --prefixes 1000000
+"""
+
+import argparse
+import random
+import statistics
+import time
+from ipaddress import IPv4Address, IPv4Network
+
+from copilot_integration_example.prefix_index import PrefixIndex
+
+
+def random_prefixes(count: int):
+    seen = set()
+    while len(seen) < count:
+        length = random.randint(8, 32)
+        network = IPv4Network((random.getrandbits(32), length), strict=False)
+        seen.add(str(network))
+    return list(enumerate(seen, start=1))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--prefixes", type=int, default=1000000)
+    parser.add_argument("--lookups", type=int, default=200000)
+    args = parser.parse_args()
+
+    rows = random_prefixes(args.prefixes)
+    index = PrefixIndex()
+    start = time.perf_counter()
+    index.ensure_loaded(lambda: rows)
+    print(f"loaded {len(index)} prefixes in {time.perf_counter() - start:.1f}s")
+
+    addresses = [IPv4Address(random.getrandbits(32)) for _ in range(args.lookups)]
+    samples = []
+    for _ in range(5):
+        start = time.perf_counter()
+        for address in addresses:
+            index.lookup(address)
+        samples.append((time.perf_counter() - start) / len(addresses))
+    print(f"lookup: {statistics.median(samples) * 1e6:.2f} us median over {len(samples)} runs")
+
+
+if __name__ == "__main__":
+    main()
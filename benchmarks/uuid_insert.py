@@ -0,0 +1,78 @@
+"""Compare insert throughput and index growth of uuid4 and UUIDv7 primary keys.
+
+Creates one scratch table per id kind in the database at DATABASE_URL and COPYs ``--rows`` rows
+into each in batches, reporting rows per second per reporting interval, the final size of the
+primary key index and the WAL written. The tables are dropped afterwards. The difference shows
+once the index outgrows shared_buffers, so use tens of millions of rows.
+
+    PYTHONPATH=. uv run python benchmarks/uuid_insert.py --rows 20000000
+"""
+
+import argparse
+import io
+import time
+import uuid
+
+from sqlalchemy import text
+
+from copilot_integration_example.database import engine
+from copilot_integration_example.ids import uuid7
+
+KINDS = {"uuid4": uuid.uuid4, "uuid7": uuid7}
+
+
+def run(kind: str, rows: int, batch: int, report_every: int) -> None:
+    table = f"uuid_bench_{kind}"
+    make_id = KINDS[kind]
+    with engine.begin() as connection:
+        connection.execute(text(f"DROP TABLE IF EXISTS {table}"))
+        connection.execute(text(f"CREATE TABLE {table} (id uuid PRIMARY KEY, name text NOT NULL)"))
+        wal_start = connection.execute(text("SELECT pg_current_wal_lsn()")).scalar()
+
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        inserted = 0
+        start = interval_start = time.perf_counter()
+        while inserted < rows:
+            count = min(batch, rows - inserted)
+            lines = (f"{make_id()}\tbench {inserted + i}\n" for i in range(count))
+            buffer = io.StringIO("".join(lines))
+            cursor.copy_expert(f"COPY {table} (id, name) FROM STDIN", buffer)
+            raw.commit()
+            inserted += count
+            if inserted % report_every < batch or inserted == rows:
+                now = time.perf_counter()
+                rate = report_every / (now - interval_start)
+                print(f"{kind} {inserted:>12,} rows {rate:>12,.0f} rows/s")
+                interval_start = now
+        elapsed = time.perf_counter() - start
+    finally:
+        raw.close()
+
+    with engine.begin() as connection:
+        index_size = connection.execute(text(f"SELECT pg_relation_size('{table}_pkey')")).scalar()
+        wal = connection.execute(
+            text("SELECT pg_wal_lsn_diff(pg_current_wal_lsn(), CAST(:start AS pg_lsn))"),
+            {"start": wal_start},
+        ).scalar()
+        connection.execute(text(f"DROP TABLE {table}"))
+    print(
+        f"{kind}: {rows / elapsed:,.0f} rows/s overall, "
+        f"pkey {index_size / 2**20:,.0f} MiB, WAL {float(wal) / 2**20:,.0f} MiB"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000000)
+    parser.add_argument("--batch", type=int, default=50000)
+    parser.add_argument("--report-every", type=int, default=1000000)
+    args = parser.parse_args()
+
+    for kind in KINDS:
+        run(kind, args.rows, args.batch, args.report_every)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Compare create throughput and latency with and without write coalescing.
+
+Starts the API under uvicorn against the database at DATABASE_URL once per combination of
+handler mode (sync, DB_ASYNC) and WRITE_COALESCE_WINDOW_MS (0 commits every create on its own),
+drives concurrent POST /clients/ requests with unique names for a fixed duration and prints
+creates per second with p50/p99 latency. The created clients are removed afterwards.
+
+    PYTHONPATH=. uv run python benchmarks/write_coalescing.py --concurrency 200 --duration 20
+"""
+
+import argparse
+import asyncio
+import itertools
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+from sqlalchemy import text
+
+from copilot_integration_example.database import SessionLocal
+
+PORT = 8766
+BASE_URL = f"http://127.0.0.1:{PORT}"
+NAME_PREFIX = "coalesce-bench-"
+
+
+async def wait_until_healthy(client: httpx.AsyncClient) -> None:
+    for _ in range(100):
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+async def drive(
+    client: httpx.AsyncClient, names: itertools.count, concurrency: int, duration: float
+) -> list:
+    latencies = []
+    deadline = time.perf_counter() + duration
+
+    async def worker() -> None:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = await client.post("/clients/", json={"name": f"{NAME_PREFIX}{next(names)}"})
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies
+
+
+def remove_created() -> None:
+    with SessionLocal() as db:
+        db.execute(
+            text("DELETE FROM client WHERE name LIKE :prefix"), {"prefix": f"{NAME_PREFIX}%"}
+        )
+        db.commit()
+
+
+async def run_mode(async_db: bool, window_ms: float, args: argparse.Namespace) -> None:
+    env = dict(
+        os.environ,
+        DB_ASYNC="true" if async_db else "false",
+        WRITE_COALESCE_WINDOW_MS=str(window_ms),
+        WRITE_COALESCE_MAX_BATCH=str(args.max_batch),
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "copilot_integration_example.api:app",
+         "--port", str(PORT), "--log-level", "warning"],
+        env=env,
+    )
+    names = itertools.count()
+    limits = httpx.Limits(max_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=BASE_URL, limits=limits, timeout=60) as client:
+            await wait_until_healthy(client)
+            await drive(client, names, args.concurrency, 2)  # warm up pools
+            latencies = await drive(client, names, args.concurrency, args.duration)
+    finally:
+        server.terminate()
+        server.wait()
+        remove_created()
+
+    latencies.sort()
+    print(
+        f"{'async' if async_db else 'sync':>6} {window_ms:>10g} "
+        f"{len(latencies) / args.duration:>10.0f} "
+        f"{statistics.median(latencies) * 1000:>8.1f} "
+        f"{latencies[int(len(latencies) * 0.99)] * 1000:>8.1f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--window-ms", type=float, default=2)
+    parser.add_argument("--max-batch", type=int, default=100)
+    args = parser.parse_args()
+
+    # Left behind by an interrupted run, the names would collide
+    remove_created()
+    print(f"{'mode':>6} {'window ms':>10} {'creates/s':>10} {'p50 ms':>8} {'p99 ms':>8}")
+    for async_db in (False, True):
+        for window_ms in (0, args.window_ms):
+            asyncio.run(run_mode(async_db, window_ms, args))
+
+
+if __name__ == "__main__":
+    main()
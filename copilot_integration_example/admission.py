@@ -0,0 +1,171 @@
+import asyncio
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from typing import DefaultDict, Deque, Dict, Optional, Tuple
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .database import DB_MAX_OVERFLOW, DB_POOL_SIZE
+from .metrics import Histogram
+from .replica import SAFE_METHODS
+
+
+def default_limits(connections: int, routers: int) -> Tuple[int, int]:
+    # Read and write limit of each router: the connections are split evenly between the routers,
+    # two to one between reads and writes, and every budget admits at least one request
+    share = connections // routers
+    read = max(1, share * 2 // 3)
+    return read, max(1, share - read)
+
+
+# Routers whose requests are admitted against a read and a write budget, by first path segment
+ADMISSION_ROUTERS = ("clients", "networks")
+# An admitted sync handler holds a pooled connection, so by default the budgets of all routers
+# together admit no more requests than the worker's pool can serve at once
+_READ_DEFAULT, _WRITE_DEFAULT = default_limits(
+    DB_POOL_SIZE + DB_MAX_OVERFLOW, len(ADMISSION_ROUTERS)
+)
+ADMISSION_READ_LIMIT = int(os.getenv("ADMISSION_READ_LIMIT", str(_READ_DEFAULT)))
+ADMISSION_WRITE_LIMIT = int(os.getenv("ADMISSION_WRITE_LIMIT", str(_WRITE_DEFAULT)))
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "50"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "1"))
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+
+# Reasons a request is turned away
+QUEUE_FULL = "queue_full"
+QUEUE_TIMEOUT = "queue_timeout"
+
+
+class Budget:
+    """Concurrency limit for one kind of request, with a bounded FIFO queue in front of it.
+
+    A request that finds `limit` requests in flight waits in the queue for at most
+    `queue_timeout` seconds; one that finds the queue full is rejected at once. A finishing
+    request hands its slot straight to the oldest waiter. Waiters may sit on different event
+    loops (one per request under TestClient), so slots are granted on the waiter's loop.
+    """
+
+    def __init__(self, router: str, kind: str, limit: int, queue_size: int, queue_timeout: float):
+        self.router = router
+        self.kind = kind
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.rejected: DefaultDict[str, int] = defaultdict(int)
+        self.queue_wait = Histogram()
+        self._lock = threading.Lock()
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> Optional[str]:
+        # None once admitted, otherwise why the request was rejected
+        with self._lock:
+            if self.in_flight < self.limit and not self._waiters:
+                self.in_flight += 1
+                return None
+            if len(self._waiters) >= self.queue_size:
+                self.rejected[QUEUE_FULL] += 1
+                return QUEUE_FULL
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+        start = time.perf_counter()
+        try:
+            async with asyncio.timeout(self.queue_timeout):
+                await waiter
+        except TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            if self._leave(waiter):
+                self.release()
+            raise
+        admitted = self._leave(waiter)
+        with self._lock:
+            self.queue_wait.observe(time.perf_counter() - start)
+            if not admitted:
+                self.rejected[QUEUE_TIMEOUT] += 1
+        return None if admitted else QUEUE_TIMEOUT
+
+    def release(self) -> None:
+        with self._lock:
+            if not self._waiters:
+                self.in_flight -= 1
+                return
+            waiter = self._waiters.popleft()
+        waiter.get_loop().call_soon_threadsafe(self._grant, waiter)
+
+    def _grant(self, waiter: asyncio.Future) -> None:
+        if waiter.done():
+            # The request stopped waiting before the slot arrived: pass it on
+            self.release()
+        else:
+            waiter.set_result(None)
+
+    def _leave(self, waiter: asyncio.Future) -> bool:
+        # Stop waiting; True if the slot was granted first
+        with self._lock:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+        if not waiter.done():
+            # Popped by release() but not granted yet: _grant passes the slot on
+            waiter.cancel()
+        return not waiter.cancelled()
+
+
+def make_budgets() -> Dict[Tuple[str, str], Budget]:
+    # ADMISSION_CLIENTS_WRITE_LIMIT and the like override the limit of one router; 0 turns a budget
+    # off
+    budgets = {}
+    for router in ADMISSION_ROUTERS:
+        for kind, default in (("read", ADMISSION_READ_LIMIT), ("write", ADMISSION_WRITE_LIMIT)):
+            limit = int(os.getenv(f"ADMISSION_{router.upper()}_{kind.upper()}_LIMIT", str(default)))
+            if limit > 0:
+                budgets[router, kind] = Budget(
+                    router, kind, limit, ADMISSION_QUEUE_SIZE, ADMISSION_QUEUE_TIMEOUT
+                )
+    return budgets
+
+
+admission_budgets = make_budgets()
+
+
+class AdmissionControlMiddleware:
+    """Shed load with a fast 503 and Retry-After once a router's budget and queue are used up.
+
+    Requests would otherwise queue on the threadpool and the connection pool until they time out,
+    holding a worker all the while. A slot is held until the response, including a streamed body,
+    has been sent.
+    """
+
+    def __init__(self, app: ASGIApp, budgets: Dict[Tuple[str, str], Budget], retry_after: int):
+        self.app = app
+        self.budgets = budgets
+        self.retry_after = retry_after
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        router = scope["path"].split("/", 2)[1]
+        budget = self.budgets.get((router, "read" if scope["method"] in SAFE_METHODS else "write"))
+        if budget is None:
+            await self.app(scope, receive, send)
+            return
+        if await budget.acquire() is not None:
+            response = JSONResponse(
+                {"detail": "Server is busy, retry later"},
+                status_code=503,
+                headers={"Retry-After": str(self.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            budget.release()
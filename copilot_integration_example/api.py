@@ -1,24 +1,183 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import APIRouter, FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from .routers import clients, networks
+from fastapi.responses import JSONResponse, PlainTextResponse
+from . import async_crud, crud
+from .admission import ADMISSION_RETRY_AFTER, AdmissionControlMiddleware, admission_budgets
+from .cache import count_cache, entity_cache, entity_key
+from .changes import change_signal
+from .compression import (
+    COMPRESSION_BROTLI_QUALITY,
+    COMPRESSION_GZIP_LEVEL,
+    COMPRESSION_MIN_SIZE,
+    CompressionMiddleware,
+)
+from .database import (
+    DB_ASYNC,
+    DB_POOL_SIZE,
+    DB_POOL_WARMUP,
+    READ_YOUR_WRITES_SECONDS,
+    AsyncSessionLocal,
+    SessionLocal,
+    async_engine,
+    async_warm_up,
+    check_database,
+    engine,
+    probe_engine,
+    replica_engine,
+    replica_monitor,
+    warm_up,
+)
+from .metrics import CONTENT_TYPE, instrument_routes, render_metrics
+from .notifications import (
+    CHANGES_CHANNEL,
+    ENTITY_CHANNEL,
+    NotificationListener,
+    split_entity_payload,
+)
+from .pagination import NEXT_CURSOR_HEADER
+from .prefix_index import network_index
+from .query_stats import QueryStatsMiddleware
+from .replica import ReadYourWritesMiddleware
+from .routers import async_clients, async_networks, changes, client_networks, clients, networks
 
-app = FastAPI()
 
+def invalidate_entity(payload: str) -> None:
+    table, entity_id, _ = split_entity_payload(payload)
+    entity_cache.invalidate(entity_key(table, entity_id))
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Adjust this to restrict origins if needed
-    allow_credentials=False,  # Set to False if allow_origins remains ["*"], or list specific origins if True
-    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-    allow_headers=["Content-Type", "Authorization"]
-)
+
+def refresh_network_index(payload: str) -> None:
+    # The payload carries the network's cidr, so the index is updated without a query
+    table, entity_id, ipv4 = split_entity_payload(payload)
+    if table != "network":
+        return
+    if ipv4 is None:
+        network_index.discard(int(entity_id))
+    else:
+        network_index.add(int(entity_id), ipv4 or None)
+
+
+def clear_counts(payload: str) -> None:
+    # Sent once per write statement on any table, including client inserts, which send no entity
+    # notification; the cache holds a count per table at most, so all of them are dropped
+    count_cache.clear()
+
+
+def warm_up_sync_engine() -> None:
+    warm_up(engine, DB_POOL_SIZE)
+    with SessionLocal() as db:
+        crud.warm_up_queries(db)
+
+
+async def warm_up_async_engine() -> None:
+    await async_warm_up(async_engine, DB_POOL_SIZE)
+    async with AsyncSessionLocal() as db:
+        await async_crud.warm_up_queries(db)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if DB_POOL_WARMUP:
+        await run_in_threadpool(warm_up_sync_engine)
+        if app.state.async_db:
+            await warm_up_async_engine()
+    # Apply changes made by other workers; start over whenever notifications may have been missed
+    listener = NotificationListener(engine)
+    listener.subscribe(ENTITY_CHANNEL, invalidate_entity, on_reset=entity_cache.clear)
+    listener.subscribe(ENTITY_CHANNEL, refresh_network_index, on_reset=network_index.clear)
+    listener.subscribe(CHANGES_CHANNEL, clear_counts, on_reset=count_cache.clear)
+    # Waiting change feed requests re-query after any notification or a reconnect
+    listener.subscribe(CHANGES_CHANNEL, change_signal.notify, on_reset=change_signal.notify)
+    listener.start()
+    replica_monitor.start()
+    try:
+        yield
+    finally:
+        replica_monitor.stop()
+        listener.stop()
+
+
+def create_app(
+    async_db: bool = DB_ASYNC, read_replica: bool = replica_engine is not None
+) -> FastAPI:
+    app = FastAPI(lifespan=lifespan)
+    app.state.async_db = async_db
+
+    # Inside CORS, so that rejections carry the CORS headers too
+    app.add_middleware(
+        AdmissionControlMiddleware, budgets=admission_budgets, retry_after=ADMISSION_RETRY_AFTER
+    )
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # Adjust this to restrict origins if needed
+        # Set to False if allow_origins remains ["*"], or list specific origins if True
+        allow_credentials=False,
+        allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+        allow_headers=["Content-Type", "Authorization"],
+        expose_headers=[NEXT_CURSOR_HEADER, "Retry-After"],
+    )
+    app.add_middleware(QueryStatsMiddleware)
+    if read_replica:
+        app.add_middleware(ReadYourWritesMiddleware, window=READ_YOUR_WRITES_SECONDS)
+    # Outermost, so that every response body passes through it
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=COMPRESSION_MIN_SIZE,
+        gzip_level=COMPRESSION_GZIP_LEVEL,
+        brotli_quality=COMPRESSION_BROTLI_QUALITY,
+    )
+
+    @app.get("/health")
+    def health_check():
+        return {"status": "healthy"}
+
+    @app.get("/ready")
+    def readiness_check():
+        # Probes the database over a dedicated connection; /health stays static for liveness checks
+        status = check_database(probe_engine, engine)
+        if replica_engine is not None:
+            # Reads fall back to the primary, so a bad replica does not make the app unready
+            status["replica"] = {
+                "available": replica_monitor.available,
+                "lag_seconds": replica_monitor.lag,
+            }
+        if not status["database"]["ok"]:
+            return JSONResponse({"status": "unavailable", **status}, status_code=503)
+        return {"status": "ready", **status}
+
+    # Rendered on the event loop, the only thread that updates the route metrics
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def metrics():
+        pools = {"primary": engine.pool, "async": async_engine.pool}
+        metrics = render_metrics(pools, admission_budgets.values())
+        return PlainTextResponse(metrics, media_type=CONTENT_TYPE)
+
+    # Include routers
+    if async_db:
+        include_with_overrides(app, clients.router, async_clients.router)
+        include_with_overrides(app, networks.router, async_networks.router)
+    else:
+        app.include_router(clients.router)
+        app.include_router(networks.router)
+    app.include_router(client_networks.router)
+    app.include_router(changes.router)
+    instrument_routes(app)
+    return app
 
 
-@app.get("/health")
-def health_check():
-    return {"status": "healthy"}
+def include_with_overrides(app: FastAPI, router: APIRouter, overrides: APIRouter) -> None:
+    # Routes in `overrides` replace the routes of `router` with the same path and method. The
+    # remaining routes go first so that static paths such as /export are matched before /{id}.
+    replaced = {(route.path, method) for route in overrides.routes for method in route.methods}
+    remaining = [
+        route
+        for route in router.routes
+        if not any((route.path, method) in replaced for method in route.methods)
+    ]
+    app.include_router(APIRouter(routes=remaining))
+    app.include_router(overrides)
 
 
-# Include routers
-app.include_router(clients.router)
-app.include_router(networks.router)
+app = create_app()
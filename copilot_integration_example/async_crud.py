@@ -0,0 +1,266 @@
+from typing import Any, List, Optional, Sequence, Tuple, Union
+from uuid import UUID, uuid4
+
+from fastapi import HTTPException
+from sqlalchemy import Row, delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models, schemas
+from .cache import count_cache, entity_cache, entity_key
+from .crud import (
+    CLIENT_COLUMNS,
+    CLIENT_LIST_COLUMNS,
+    COUNT_ESTIMATE_THRESHOLD,
+    ESTIMATE_ROWS,
+    NETWORK_COLUMNS,
+    NETWORK_LIST_COLUMNS,
+    by_ids_statement,
+    cache_entities,
+    cached_entities,
+    clients_page_statement,
+    coalesced_insert_statement,
+    coalesced_results,
+    make_client_row,
+    make_network_row,
+    networks_page_statement,
+    parse_uuid,
+    split_found,
+)
+from .ids import uuid7
+from .prefix_index import network_index
+
+
+async def get_client(db: AsyncSession, client_id: str) -> Optional[Row]:
+    client_uuid = parse_uuid(client_id)
+    if client_uuid is None:
+        return None
+    key = entity_key("client", client_uuid)
+    db_client = entity_cache.get(key)
+    if db_client is None:
+        generation = entity_cache.generation
+        statement = select(*CLIENT_COLUMNS).where(models.Client.id == client_uuid)
+        db_client = (await db.execute(statement)).first()
+        if db_client is not None:
+            entity_cache.set(key, db_client, generation)
+    return db_client
+
+
+async def get_clients_by_ids(
+    db: AsyncSession, client_ids: List[UUID]
+) -> Tuple[List[Row], List[UUID]]:
+    found, misses, generation = cached_entities("client", client_ids)
+    if misses:
+        statement = by_ids_statement(models.Client, CLIENT_COLUMNS, misses)
+        cache_entities(db, "client", (await db.execute(statement)).all(), generation, found)
+    return split_found(client_ids, found)
+
+
+async def table_version(db: AsyncSession, model: type) -> int:
+    statement = select(func.coalesce(func.sum(models.TableVersion.version), 0)).where(
+        models.TableVersion.table_name == model.__tablename__
+    )
+    return int((await db.execute(statement)).scalar())
+
+
+async def count_rows(db: AsyncSession, model: type) -> Tuple[int, bool]:
+    table = model.__tablename__
+    total = count_cache.get(table)
+    if total is not None:
+        return total, False
+    estimate = (await db.execute(ESTIMATE_ROWS, {"table": table})).scalar()
+    if estimate is not None and estimate >= COUNT_ESTIMATE_THRESHOLD:
+        return int(estimate), True
+    generation = count_cache.generation
+    total = (await db.execute(select(func.count()).select_from(model))).scalar_one()
+    if not db.info.get("replica"):
+        count_cache.set(table, total, generation)
+    return total, False
+
+
+async def get_clients(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[UUID] = None,
+    columns: Sequence[Any] = CLIENT_LIST_COLUMNS,
+) -> List[Row]:
+    return (await db.execute(clients_page_statement(skip, limit, after, columns))).all()
+
+
+async def create_client(db: AsyncSession, client: schemas.ClientCreate) -> Row:
+    try:
+        statement = (
+            insert(models.Client)
+            .values(id=uuid7(), name=client.name)
+            .returning(*CLIENT_COLUMNS)
+        )
+        db_client = (await db.execute(statement)).one()
+        await db.commit()
+        count_cache.invalidate("client")
+        return db_client
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Client name already exists")
+
+
+async def create_clients(
+    db: AsyncSession, clients: List[schemas.ClientCreate]
+) -> List[Union[Row, HTTPException]]:
+    names = [client.name for client in clients]
+    statement = coalesced_insert_statement(models.Client, CLIENT_COLUMNS, names, make_client_row)
+    rows = (await db.execute(statement)).all()
+    await db.commit()
+    count_cache.invalidate("client")
+    return coalesced_results(names, rows, "Client name already exists")
+
+
+async def update_client(
+    db: AsyncSession, client_id: str, client: schemas.ClientCreate
+) -> Optional[Row]:
+    client_uuid = parse_uuid(client_id)
+    if client_uuid is None:
+        return None
+    try:
+        statement = (
+            update(models.Client)
+            .where(models.Client.id == client_uuid)
+            .values(name=client.name, version=models.Client.version + 1)
+            .returning(*CLIENT_COLUMNS)
+            .execution_options(synchronize_session=False)
+        )
+        db_client = (await db.execute(statement)).first()
+        await db.commit()
+        entity_cache.invalidate(entity_key("client", client_uuid))
+        return db_client
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Client name already exists")
+
+
+async def delete_client(db: AsyncSession, client_id: str) -> bool:
+    client_uuid = parse_uuid(client_id)
+    if client_uuid is None:
+        return False
+    statement = (
+        delete(models.Client)
+        .where(models.Client.id == client_uuid)
+        .returning(models.Client.id)
+        .execution_options(synchronize_session=False)
+    )
+    deleted = (await db.execute(statement)).first() is not None
+    await db.commit()
+    entity_cache.invalidate(entity_key("client", client_uuid))
+    count_cache.invalidate("client")
+    return deleted
+
+
+async def get_network(db: AsyncSession, network_id: int) -> Optional[Row]:
+    key = entity_key("network", network_id)
+    db_network = entity_cache.get(key)
+    if db_network is None:
+        generation = entity_cache.generation
+        statement = select(*NETWORK_COLUMNS).where(models.Network.id == network_id)
+        db_network = (await db.execute(statement)).first()
+        if db_network is not None:
+            entity_cache.set(key, db_network, generation)
+    return db_network
+
+
+async def get_networks_by_ids(
+    db: AsyncSession, network_ids: List[int]
+) -> Tuple[List[Row], List[int]]:
+    found, misses, generation = cached_entities("network", network_ids)
+    if misses:
+        statement = by_ids_statement(models.Network, NETWORK_COLUMNS, misses)
+        cache_entities(db, "network", (await db.execute(statement)).all(), generation, found)
+    return split_found(network_ids, found)
+
+
+async def get_networks(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[int] = None,
+    columns: Sequence[Any] = NETWORK_LIST_COLUMNS,
+) -> List[Row]:
+    return (await db.execute(networks_page_statement(skip, limit, after, columns))).all()
+
+
+async def create_network(db: AsyncSession, network: schemas.NetworkCreate) -> Row:
+    try:
+        statement = (
+            insert(models.Network)
+            .values(ipv4=network.ipv4)
+            .returning(*NETWORK_COLUMNS)
+        )
+        db_network = (await db.execute(statement)).one()
+        await db.commit()
+        count_cache.invalidate("network")
+        network_index.add(db_network.id, db_network.ipv4)
+        return db_network
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Network IPv4 already exists")
+
+
+async def create_networks(
+    db: AsyncSession, networks: List[schemas.NetworkCreate]
+) -> List[Union[Row, HTTPException]]:
+    addresses = [network.ipv4 for network in networks]
+    statement = coalesced_insert_statement(
+        models.Network, NETWORK_COLUMNS, addresses, make_network_row
+    )
+    rows = (await db.execute(statement)).all()
+    await db.commit()
+    count_cache.invalidate("network")
+    for row in rows:
+        network_index.add(row.id, row.ipv4)
+    return coalesced_results(addresses, rows, "Network IPv4 already exists")
+
+
+async def update_network(
+    db: AsyncSession, network_id: int, network: schemas.NetworkCreate
+) -> Optional[Row]:
+    try:
+        statement = (
+            update(models.Network)
+            .where(models.Network.id == network_id)
+            .values(ipv4=network.ipv4, version=models.Network.version + 1)
+            .returning(*NETWORK_COLUMNS)
+            .execution_options(synchronize_session=False)
+        )
+        db_network = (await db.execute(statement)).first()
+        await db.commit()
+        entity_cache.invalidate(entity_key("network", network_id))
+        if db_network is not None:
+            network_index.add(network_id, db_network.ipv4)
+        return db_network
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Network IPv4 already exists")
+
+
+async def delete_network(db: AsyncSession, network_id: int) -> bool:
+    statement = (
+        delete(models.Network)
+        .where(models.Network.id == network_id)
+        .returning(models.Network.id)
+        .execution_options(synchronize_session=False)
+    )
+    deleted = (await db.execute(statement)).first() is not None
+    await db.commit()
+    entity_cache.invalidate(entity_key("network", network_id))
+    count_cache.invalidate("network")
+    network_index.discard(network_id)
+    return deleted
+
+
+async def warm_up_queries(db: AsyncSession) -> None:
+    # asyncpg also prepares each statement per connection, so this only primes the one it runs on
+    await get_client(db, str(uuid4()))
+    await get_clients(db, limit=1)
+    await get_network(db, 0)
+    await get_networks(db, limit=1)
+    await db.rollback()
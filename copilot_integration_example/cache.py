@@ -0,0 +1,90 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+ENTITY_CACHE_SIZE = int(os.getenv("ENTITY_CACHE_SIZE", "10000"))
+ENTITY_CACHE_TTL = float(os.getenv("ENTITY_CACHE_TTL", "60"))
+COUNT_CACHE_TTL = float(os.getenv("COUNT_CACHE_TTL", "5"))
+
+
+class LRUCache:
+    """Bounded, thread-safe LRU cache whose entries also expire after `ttl` seconds.
+
+    Loaders should read `generation` before querying and store with `set(..., generation)`:
+    the value is then dropped if any invalidation happened in between, so a row read just
+    before a concurrent write cannot be cached after that write's invalidation.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, generation: Optional[int] = None) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self.generation += 1
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+# Rows returned by crud.get_client/get_network, keyed "<table>:<id>" like the change notifications
+entity_cache = LRUCache(ENTITY_CACHE_SIZE, ENTITY_CACHE_TTL)
+
+
+# Exact row counts by table name, for list envelopes; dropped on local inserts and deletes, and on
+# the change notifications of writes made by other workers
+count_cache = LRUCache(16, COUNT_CACHE_TTL)
+
+
+def entity_key(table: str, entity_id: Any) -> str:
+    return f"{table}:{entity_id}"
@@ -0,0 +1,120 @@
+import asyncio
+import os
+import threading
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from . import crud, models, schemas
+from .database import SessionLocal
+from .pagination import decode_cursor, encode_cursor
+
+# Longest a long-poll request may wait for changes
+MAX_CHANGES_WAIT = float(os.getenv("MAX_CHANGES_WAIT", "30"))
+MAX_CHANGES_PAGE = 1000
+# Waiters re-query at least this often: a notification can arrive while an older transaction
+# still holds its changes back, and nothing notifies when that transaction ends
+RECHECK_INTERVAL = 5.0
+# Comment line sent on an idle event stream so that proxies keep the connection open
+HEARTBEAT_INTERVAL = 15.0
+
+
+class ChangeSignal:
+    """Wake requests waiting for changes when the listener thread sees a notification.
+
+    Take `waiter()` before querying and wait on it afterwards, so a notification that arrives in
+    between is not missed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._event: Optional[asyncio.Event] = None
+
+    def waiter(self) -> asyncio.Event:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._loop is not loop:
+                self._loop, self._event = loop, asyncio.Event()
+            return self._event
+
+    def notify(self, payload: str = "") -> None:
+        # Called from the listener thread
+        with self._lock:
+            loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._wake)
+
+    def _wake(self) -> None:
+        with self._lock:
+            event, self._event = self._event, asyncio.Event()
+        if event is not None:
+            event.set()
+
+
+change_signal = ChangeSignal()
+
+
+def encode_change_cursor(change: models.Change) -> str:
+    return encode_cursor(f"{change.xid}:{change.id}")
+
+
+def decode_change_cursor(cursor: str) -> Tuple[int, int]:
+    return decode_cursor(cursor, _parse_position)
+
+
+def _parse_position(value: str) -> Tuple[int, int]:
+    xid, change_id = value.split(":")
+    return int(xid), int(change_id)
+
+
+def fetch_changes(after: Optional[Tuple[int, int]], limit: int) -> List[models.Change]:
+    # A short session per query: waiting requests must not hold a connection
+    db = SessionLocal()
+    try:
+        return crud.get_changes(db, after, limit)
+    finally:
+        db.close()
+
+
+async def wait_for_changes(
+    after: Optional[Tuple[int, int]], limit: int, wait: float
+) -> List[models.Change]:
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + wait
+    while True:
+        woken = change_signal.waiter()
+        changes = await run_in_threadpool(fetch_changes, after, limit)
+        remaining = deadline - loop.time()
+        if changes or remaining <= 0:
+            return changes
+        await _wait(woken, min(remaining, RECHECK_INTERVAL))
+
+
+async def change_events(
+    after: Optional[Tuple[int, int]], is_disconnected: Callable[[], Awaitable[bool]]
+) -> AsyncIterator[str]:
+    # Server-Sent Events; the id of each event is the cursor to resume from with Last-Event-ID
+    loop = asyncio.get_running_loop()
+    last_sent = loop.time()
+    while not await is_disconnected():
+        woken = change_signal.waiter()
+        changes = await run_in_threadpool(fetch_changes, after, MAX_CHANGES_PAGE)
+        if changes:
+            for change in changes:
+                data = schemas.Change.model_validate(change).model_dump_json()
+                yield f"id: {encode_change_cursor(change)}\nevent: change\ndata: {data}\n\n"
+            after = (changes[-1].xid, changes[-1].id)
+            last_sent = loop.time()
+            continue
+        if loop.time() - last_sent >= HEARTBEAT_INTERVAL:
+            yield ": keepalive\n\n"
+            last_sent = loop.time()
+        await _wait(woken, min(RECHECK_INTERVAL, HEARTBEAT_INTERVAL))
+
+
+async def _wait(event: asyncio.Event, timeout: float) -> None:
+    try:
+        await asyncio.wait_for(event.wait(), timeout)
+    except asyncio.TimeoutError:
+        pass
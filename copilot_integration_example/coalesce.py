@@ -0,0 +1,201 @@
+import asyncio
+import os
+import threading
+import weakref
+from typing import Any, Awaitable, Callable, Generic, List, Optional, TypeVar, Union
+
+from fastapi import HTTPException
+
+from . import async_crud, crud
+
+T = TypeVar("T")
+
+# Longest a create waits for others to share its commit; 0 commits every create on its own
+WRITE_COALESCE_WINDOW_MS = float(os.getenv("WRITE_COALESCE_WINDOW_MS", "0"))
+# Creates per coalesced statement; a full batch is written without waiting out the window
+WRITE_COALESCE_MAX_BATCH = int(os.getenv("WRITE_COALESCE_MAX_BATCH", "100"))
+# Sync creates that may hold a threadpool thread (40 by default) while waiting for another's commit;
+# further ones are written on their own, leaving the other threads to the rest of the sync routes
+WRITE_COALESCE_MAX_WAITING = int(os.getenv("WRITE_COALESCE_MAX_WAITING", "16"))
+
+Result = Union[Any, Exception]
+
+
+class _Entry(Generic[T]):
+    __slots__ = ("item", "result", "lead", "done")
+
+    def __init__(self, item: T, done: Any):
+        self.item = item
+        self.result: Optional[Result] = None
+        self.lead = False
+        self.done = done
+
+
+def _unwrap(entry: _Entry) -> Any:
+    if isinstance(entry.result, Exception):
+        raise entry.result
+    return entry.result
+
+
+class WriteCoalescer(Generic[T]):
+    """Group commit for single-row creates from the threadpool.
+
+    The first caller of a batch leads it: it waits up to `window` seconds, or until `max_batch`
+    callers have joined, then writes all of them with one statement and one commit in its own
+    session. Every caller gets back its own row or its own exception. A batch that fills up while
+    its leader is still writing gets the next waiting caller as leader, so batches overlap.
+
+    Each waiting caller blocks a thread. Once `max_waiting` callers wait, further ones write their
+    item alone instead of joining, so batches stay smaller than the threadpool; under load the
+    async handlers, whose callers wait without a thread, batch up to `max_batch`.
+    """
+
+    def __init__(
+        self,
+        flush: Callable[[Any, List[T]], List[Result]],
+        window: float,
+        max_batch: int,
+        max_waiting: int,
+    ):
+        self._flush = flush
+        self.window = window
+        self._max_batch = max_batch
+        self._max_waiting = max_waiting
+        self._lock = threading.Lock()
+        self._full = threading.Condition(self._lock)
+        self._pending: List[_Entry[T]] = []
+        self._leading = False
+        self._waiting = 0
+
+    def submit(self, db: Any, item: T) -> Any:
+        entry = _Entry(item, threading.Event())
+        with self._lock:
+            alone = self._leading and self._waiting >= self._max_waiting
+            if not alone:
+                self._pending.append(entry)
+                entry.lead = not self._leading
+                self._leading = True
+                if not entry.lead:
+                    self._waiting += 1
+                if len(self._pending) >= self._max_batch:
+                    self._full.notify()
+        if alone:
+            entry.result = self._flush(db, [item])[0]
+            return _unwrap(entry)
+        if not entry.lead:
+            # Woken with a result, or with the lead of the next batch
+            entry.done.wait()
+            with self._lock:
+                self._waiting -= 1
+        if entry.lead:
+            self._lead(db)
+        return _unwrap(entry)
+
+    def _lead(self, db: Any) -> None:
+        with self._lock:
+            self._full.wait_for(lambda: len(self._pending) >= self._max_batch, self.window)
+            batch = self._pending[: self._max_batch]
+            self._pending = self._pending[self._max_batch :]
+            successor = self._pending[0] if self._pending else None
+            self._leading = successor is not None
+        if successor is not None:
+            successor.lead = True
+            successor.done.set()
+        try:
+            results = self._flush(db, [waiter.item for waiter in batch])
+        except Exception as e:
+            results = [e] * len(batch)
+        for waiter, result in zip(batch, results):
+            waiter.result, waiter.lead = result, False
+            waiter.done.set()
+
+
+class _LoopBatches(Generic[T]):
+    __slots__ = ("pending", "full")
+
+    def __init__(self):
+        self.pending: List[_Entry[T]] = []
+        # Set once the batch being collected is full; None while no batch is being collected
+        self.full: Optional[asyncio.Event] = None
+
+
+class AsyncWriteCoalescer(Generic[T]):
+    """`WriteCoalescer` for async handlers. Creates are batched with others on the same loop."""
+
+    def __init__(
+        self,
+        flush: Callable[[Any, List[T]], Awaitable[List[Result]]],
+        window: float,
+        max_batch: int,
+    ):
+        self._flush = flush
+        self.window = window
+        self._max_batch = max_batch
+        self._loops: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopBatches[T]]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    async def submit(self, db: Any, item: T) -> Any:
+        state = self._loops.setdefault(asyncio.get_running_loop(), _LoopBatches())
+        entry = _Entry(item, asyncio.Event())
+        state.pending.append(entry)
+        if state.full is None:
+            entry.lead = True
+            state.full = asyncio.Event()
+        if len(state.pending) >= self._max_batch:
+            state.full.set()
+        if not entry.lead:
+            await entry.done.wait()
+        if entry.lead:
+            await self._lead(db, state, entry)
+        return _unwrap(entry)
+
+    async def _lead(self, db: Any, state: _LoopBatches[T], entry: _Entry[T]) -> None:
+        try:
+            await asyncio.wait_for(state.full.wait(), self.window)
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            # The leading request went away: leave its batch to the next caller in it
+            state.pending.remove(entry)
+            self._hand_off(state)
+            raise
+        batch, state.pending = state.pending[: self._max_batch], state.pending[self._max_batch :]
+        self._hand_off(state)
+        # What the batch gets if the leading request is cancelled while writing it
+        cancelled = HTTPException(status_code=503, detail="Write was cancelled")
+        results: List[Result] = [cancelled] * len(batch)
+        try:
+            results = await self._flush(db, [waiter.item for waiter in batch])
+        except Exception as e:
+            results = [e] * len(batch)
+        finally:
+            for waiter, result in zip(batch, results):
+                waiter.result, waiter.lead = result, False
+                waiter.done.set()
+
+    def _hand_off(self, state: _LoopBatches[T]) -> None:
+        if not state.pending:
+            state.full = None
+            return
+        state.full = asyncio.Event()
+        if len(state.pending) >= self._max_batch:
+            state.full.set()
+        successor = state.pending[0]
+        successor.lead = True
+        successor.done.set()
+
+
+_window = WRITE_COALESCE_WINDOW_MS / 1000
+client_creates = WriteCoalescer(
+    crud.create_clients, _window, WRITE_COALESCE_MAX_BATCH, WRITE_COALESCE_MAX_WAITING
+)
+network_creates = WriteCoalescer(
+    crud.create_networks, _window, WRITE_COALESCE_MAX_BATCH, WRITE_COALESCE_MAX_WAITING
+)
+async_client_creates = AsyncWriteCoalescer(
+    async_crud.create_clients, _window, WRITE_COALESCE_MAX_BATCH
+)
+async_network_creates = AsyncWriteCoalescer(
+    async_crud.create_networks, _window, WRITE_COALESCE_MAX_BATCH
+)
@@ -0,0 +1,90 @@
+import os
+from typing import Dict, Optional
+
+import brotli
+from starlette.datastructures import Headers, MutableHeaders
+# Undocumented responders of Starlette's GZipMiddleware, in this form since 0.46 (pinned in
+# pyproject.toml)
+from starlette.middleware.gzip import GZipResponder, IdentityResponder
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Responses smaller than this are sent uncompressed: the savings would not pay for the CPU
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+# Levels for dynamic content, well below the maximums (9 and 11) that cost several times the CPU
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+# Preferred first when the client accepts several with the same weight
+ENCODINGS = ("br", "gzip")
+
+
+def preferred_encoding(accept_encoding: str) -> Optional[str]:
+    # Highest weighted of ENCODINGS in an Accept-Encoding header; q=0 refuses an encoding
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, *params = (token.strip() for token in part.split(";"))
+        weight = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding.lower()] = weight
+    wildcard = weights.get("*", 0.0)
+    best, best_weight = None, 0.0
+    for encoding in ENCODINGS:
+        weight = weights.get(encoding, wildcard)
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+class BrotliResponder(IdentityResponder):
+    content_encoding = "br"
+
+    def __init__(self, app: ASGIApp, minimum_size: int, quality: int):
+        super().__init__(app, minimum_size)
+        self.compressor = brotli.Compressor(quality=quality)
+
+    def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        compressed = self.compressor.process(body)
+        return compressed if more_body else compressed + self.compressor.finish()
+
+
+class CompressionMiddleware:
+    """Compress responses with brotli or gzip, whichever the client prefers.
+
+    Responses under `minimum_size` bytes, event streams and responses that already carry a
+    Content-Encoding are sent as they are. Compressed responses get a weak ETag, since the bytes
+    differ from the uncompressed representation.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int, gzip_level: int, brotli_quality: int):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = preferred_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding == "br":
+            responder = BrotliResponder(self.app, self.minimum_size, self.brotli_quality)
+        elif encoding == "gzip":
+            responder = GZipResponder(self.app, self.minimum_size, compresslevel=self.gzip_level)
+        else:
+            responder = IdentityResponder(self.app, self.minimum_size)
+
+        async def send_weak_etag(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                etag = headers.get("etag")
+                if etag is not None and not etag.startswith("W/") and "content-encoding" in headers:
+                    headers["etag"] = f"W/{etag}"
+            await send(message)
+
+        await responder(scope, receive, send_weak_etag)
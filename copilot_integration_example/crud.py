@@ -1,47 +1,285 @@
-from sqlalchemy.orm import Session
+import os
+from sqlalchemy import (
+    BigInteger,
+    Row,
+    Select,
+    Text,
+    any_,
+    bindparam,
+    cast,
+    delete,
+    func,
+    select,
+    text,
+    true,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, INET
+from sqlalchemy.dialects.postgresql import Insert, insert
+from sqlalchemy.orm import Session, joinedload, selectinload
 from . import models, schemas
+from .cache import count_cache, entity_cache, entity_key
+from .ids import uuid7
+from .prefix_index import network_index
+from ipaddress import IPv4Address
 from uuid import uuid4, UUID
-from typing import List, Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
 from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException
+from pydantic import ValidationError
 
+# Rows per multi-row INSERT issued by the bulk endpoints
+BULK_BATCH_SIZE = 1000
+# Most ids accepted by one multi-get request
+MAX_MULTI_GET = 1000
+# Most rows returned by one search
+MAX_SEARCH_RESULTS = 100
+# Columns of the rows returned by point reads and writes and kept in the entity cache
+CLIENT_COLUMNS = (models.Client.id, models.Client.name, models.Client.version)
+NETWORK_COLUMNS = (models.Network.id, models.Network.ipv4, models.Network.version)
+# Columns of list pages, exactly as serialized. Plain rows skip the ORM identity map, and the
+# routers serialize them without validating them again. asyncpg decodes cidr to IPv4Network, so
+# ipv4 is read as text to get the same value from both drivers.
+CLIENT_LIST_COLUMNS = (models.Client.id, models.Client.name)
+NETWORK_LIST_COLUMNS = (models.Network.id, cast(models.Network.ipv4, Text).label("ipv4"))
+# Tables estimated to hold at least this many rows report an estimated total instead of a COUNT(*)
+COUNT_ESTIMATE_THRESHOLD = int(os.getenv("COUNT_ESTIMATE_THRESHOLD", "100000"))
 
-def get_client(db: Session, client_id: str) -> Optional[models.Client]:
+# Planner row estimate, scaled by how much the table grew since the last ANALYZE the way the planner
+# does it; NULL for a table that was never analyzed
+ESTIMATE_ROWS = text(
+    """
+    SELECT CASE
+        WHEN reltuples < 0 THEN NULL
+        WHEN relpages = 0 THEN reltuples
+        ELSE reltuples / relpages * (pg_relation_size(oid) / current_setting('block_size')::int)
+    END
+    FROM pg_class
+    WHERE oid = CAST(:table AS regclass)
+    """
+)
+
+
+def parse_uuid(value: Union[str, UUID]) -> Optional[UUID]:
     try:
         # Convert string to UUID if needed
-        if isinstance(client_id, str):
-            client_uuid = UUID(client_id)
-        else:
-            client_uuid = client_id
-        return db.query(models.Client).filter(models.Client.id == client_uuid).first()
+        return UUID(value) if isinstance(value, str) else value
     except ValueError:
         # Invalid UUID format
         return None
 
 
-def get_clients(db: Session, skip: int = 0, limit: int = 100) -> List[models.Client]:
-    return db.query(models.Client).offset(skip).limit(limit).all()
+def parse_network_id(value: str) -> Optional[int]:
+    try:
+        network_id = int(value)
+    except ValueError:
+        return None
+    # network.id is a Postgres integer
+    return network_id if -(2**31) <= network_id < 2**31 else None
+
+
+def parse_ids(values: List[str], parse: Callable[[str], Any]) -> Tuple[List[Any], List[str]]:
+    # Ids may be repeated (?ids=a&ids=b) or comma separated (?ids=a,b). Returns the distinct valid
+    # ids in request order and the values that failed to parse.
+    ids: List[Any] = []
+    invalid: List[str] = []
+    seen = set()
+    for value in values:
+        for raw in value.split(","):
+            raw = raw.strip()
+            if not raw:
+                continue
+            parsed = parse(raw)
+            if parsed is None:
+                invalid.append(raw)
+            elif parsed not in seen:
+                seen.add(parsed)
+                ids.append(parsed)
+    if len(ids) + len(invalid) > MAX_MULTI_GET:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_MULTI_GET} ids per request")
+    return ids, invalid
+
+
+def select_fields(values: Optional[List[str]], columns: Sequence[Any]) -> Sequence[Any]:
+    # The columns named by ?fields=, repeated (?fields=a&fields=b) or comma separated
+    # (?fields=a,b), in their usual order. id is always included: it identifies the item and makes
+    # the next cursor.
+    if values is None:
+        return columns
+    names = {raw.strip() for value in values for raw in value.split(",") if raw.strip()}
+    unknown = names - {column.key for column in columns}
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=(
+                f"Unknown fields: {', '.join(sorted(unknown))}; "
+                f"available: {', '.join(c.key for c in columns)}"
+            ),
+        )
+    return tuple(column for column in columns if column.key == "id" or column.key in names)
+
+
+def get_client(db: Session, client_id: str) -> Optional[Row]:
+    client_uuid = parse_uuid(client_id)
+    if client_uuid is None:
+        return None
+    key = entity_key("client", client_uuid)
+    db_client = entity_cache.get(key)
+    if db_client is None:
+        generation = entity_cache.generation
+        statement = select(*CLIENT_COLUMNS).where(models.Client.id == client_uuid)
+        db_client = db.execute(statement).first()
+        if db_client is not None:
+            entity_cache.set(key, db_client, generation)
+    return db_client
+
+
+def get_clients_by_ids(db: Session, client_ids: List[UUID]) -> Tuple[List[Row], List[UUID]]:
+    found, misses, generation = cached_entities("client", client_ids)
+    if misses:
+        rows = db.execute(by_ids_statement(models.Client, CLIENT_COLUMNS, misses)).all()
+        cache_entities(db, "client", rows, generation, found)
+    return split_found(client_ids, found)
+
+
+def get_clients(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[UUID] = None,
+    columns: Sequence[Any] = CLIENT_LIST_COLUMNS,
+) -> List[Row]:
+    return db.execute(clients_page_statement(skip, limit, after, columns)).all()
+
+
+def clients_page_statement(
+    skip: int, limit: int, after: Optional[UUID], columns: Sequence[Any] = CLIENT_LIST_COLUMNS
+) -> Select:
+    statement = select(*columns).order_by(models.Client.id)
+    if after is not None:
+        # Keyset pagination: seek past the last id of the previous page via the primary key index.
+        # New ids are UUIDv7 and sort in creation order among themselves. Older uuid4 ids sort
+        # randomly around them: ids made now start with 019, so most uuid4 rows sort after them
+        statement = statement.where(models.Client.id > after)
+    return statement.offset(skip).limit(limit)
+
+
+def search_clients(db: Session, q: str, mode: schemas.SearchMode, limit: int = 20) -> List[Row]:
+    return db.execute(search_clients_statement(q, mode, limit)).all()
+
+
+def search_clients_statement(q: str, mode: schemas.SearchMode, limit: int) -> Select:
+    lower_name = func.lower(models.Client.name)
+    prefix = escape_like(q.lower()) + "%"
+    statement = select(models.Client.id, models.Client.name)
+    if mode == schemas.SearchMode.prefix:
+        # Range scan on ix_client_name_prefix
+        statement = statement.where(lower_name.like(prefix)).order_by(lower_name)
+    else:
+        # Both conditions are answered by the trigram index; prefix matches rank first, then the
+        # closest names
+        statement = statement.where(
+            models.Client.name.ilike("%" + escape_like(q) + "%") | models.Client.name.op("%")(q)
+        ).order_by(
+            lower_name.like(prefix).desc(),
+            func.similarity(models.Client.name, q).desc(),
+            models.Client.name,
+        )
+    return statement.limit(limit)
+
+
+def escape_like(value: str) -> str:
+    # Backslash is the default LIKE escape character in Postgres
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
 
+def table_version(db: Session, model: type) -> int:
+    # Grows with every committed write that changes rows of the table, so it never repeats; 0 until
+    # the first one
+    statement = select(func.coalesce(func.sum(models.TableVersion.version), 0)).where(
+        models.TableVersion.table_name == model.__tablename__
+    )
+    return int(db.execute(statement).scalar())
 
-def create_client(db: Session, client: schemas.ClientCreate) -> models.Client:
+
+def count_rows(db: Session, model: type) -> Tuple[int, bool]:
+    # (total, total_is_estimate)
+    table = model.__tablename__
+    total = count_cache.get(table)
+    if total is not None:
+        return total, False
+    estimate = db.execute(ESTIMATE_ROWS, {"table": table}).scalar()
+    if estimate is not None and estimate >= COUNT_ESTIMATE_THRESHOLD:
+        return int(estimate), True
+    generation = count_cache.generation
+    total = db.execute(select(func.count()).select_from(model)).scalar_one()
+    if not db.info.get("replica"):
+        count_cache.set(table, total, generation)
+    return total, False
+
+
+def export_clients_statement() -> Select:
+    return select(models.Client.id, models.Client.name).order_by(models.Client.id)
+
+
+def create_client(db: Session, client: schemas.ClientCreate) -> Row:
     try:
-        db_client = models.Client(id=uuid4(), name=client.name)
-        db.add(db_client)
+        statement = (
+            insert(models.Client)
+            .values(id=uuid7(), name=client.name)
+            .returning(*CLIENT_COLUMNS)
+        )
+        db_client = db.execute(statement).one()
         db.commit()
-        db.refresh(db_client)
+        count_cache.invalidate("client")
         return db_client
     except IntegrityError:
         db.rollback()
         raise HTTPException(status_code=400, detail="Client name already exists")
 
 
-def update_client(db: Session, client_id: str, client: schemas.ClientCreate) -> Optional[models.Client]:
+def make_client_row(name: str) -> Dict[str, Any]:
+    return {"id": uuid7(), "name": name}
+
+
+def create_clients(
+    db: Session, clients: List[schemas.ClientCreate]
+) -> List[Union[Row, HTTPException]]:
+    # Concurrent single creates gathered by the write coalescer: one statement, one commit
+    names = [client.name for client in clients]
+    statement = coalesced_insert_statement(models.Client, CLIENT_COLUMNS, names, make_client_row)
+    rows = db.execute(statement).all()
+    db.commit()
+    count_cache.invalidate("client")
+    return coalesced_results(names, rows, "Client name already exists")
+
+
+def bulk_create_clients(db: Session, items: List[Any]) -> List[schemas.ClientBulkResult]:
+    results, grouped = _group_bulk_items(
+        items, schemas.ClientCreate, schemas.ClientBulkResult, "name"
+    )
+    _bulk_insert(db, models.Client, models.Client.name, grouped, make_client_row)
+    db.commit()
+    count_cache.invalidate("client")
+    return results
+
+
+def update_client(db: Session, client_id: str, client: schemas.ClientCreate) -> Optional[Row]:
+    client_uuid = parse_uuid(client_id)
+    if client_uuid is None:
+        return None
     try:
-        db_client = get_client(db, client_id)
-        if db_client:
-            db_client.name = client.name
-            db.commit()
-            db.refresh(db_client)
+        statement = (
+            update(models.Client)
+            .where(models.Client.id == client_uuid)
+            .values(name=client.name, version=models.Client.version + 1)
+            .returning(*CLIENT_COLUMNS)
+            .execution_options(synchronize_session=False)
+        )
+        db_client = db.execute(statement).first()
+        db.commit()
+        entity_cache.invalidate(entity_key("client", client_uuid))
         return db_client
     except IntegrityError:
         db.rollback()
@@ -49,41 +287,140 @@ def update_client(db: Session, client_id: str, client: schemas.ClientCreate) ->
 
 
 def delete_client(db: Session, client_id: str) -> bool:
-    db_client = get_client(db, client_id)
-    if db_client:
-        db.delete(db_client)
-        db.commit()
-        return True
-    return False
+    client_uuid = parse_uuid(client_id)
+    if client_uuid is None:
+        return False
+    statement = (
+        delete(models.Client)
+        .where(models.Client.id == client_uuid)
+        .returning(models.Client.id)
+        .execution_options(synchronize_session=False)
+    )
+    deleted = db.execute(statement).first() is not None
+    db.commit()
+    entity_cache.invalidate(entity_key("client", client_uuid))
+    count_cache.invalidate("client")
+    return deleted
+
+
+def get_network(db: Session, network_id: int) -> Optional[Row]:
+    key = entity_key("network", network_id)
+    db_network = entity_cache.get(key)
+    if db_network is None:
+        generation = entity_cache.generation
+        statement = select(*NETWORK_COLUMNS).where(models.Network.id == network_id)
+        db_network = db.execute(statement).first()
+        if db_network is not None:
+            entity_cache.set(key, db_network, generation)
+    return db_network
+
+
+def get_networks_by_ids(db: Session, network_ids: List[int]) -> Tuple[List[Row], List[int]]:
+    found, misses, generation = cached_entities("network", network_ids)
+    if misses:
+        rows = db.execute(by_ids_statement(models.Network, NETWORK_COLUMNS, misses)).all()
+        cache_entities(db, "network", rows, generation, found)
+    return split_found(network_ids, found)
+
 
+def get_networks(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[int] = None,
+    columns: Sequence[Any] = NETWORK_LIST_COLUMNS,
+) -> List[Row]:
+    return db.execute(networks_page_statement(skip, limit, after, columns)).all()
 
-def get_network(db: Session, network_id: int) -> Optional[models.Network]:
-    return db.query(models.Network).filter(models.Network.id == network_id).first()
 
+def networks_page_statement(
+    skip: int, limit: int, after: Optional[int], columns: Sequence[Any] = NETWORK_LIST_COLUMNS
+) -> Select:
+    statement = select(*columns).order_by(models.Network.id)
+    if after is not None:
+        statement = statement.where(models.Network.id > after)
+    return statement.offset(skip).limit(limit)
 
-def get_networks(db: Session, skip: int = 0, limit: int = 100) -> List[models.Network]:
-    return db.query(models.Network).offset(skip).limit(limit).all()
 
+def export_networks_statement() -> Select:
+    return select(models.Network.id, models.Network.ipv4).order_by(models.Network.id)
 
-def create_network(db: Session, network: schemas.NetworkCreate) -> models.Network:
+
+def create_network(db: Session, network: schemas.NetworkCreate) -> Row:
     try:
-        db_network = models.Network(ipv4=network.ipv4)
-        db.add(db_network)
+        statement = (
+            insert(models.Network)
+            .values(ipv4=network.ipv4)
+            .returning(*NETWORK_COLUMNS)
+        )
+        db_network = db.execute(statement).one()
         db.commit()
-        db.refresh(db_network)
+        count_cache.invalidate("network")
+        network_index.add(db_network.id, db_network.ipv4)
         return db_network
     except IntegrityError:
         db.rollback()
         raise HTTPException(status_code=400, detail="Network IPv4 already exists")
 
 
-def update_network(db: Session, network_id: int, network: schemas.NetworkCreate) -> Optional[models.Network]:
+def make_network_row(ipv4: Optional[str]) -> Dict[str, Any]:
+    return {"ipv4": ipv4}
+
+
+def create_networks(
+    db: Session, networks: List[schemas.NetworkCreate]
+) -> List[Union[Row, HTTPException]]:
+    addresses = [network.ipv4 for network in networks]
+    statement = coalesced_insert_statement(
+        models.Network, NETWORK_COLUMNS, addresses, make_network_row
+    )
+    rows = db.execute(statement).all()
+    db.commit()
+    count_cache.invalidate("network")
+    for row in rows:
+        network_index.add(row.id, row.ipv4)
+    return coalesced_results(addresses, rows, "Network IPv4 already exists")
+
+
+def bulk_create_networks(db: Session, items: List[Any]) -> List[schemas.NetworkBulkResult]:
+    results, grouped = _group_bulk_items(
+        items, schemas.NetworkCreate, schemas.NetworkBulkResult, "ipv4"
+    )
+    # NULL addresses never conflict with each other, so every one of them is a new row
+    nulls = grouped.pop(None, [])
+    for start in range(0, len(nulls), BULK_BATCH_SIZE):
+        batch = nulls[start:start + BULK_BATCH_SIZE]
+        statement = (
+            insert(models.Network)
+            .values([{"ipv4": None}] * len(batch))
+            .returning(models.Network.id)
+        )
+        for result, network_id in zip(batch, db.execute(statement).scalars()):
+            result.status = schemas.BulkItemStatus.created
+            result.id = network_id
+    _bulk_insert(db, models.Network, models.Network.ipv4, grouped, make_network_row)
+    db.commit()
+    count_cache.invalidate("network")
+    for ipv4, group in grouped.items():
+        if group[0].id is not None:
+            network_index.add(group[0].id, ipv4)
+    return results
+
+
+def update_network(db: Session, network_id: int, network: schemas.NetworkCreate) -> Optional[Row]:
     try:
-        db_network = get_network(db, network_id)
-        if db_network:
-            db_network.ipv4 = network.ipv4
-            db.commit()
-            db.refresh(db_network)
+        statement = (
+            update(models.Network)
+            .where(models.Network.id == network_id)
+            .values(ipv4=network.ipv4, version=models.Network.version + 1)
+            .returning(*NETWORK_COLUMNS)
+            .execution_options(synchronize_session=False)
+        )
+        db_network = db.execute(statement).first()
+        db.commit()
+        entity_cache.invalidate(entity_key("network", network_id))
+        if db_network is not None:
+            network_index.add(network_id, db_network.ipv4)
         return db_network
     except IntegrityError:
         db.rollback()
@@ -91,9 +428,273 @@ def update_network(db: Session, network_id: int, network: schemas.NetworkCreate)
 
 
 def delete_network(db: Session, network_id: int) -> bool:
-    db_network = get_network(db, network_id)
-    if db_network:
-        db.delete(db_network)
-        db.commit()
-        return True
-    return False
\ No newline at end of file
+    statement = (
+        delete(models.Network)
+        .where(models.Network.id == network_id)
+        .returning(models.Network.id)
+        .execution_options(synchronize_session=False)
+    )
+    deleted = db.execute(statement).first() is not None
+    db.commit()
+    entity_cache.invalidate(entity_key("network", network_id))
+    count_cache.invalidate("network")
+    network_index.discard(network_id)
+    return deleted
+
+
+def get_clients_with_networks(
+    db: Session, limit: int = 100, after: Optional[UUID] = None
+) -> List[models.Client]:
+    # One query for the page of clients and one for all of their networks, whatever the page size
+    query = (
+        db.query(models.Client)
+        .options(selectinload(models.Client.networks))
+        .order_by(models.Client.id)
+    )
+    if after is not None:
+        query = query.filter(models.Client.id > after)
+    return query.limit(limit).all()
+
+
+def get_client_networks(db: Session, client_id: str) -> Optional[List[models.Network]]:
+    client_uuid = parse_uuid(client_id)
+    if client_uuid is None:
+        return None
+    db_client = (
+        db.query(models.Client)
+        .options(joinedload(models.Client.networks))
+        .filter(models.Client.id == client_uuid)
+        .first()
+    )
+    return None if db_client is None else db_client.networks
+
+
+def get_network_clients(db: Session, network_id: int) -> Optional[List[models.Client]]:
+    db_network = (
+        db.query(models.Network)
+        .options(joinedload(models.Network.clients))
+        .filter(models.Network.id == network_id)
+        .first()
+    )
+    return None if db_network is None else db_network.clients
+
+
+def attach_networks(db: Session, client_id: str, network_ids: List[int]) -> Optional[List[int]]:
+    client_uuid = parse_uuid(client_id)
+    if client_uuid is None:
+        return None
+    # Links to unknown networks are skipped and existing links are left alone
+    pairs = (
+        select(models.Client.id, models.Network.id)
+        .join(models.Network, true())
+        .where(models.Client.id == client_uuid, models.Network.id.in_(network_ids))
+    )
+    statement = (
+        insert(models.ClientNetwork)
+        .from_select(["client_id", "network_id"], pairs)
+        .on_conflict_do_nothing(index_elements=["client_id", "network_id"])
+        .returning(models.ClientNetwork.network_id)
+    )
+    attached = db.execute(statement).scalars().all()
+    if not attached and not _client_exists(db, client_uuid):
+        db.rollback()
+        return None
+    db.commit()
+    return sorted(attached)
+
+
+def detach_networks(db: Session, client_id: str, network_ids: List[int]) -> Optional[List[int]]:
+    client_uuid = parse_uuid(client_id)
+    if client_uuid is None:
+        return None
+    statement = (
+        delete(models.ClientNetwork)
+        .where(
+            models.ClientNetwork.client_id == client_uuid,
+            models.ClientNetwork.network_id.in_(network_ids),
+        )
+        .returning(models.ClientNetwork.network_id)
+        .execution_options(synchronize_session=False)
+    )
+    detached = db.execute(statement).scalars().all()
+    if not detached and not _client_exists(db, client_uuid):
+        db.rollback()
+        return None
+    db.commit()
+    return sorted(detached)
+
+
+def _client_exists(db: Session, client_uuid: UUID) -> bool:
+    statement = select(models.Client.id).where(models.Client.id == client_uuid)
+    return db.execute(statement).first() is not None
+
+
+def export_client_networks_statement() -> Select:
+    return select(
+        models.ClientNetwork.id, models.ClientNetwork.client_id, models.ClientNetwork.network_id
+    ).order_by(models.ClientNetwork.id)
+
+
+def get_networks_containing(db: Session, ip: IPv4Address) -> List[models.Network]:
+    # Most specific first; uses the GiST index on ipv4
+    return (
+        db.query(models.Network)
+        .filter(models.Network.ipv4.op(">>=")(str(ip)))
+        .order_by(func.masklen(models.Network.ipv4).desc())
+        .all()
+    )
+
+
+def lookup_network(db: Session, ip: IPv4Address) -> Optional[Tuple[int, str]]:
+    statement = (
+        select(models.Network.id, models.Network.ipv4)
+        .where(models.Network.ipv4.is_not(None))
+        .execution_options(yield_per=10000)
+    )
+    network_index.ensure_loaded(lambda: db.execute(statement).tuples())
+    return network_index.lookup(ip)
+
+
+def get_network_prefixes(db: Session) -> Iterable[Tuple[int, int, int]]:
+    # (id, network address as an integer, prefix length) of every network, computed by Postgres so
+    # that no address is parsed in Python
+    statement = select(
+        models.Network.id,
+        models.Network.ipv4.op("-", return_type=BigInteger)(cast("0.0.0.0", INET)),
+        func.masklen(models.Network.ipv4),
+    ).where(models.Network.ipv4.is_not(None))
+    return db.execute(statement.execution_options(yield_per=10000)).tuples()
+
+
+def get_changes(db: Session, after: Optional[Tuple[int, int]], limit: int) -> List[models.Change]:
+    # Transactions older than the oldest running one have all committed or aborted, so their
+    # changes are final; later ones wait until everything before them has finished
+    oldest_running = cast(cast(func.pg_snapshot_xmin(func.pg_current_snapshot()), Text), BigInteger)
+    query = db.query(models.Change).filter(models.Change.xid < oldest_running)
+    if after is not None:
+        query = query.filter(tuple_(models.Change.xid, models.Change.id) > after)
+    return query.order_by(models.Change.xid, models.Change.id).limit(limit).all()
+
+
+def warm_up_queries(db: Session) -> None:
+    # Compile the hot read statements once so that the first requests find them in the statement
+    # cache
+    get_client(db, str(uuid4()))
+    get_clients(db, limit=1)
+    get_network(db, 0)
+    get_networks(db, limit=1)
+    db.rollback()
+
+
+def cached_entities(table: str, ids: List[Any]) -> Tuple[Dict[Any, Row], List[Any], int]:
+    generation = entity_cache.generation
+    found: Dict[Any, Row] = {}
+    misses = []
+    for entity_id in ids:
+        row = entity_cache.get(entity_key(table, entity_id))
+        if row is None:
+            misses.append(entity_id)
+        else:
+            found[entity_id] = row
+    return found, misses, generation
+
+
+def by_ids_statement(model: type, columns: Sequence[Any], ids: List[Any]) -> Select:
+    # A single array parameter rather than one bind per id, so every batch size shares one statement
+    ids_param = bindparam("ids", ids, type_=ARRAY(model.id.type))
+    return select(*columns).where(model.id == any_(ids_param))
+
+
+def cache_entities(
+    db: Any, table: str, rows: List[Row], generation: int, found: Dict[Any, Row]
+) -> None:
+    # Rows read from a lagging replica could undo an invalidation, so only primary reads are cached
+    replica = db.info.get("replica", False)
+    for row in rows:
+        found[row.id] = row
+        if not replica:
+            entity_cache.set(entity_key(table, row.id), row, generation)
+
+
+def split_found(ids: List[Any], found: Dict[Any, Row]) -> Tuple[List[Row], List[Any]]:
+    return [found[i] for i in ids if i in found], [i for i in ids if i not in found]
+
+
+def coalesced_insert_statement(
+    model: type, columns: Sequence[Any], keys: List[Any], make_row: Callable[[Any], Dict[str, Any]]
+) -> Insert:
+    # One row per distinct key, as the unique constraint would allow; NULLs never conflict. The
+    # key is the second of `columns`.
+    key_column = columns[1]
+    distinct = list(dict.fromkeys(key for key in keys if key is not None))
+    distinct += [None] * (len(keys) - sum(key is not None for key in keys))
+    return (
+        insert(model)
+        .values([make_row(key) for key in distinct])
+        .on_conflict_do_nothing(index_elements=[key_column])
+        .returning(*columns)
+    )
+
+
+def coalesced_results(
+    keys: List[Any], rows: List[Row], detail: str
+) -> List[Union[Row, HTTPException]]:
+    # Of several creates for the same key only the first gets the row; the others fail as a
+    # single create would if it committed after the first. Keys are compared as text because
+    # asyncpg returns cidr values as IPv4Network.
+    created = {str(row[1]): row for row in rows if row[1] is not None}
+    nulls = iter([row for row in rows if row[1] is None])
+    results: List[Union[Row, HTTPException]] = []
+    for key in keys:
+        row = next(nulls) if key is None else created.pop(str(key), None)
+        results.append(row if row is not None else HTTPException(status_code=400, detail=detail))
+    return results
+
+
+def _group_bulk_items(
+    items: List[Any], create_schema: type, result_type: type, key: str
+) -> Tuple[List[schemas.BulkItemResult], Dict[Any, List[schemas.BulkItemResult]]]:
+    # Every valid item starts out as a duplicate; _bulk_insert promotes the first one per key that
+    # actually gets inserted
+    results = [
+        result_type(index=index, status=schemas.BulkItemStatus.duplicate)
+        for index in range(len(items))
+    ]
+    grouped: Dict[Any, List[schemas.BulkItemResult]] = {}
+    for result, item in zip(results, items):
+        try:
+            value = getattr(create_schema.model_validate(item), key)
+        except ValidationError as e:
+            result.status = schemas.BulkItemStatus.invalid
+            result.detail = e.errors()[0]["msg"]
+            continue
+        grouped.setdefault(value, []).append(result)
+    return results, grouped
+
+
+def _bulk_insert(
+    db: Session,
+    model: type,
+    key_column: Any,
+    grouped: Dict[Any, List[schemas.BulkItemResult]],
+    make_row: Callable[[Any], Dict[str, Any]],
+) -> None:
+    keys = list(grouped)
+    for start in range(0, len(keys), BULK_BATCH_SIZE):
+        batch = keys[start:start + BULK_BATCH_SIZE]
+        statement = (
+            insert(model)
+            .values([make_row(key) for key in batch])
+            .on_conflict_do_nothing(index_elements=[key_column])
+            .returning(key_column, model.id)
+        )
+        ids = dict(db.execute(statement).tuples().all())
+        for key in ids:
+            grouped[key][0].status = schemas.BulkItemStatus.created
+        existing = [key for key in batch if key not in ids]
+        if existing:
+            lookup = select(key_column, model.id).where(key_column.in_(existing))
+            ids.update(db.execute(lookup).tuples().all())
+        for key in batch:
+            for result in grouped[key]:
+                result.id = ids.get(key)
@@ -0,0 +1,29 @@
+import hashlib
+from typing import Any, Iterable, Optional
+
+from fastapi import Response
+
+
+def make_etag(version: int) -> str:
+    return f'"{version}"'
+
+
+def rows_etag(rows: Iterable[Any]) -> str:
+    # For responses built from a few known rows, such as multi-gets
+    versions = ",".join(f"{row.id}:{row.version}" for row in rows)
+    digest = hashlib.blake2b(versions.encode(), digest_size=8)
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    # If-None-Match uses the weak comparison: W/"1" matches "1"
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = if_none_match.split(",")
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in candidates)
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
@@ -0,0 +1,61 @@
+import csv
+import io
+import json
+from typing import Callable, Iterator, List, Sequence
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select
+from sqlalchemy.orm import Session
+
+from .schemas import ExportFormat
+
+# Rows fetched per round trip from the server-side cursor, and emitted per response chunk
+EXPORT_BATCH_SIZE = 1000
+
+MEDIA_TYPES = {
+    ExportFormat.ndjson: "application/x-ndjson",
+    ExportFormat.csv: "text/csv",
+}
+
+
+def export_response(
+    session_factory: Callable[[], Session],
+    statement: Select,
+    export_format: ExportFormat,
+    name: str,
+) -> StreamingResponse:
+    return StreamingResponse(
+        stream_rows(session_factory, statement, export_format),
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{export_format.value}"'},
+    )
+
+
+def stream_rows(
+    session_factory: Callable[[], Session], statement: Select, export_format: ExportFormat
+) -> Iterator[str]:
+    # The generator owns its session: request-scoped dependencies are torn down before a
+    # streaming body is sent
+    columns = [column.key for column in statement.selected_columns]
+    if export_format == ExportFormat.csv:
+        yield _encode_csv([columns])
+    db = session_factory()
+    try:
+        result = db.execute(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        for rows in result.partitions():
+            if export_format == ExportFormat.csv:
+                yield _encode_csv(rows)
+            else:
+                yield _encode_ndjson(columns, rows)
+    finally:
+        db.close()
+
+
+def _encode_csv(rows: Sequence[Sequence]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+
+def _encode_ndjson(columns: List[str], rows: Sequence[Sequence]) -> str:
+    return "".join(json.dumps(dict(zip(columns, row)), default=str) + "\n" for row in rows)
@@ -0,0 +1,34 @@
+import os
+import threading
+import time
+import uuid
+from uuid import UUID
+
+_lock = threading.Lock()
+_last_ms = 0
+_counter = 0
+
+
+def _uuid7() -> UUID:
+    # RFC 9562 UUIDv7: 48-bit Unix milliseconds, then a 12-bit counter in rand_a so ids generated
+    # in the same millisecond still sort in creation order, then 62 random bits
+    global _last_ms, _counter
+    with _lock:
+        ms = time.time_ns() // 1_000_000
+        if ms > _last_ms:
+            _last_ms = ms
+            # Start low in the counter space so that many ids fit in one millisecond
+            _counter = int.from_bytes(os.urandom(2)) & 0x1FF
+        else:
+            # Same millisecond, or the clock went backwards: keep counting from the last id
+            _counter += 1
+            if _counter > 0xFFF:
+                _last_ms += 1
+                _counter = 0
+        ms, counter = _last_ms, _counter
+    rand_b = int.from_bytes(os.urandom(8)) & ((1 << 62) - 1)
+    return UUID(int=(ms << 80) | (0x7 << 76) | (counter << 64) | (0b10 << 62) | rand_b)
+
+
+# Python 3.14+ ships a monotonic uuid7
+uuid7 = getattr(uuid, "uuid7", _uuid7)
@@ -0,0 +1,294 @@
+"""Bulk load clients, networks or client-network links from CSV or NDJSON files.
+
+    python -m copilot_integration_example.load clients clients.csv
+    python -m copilot_integration_example.load networks networks.ndjson
+    python -m copilot_integration_example.load links client_networks.csv
+
+Files use the columns of the export endpoints (clients: id, name; networks: id, ipv4; links:
+client_id, network_id); ids are optional for clients and networks. Rows are validated and
+streamed with COPY into a temporary staging table, then merged into the real table in the same
+transaction, skipping rows that conflict with existing rows or with earlier rows of the file.
+Memory use does not depend on the size of the file.
+"""
+
+import argparse
+import csv
+import io
+import json
+import logging
+import os
+import sys
+import time
+from ipaddress import IPv4Network
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Optional,
+    Sequence,
+    TextIO,
+    Tuple,
+    Union,
+)
+from uuid import UUID
+
+from sqlalchemy import Engine
+
+from .ids import uuid7
+from .notifications import ENTITY_CHANNEL, RESET_PAYLOAD
+
+logger = logging.getLogger(__name__)
+
+# Seconds between progress lines
+PROGRESS_INTERVAL = 2.0
+# Rejected rows reported individually; the rest are only counted
+MAX_REPORTED_ERRORS = 20
+
+
+class LoadTarget(NamedTuple):
+    table: str
+    # Temporary table the file is copied into
+    staging: str
+    staging_columns: str
+    convert: Callable[[Dict[str, Any]], Tuple]
+    merge: str
+
+
+class LoadStats:
+    def __init__(self):
+        self.read = 0
+        self.rejected = 0
+        self.inserted = 0
+        self.elapsed = 0.0
+
+    @property
+    def skipped(self) -> int:
+        return self.read - self.rejected - self.inserted
+
+
+def convert_client(record: Dict[str, Any]) -> Tuple:
+    name = record.get("name")
+    if not isinstance(name, str) or not name:
+        raise ValueError("name is required")
+    client_id = record.get("id")
+    return (uuid7() if client_id in (None, "") else UUID(str(client_id))), name
+
+
+def convert_network(record: Dict[str, Any]) -> Tuple:
+    network_id = record.get("id")
+    ipv4 = record.get("ipv4")
+    return (
+        None if network_id in (None, "") else int(network_id),
+        # Same normalization as the API: host bits are an error, a bare address is a /32
+        None if ipv4 in (None, "") else str(IPv4Network(str(ipv4))),
+    )
+
+
+def convert_link(record: Dict[str, Any]) -> Tuple:
+    return UUID(str(record["client_id"])), int(record["network_id"])
+
+
+# A sequential scan of a temporary table returns rows in COPY order (temporary tables are never
+# scanned in parallel), so the first occurrence of a duplicate in the file is the one inserted
+TARGETS = {
+    "clients": LoadTarget(
+        table="client",
+        staging="client_load",
+        staging_columns="id uuid NOT NULL, name text NOT NULL",
+        convert=convert_client,
+        merge=(
+            "INSERT INTO client (id, name) SELECT id, name FROM client_load ON CONFLICT DO NOTHING"
+        ),
+    ),
+    "networks": LoadTarget(
+        table="network",
+        staging="network_load",
+        staging_columns="id integer, ipv4 cidr",
+        convert=convert_network,
+        merge=(
+            "INSERT INTO network (id, ipv4) "
+            "SELECT COALESCE(id, nextval(pg_get_serial_sequence('network', 'id'))), ipv4 "
+            "FROM network_load "
+            "ON CONFLICT DO NOTHING"
+        ),
+    ),
+    "links": LoadTarget(
+        table="client_network",
+        staging="client_network_load",
+        staging_columns="client_id uuid NOT NULL, network_id integer NOT NULL",
+        convert=convert_link,
+        # Links to unknown clients or networks are skipped like duplicates
+        merge=(
+            "INSERT INTO client_network (client_id, network_id) "
+            "SELECT l.client_id, l.network_id FROM client_network_load l "
+            "WHERE EXISTS (SELECT 1 FROM client c WHERE c.id = l.client_id) "
+            "AND EXISTS (SELECT 1 FROM network n WHERE n.id = l.network_id) "
+            "ON CONFLICT DO NOTHING"
+        ),
+    ),
+}
+
+# Explicit network ids from the file must not be handed out again by the sequence; never moves it
+# back
+SYNC_NETWORK_SEQUENCE = (
+    "SELECT setval(pg_get_serial_sequence('network', 'id'), "
+    "GREATEST((SELECT max(id) FROM network), nextval(pg_get_serial_sequence('network', 'id'))))"
+)
+
+
+def read_records(file: TextIO, file_format: str) -> Iterator[Union[Dict[str, Any], ValueError]]:
+    # Malformed lines are yielded as their error so that the rest of the file can still be read
+    if file_format == "csv":
+        yield from csv.DictReader(file)
+        return
+    for line in file:
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                yield e
+
+
+class CopyStream:
+    """File-like object producing COPY ... (FORMAT csv) input from validated records on demand."""
+
+    def __init__(
+        self,
+        records: Iterable[Union[Dict[str, Any], ValueError]],
+        convert: Callable[[Dict[str, Any]], Tuple],
+        stats: LoadStats,
+        progress: Callable[[], None],
+    ):
+        self._records = iter(records)
+        self._convert = convert
+        self._stats = stats
+        self._progress = progress
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+        self._pending = ""
+        self._exhausted = False
+
+    def read(self, size: int = -1) -> str:
+        while not self._exhausted and (size < 0 or len(self._pending) < size):
+            self._fill()
+        if size < 0:
+            chunk, self._pending = self._pending, ""
+        else:
+            chunk, self._pending = self._pending[:size], self._pending[size:]
+        return chunk
+
+    def _fill(self) -> None:
+        converted = 0
+        while converted < 1000:
+            record = next(self._records, None)
+            if record is None:
+                self._exhausted = True
+                break
+            self._stats.read += 1
+            try:
+                if isinstance(record, ValueError):
+                    raise record
+                row = self._convert(record)
+            except (AttributeError, KeyError, TypeError, ValueError) as e:
+                self._reject(e)
+                continue
+            self._writer.writerow(row)
+            converted += 1
+        self._progress()
+        self._pending += self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+
+    def _reject(self, error: Exception) -> None:
+        self._stats.rejected += 1
+        if self._stats.rejected <= MAX_REPORTED_ERRORS:
+            logger.warning("Rejected record %d: %s", self._stats.read, error)
+        elif self._stats.rejected == MAX_REPORTED_ERRORS + 1:
+            logger.warning("Further rejected records are only counted")
+
+
+def load_file(
+    engine: Engine, kind: str, file: TextIO, file_format: str, progress_out: Optional[TextIO] = None
+) -> LoadStats:
+    target = TARGETS[kind]
+    stats = LoadStats()
+    start = last_report = time.perf_counter()
+
+    def progress() -> None:
+        nonlocal last_report
+        now = time.perf_counter()
+        if progress_out is not None and now - last_report >= PROGRESS_INTERVAL:
+            last_report = now
+            rate = stats.read / (now - start)
+            print(
+                f"{kind}: {stats.read:,} rows read, {rate:,.0f} rows/s",
+                file=progress_out,
+                flush=True,
+            )
+
+    stream = CopyStream(read_records(file, file_format), target.convert, stats, progress)
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        # Triggers would otherwise queue one notification per inserted row
+        cursor.execute("SET LOCAL app.suppress_notify = 'on'")
+        cursor.execute(
+            f"CREATE TEMPORARY TABLE {target.staging} ({target.staging_columns}) ON COMMIT DROP"
+        )
+        cursor.copy_expert(f"COPY {target.staging} FROM STDIN WITH (FORMAT csv)", stream)
+        cursor.execute(target.merge)
+        stats.inserted = cursor.rowcount
+        if kind == "networks":
+            cursor.execute(SYNC_NETWORK_SEQUENCE)
+        cursor.execute("SELECT pg_notify(%s, %s)", (ENTITY_CHANNEL, RESET_PAYLOAD))
+        raw.commit()
+        # Fresh planner statistics, which also feed the list totals
+        cursor.execute(f"ANALYZE {target.table}")
+        raw.commit()
+    finally:
+        raw.close()
+    stats.elapsed = time.perf_counter() - start
+    return stats
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m copilot_integration_example.load", description=__doc__.split("\n")[0]
+    )
+    parser.add_argument("kind", choices=sorted(TARGETS))
+    parser.add_argument("file", help="path to a .csv or .ndjson file, or - for standard input")
+    parser.add_argument(
+        "--format", choices=["csv", "ndjson"], help="defaults to the file extension"
+    )
+    args = parser.parse_args(argv)
+
+    file_format = args.format
+    if file_format is None:
+        extension = os.path.splitext(args.file)[1].lstrip(".").lower()
+        if extension not in ("csv", "ndjson", "jsonl"):
+            parser.error("cannot tell the format from the file name, pass --format")
+        file_format = "csv" if extension == "csv" else "ndjson"
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    from .database import engine
+
+    if args.file == "-":
+        stats = load_file(engine, args.kind, sys.stdin, file_format, sys.stderr)
+    else:
+        with open(args.file, newline="", encoding="utf-8") as file:
+            stats = load_file(engine, args.kind, file, file_format, sys.stderr)
+    rate = stats.read / stats.elapsed if stats.elapsed else 0
+    print(
+        f"{args.kind}: {stats.read:,} rows read, {stats.inserted:,} inserted, "
+        f"{stats.skipped:,} skipped, {stats.rejected:,} rejected "
+        f"in {stats.elapsed:.1f}s ({rate:,.0f} rows/s)",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
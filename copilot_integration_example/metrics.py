@@ -0,0 +1,222 @@
+import bisect
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, DefaultDict, Dict, Iterable, List, Tuple
+
+from fastapi import FastAPI
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+from starlette.exceptions import HTTPException
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .cache import entity_cache
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        # counts[i] holds observations <= buckets[i] and > buckets[i - 1]; the last slot is +Inf
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def merge(self, other: "Histogram") -> None:
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        self.sum += other.sum
+
+
+class RouteMetrics:
+    def __init__(self):
+        self.in_progress = 0
+        self.latency = Histogram()
+        self.responses: DefaultDict[int, int] = defaultdict(int)
+
+
+# (method, route template) -> metrics. Only updated from the event loop thread, which runs every
+# route handler's ASGI app (sync endpoints are offloaded further down), so no lock is needed.
+route_metrics: DefaultDict[Tuple[str, str], RouteMetrics] = defaultdict(RouteMetrics)
+
+
+def instrument_routes(app: FastAPI) -> None:
+    # Wrap each route's handler so the route template is known before the endpoint runs; requests
+    # that match no route are counted under UNMATCHED_ROUTE
+    for route in app.router.routes:
+        if hasattr(route, "path"):
+            route.handle = _timed(route.handle, route.path)
+    app.router.default = _timed(app.router.default, UNMATCHED_ROUTE)
+
+
+def _timed(handle: Callable, template: str) -> ASGIApp:
+    async def timed_handle(scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await handle(scope, receive, send)
+            return
+        metrics = route_metrics[scope["method"], template]
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        metrics.in_progress += 1
+        start = time.perf_counter()
+        try:
+            await handle(scope, receive, send_with_status)
+        except HTTPException as e:
+            status = e.status_code
+            raise
+        finally:
+            metrics.latency.observe(time.perf_counter() - start)
+            metrics.responses[status] += 1
+            metrics.in_progress -= 1
+
+    return timed_handle
+
+
+class PoolWaitTimer:
+    """Record how long each connection checkout waits, in one histogram per thread.
+
+    Checkouts happen on many threadpool threads at once; per-thread histograms keep them from
+    contending on a lock and are summed when scraped.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._wait_local = threading.local()
+        self._wait_histograms: List[Histogram] = []
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            histogram = getattr(self._wait_local, "histogram", None)
+            if histogram is None:
+                histogram = self._wait_local.histogram = Histogram()
+                self._wait_histograms.append(histogram)
+            histogram.observe(time.perf_counter() - start)
+
+    def wait_histogram(self) -> Histogram:
+        total = Histogram()
+        for histogram in list(self._wait_histograms):
+            total.merge(histogram)
+        return total
+
+
+class TimedQueuePool(PoolWaitTimer, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(PoolWaitTimer, AsyncAdaptedQueuePool):
+    pass
+
+
+def render_metrics(pools: Dict[str, Pool], admission_budgets: Iterable[Any] = ()) -> str:
+    lines: List[str] = []
+
+    lines += _header("http_requests_in_progress", "gauge", "Requests currently being handled")
+    for (method, route), metrics in sorted(route_metrics.items()):
+        labels = {"method": method, "route": route}
+        lines.append(_sample("http_requests_in_progress", labels, metrics.in_progress))
+
+    lines += _header("http_requests_total", "counter", "Responses sent, by status code")
+    for (method, route), metrics in sorted(route_metrics.items()):
+        for status, count in sorted(metrics.responses.items()):
+            labels = {"method": method, "route": route, "status": str(status)}
+            lines.append(_sample("http_requests_total", labels, count))
+
+    lines += _header("http_request_duration_seconds", "histogram", "Time spent handling requests")
+    for (method, route), metrics in sorted(route_metrics.items()):
+        labels = {"method": method, "route": route}
+        lines += _histogram("http_request_duration_seconds", labels, metrics.latency)
+
+    gauges: Iterable[Tuple[str, str, Callable[[QueuePool], int]]] = (
+        ("db_pool_size", "Connections the pool keeps open", lambda pool: pool.size()),
+        ("db_pool_checked_out", "Connections in use", lambda pool: pool.checkedout()),
+        ("db_pool_checked_in", "Idle connections in the pool", lambda pool: pool.checkedin()),
+        ("db_pool_overflow", "Connections open beyond the pool size", lambda pool: pool.overflow()),
+    )
+    queue_pools = {name: pool for name, pool in pools.items() if isinstance(pool, QueuePool)}
+    for metric, description, read in gauges:
+        lines += _header(metric, "gauge", description)
+        for name, pool in queue_pools.items():
+            lines.append(_sample(metric, {"pool": name}, read(pool)))
+
+    lines += _header("db_pool_wait_seconds", "histogram", "Time spent waiting for a connection")
+    for name, pool in pools.items():
+        if isinstance(pool, PoolWaitTimer):
+            lines += _histogram("db_pool_wait_seconds", {"pool": name}, pool.wait_histogram())
+
+    budgets = sorted(admission_budgets, key=lambda budget: (budget.router, budget.kind))
+    admission_gauges: Iterable[Tuple[str, str, Callable[[Any], int]]] = (
+        (
+            "admission_in_flight",
+            "Requests admitted and not finished",
+            lambda budget: budget.in_flight,
+        ),
+        ("admission_queued", "Requests waiting for admission", lambda budget: budget.queued),
+        ("admission_limit", "Requests admitted at once", lambda budget: budget.limit),
+    )
+    for metric, description, read in admission_gauges:
+        lines += _header(metric, "gauge", description)
+        for budget in budgets:
+            labels = {"router": budget.router, "kind": budget.kind}
+            lines.append(_sample(metric, labels, read(budget)))
+    lines += _header(
+        "admission_rejected_total", "counter", "Requests turned away with 503, by reason"
+    )
+    for budget in budgets:
+        for reason, count in sorted(budget.rejected.items()):
+            labels = {"router": budget.router, "kind": budget.kind, "reason": reason}
+            lines.append(_sample("admission_rejected_total", labels, count))
+    lines += _header(
+        "admission_queue_wait_seconds", "histogram", "Time spent waiting for admission"
+    )
+    for budget in budgets:
+        labels = {"router": budget.router, "kind": budget.kind}
+        lines += _histogram("admission_queue_wait_seconds", labels, budget.queue_wait)
+
+    for key, value in entity_cache.stats().items():
+        metric_type = "gauge" if key in ("size", "maxsize") else "counter"
+        metric = f"entity_cache_{key}" if metric_type == "gauge" else f"entity_cache_{key}_total"
+        lines += _header(metric, metric_type, f"Entity cache {key}")
+        lines.append(_sample(metric, {}, value))
+
+    return "\n".join(lines) + "\n"
+
+
+def _header(metric: str, metric_type: str, description: str) -> List[str]:
+    return [f"# HELP {metric} {description}", f"# TYPE {metric} {metric_type}"]
+
+
+def _sample(metric: str, labels: Dict[str, str], value: float) -> str:
+    if not labels:
+        return f"{metric} {value}"
+    rendered = ",".join(f'{key}="{_escape(label)}"' for key, label in labels.items())
+    return f"{metric}{{{rendered}}} {value}"
+
+
+def _histogram(metric: str, labels: Dict[str, str], histogram: Histogram) -> List[str]:
+    lines = []
+    cumulative = 0
+    for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+        cumulative += count
+        le = "+Inf" if bound == float("inf") else repr(bound)
+        lines.append(_sample(f"{metric}_bucket", {**labels, "le": le}, cumulative))
+    lines.append(_sample(f"{metric}_sum", labels, histogram.sum))
+    lines.append(_sample(f"{metric}_count", labels, cumulative))
+    return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
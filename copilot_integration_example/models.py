@@ -1,22 +1,83 @@
-from sqlalchemy import Column, ForeignKey, Integer, String, Text, UniqueConstraint
-from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import declarative_base
+from sqlalchemy import (
+    DDL,
+    BigInteger,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    SmallInteger,
+    Text,
+    UniqueConstraint,
+    event,
+    func,
+    text,
+)
+from sqlalchemy.dialects.postgresql import CIDR, JSONB, UUID
+from sqlalchemy.orm import declarative_base, relationship
+from .ids import uuid7
+from .notifications import CHANGES_CHANNEL, ENTITY_CHANNEL
 
 Base = declarative_base()
 
+# Counter rows per table in table_version; concurrent writers only wait for each other when their
+# backends map to the same shard
+TABLE_VERSION_SHARDS = 16
+
 
 class Client(Base):
     __tablename__ = "client"
 
-    id = Column(UUID, primary_key=True)
+    # Time-ordered, so new rows append to the right edge of the primary key index
+    id = Column(UUID, primary_key=True, default=uuid7)
     name = Column(Text, nullable=False, unique=True)
+    # Incremented by every update; the item's ETag
+    version = Column(Integer, nullable=False, server_default=text("1"))
+
+    # Read-only: links are written with bulk statements on client_network
+    networks = relationship(
+        "Network",
+        secondary="client_network",
+        order_by="Network.id",
+        viewonly=True,
+        back_populates="clients",
+    )
+
+    # Case-insensitive prefix search (lower(name) LIKE 'abc%'); substring and fuzzy search use the
+    # pg_trgm index created below
+    __table_args__ = (
+        Index(
+            "ix_client_name_prefix",
+            func.lower(name).label("lower_name"),
+            postgresql_ops={"lower_name": "text_pattern_ops"},
+        ),
+    )
 
 
 class Network(Base):
     __tablename__ = "network"
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    ipv4 = Column(String(18), unique=True)
+    ipv4 = Column(CIDR, unique=True)
+    version = Column(Integer, nullable=False, server_default=text("1"))
+
+    clients = relationship(
+        "Client",
+        secondary="client_network",
+        order_by="Client.id",
+        viewonly=True,
+        back_populates="networks",
+    )
+
+    # Answers containment queries (ipv4 >>= address) without a sequential scan
+    __table_args__ = (
+        Index(
+            "ix_network_ipv4_gist",
+            "ipv4",
+            postgresql_using="gist",
+            postgresql_ops={"ipv4": "inet_ops"},
+        ),
+    )
 
 
 class ClientNetwork(Base):
@@ -26,4 +87,199 @@ class ClientNetwork(Base):
     client_id = Column(UUID, ForeignKey("client.id", ondelete="CASCADE"), nullable=False)
     network_id = Column(Integer, ForeignKey("network.id", ondelete="CASCADE"), nullable=False)
 
-    __table_args__ = (UniqueConstraint("client_id", "network_id"),)
+    __table_args__ = (
+        UniqueConstraint("client_id", "network_id"),
+        # The unique constraint covers lookups by client_id only
+        Index("ix_client_network_network_id", "network_id"),
+    )
+
+
+class TableVersion(Base):
+    __tablename__ = "table_version"
+
+    # Incremented by a statement trigger on every write that changes rows of the table, in the
+    # shard of the writing backend; the sum over the shards is the ETag of its list pages
+    table_name = Column(Text, primary_key=True)
+    shard = Column(SmallInteger, primary_key=True)
+    version = Column(BigInteger, nullable=False)
+
+
+class Change(Base):
+    """Append-only outbox of every committed write to client, network and client_network.
+
+    Rows are written by statement triggers in the writing transaction. `xid` is that
+    transaction's id: the feed orders by (xid, id) and only returns rows of transactions older
+    than every one still running, so a reader can never skip a change that commits late.
+    """
+
+    __tablename__ = "change"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    xid = Column(BigInteger, nullable=False)
+    table_name = Column(Text, nullable=False)
+    op = Column(Text, nullable=False)
+    entity_id = Column(Text, nullable=False)
+    # The row after an insert or update, before a delete
+    data = Column(JSONB, nullable=False)
+    changed_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    __table_args__ = (Index("ix_change_xid_id", "xid", "id"),)
+
+
+# Publish "<table>:<id>" after every committed change so that other workers can drop their cached
+# copies. Inserted and updated networks carry their cidr as "network:<id>:<ipv4>" (empty when
+# NULL), so that workers update their prefix index without a query. The alembic migrations install
+# the same function and triggers on existing databases.
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL(
+        f"""
+        CREATE OR REPLACE FUNCTION notify_entity_change() RETURNS trigger AS $$
+        DECLARE
+            payload text;
+        BEGIN
+            -- Bulk loads send a single reset instead of one notification per row
+            IF current_setting('app.suppress_notify', true) = 'on' THEN
+                RETURN NULL;
+            END IF;
+            IF TG_OP = 'DELETE' THEN
+                payload := TG_TABLE_NAME || ':' || OLD.id::text;
+            ELSIF TG_TABLE_NAME = 'network' THEN
+                payload := 'network:' || NEW.id::text || ':' || coalesce(NEW.ipv4::text, '');
+            ELSE
+                payload := TG_TABLE_NAME || ':' || NEW.id::text;
+            END IF;
+            PERFORM pg_notify('{ENTITY_CHANNEL}', payload);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    ),
+)
+event.listen(
+    Client.__table__,
+    "after_create",
+    DDL(
+        "CREATE TRIGGER client_entity_change AFTER UPDATE OR DELETE ON client "
+        "FOR EACH ROW EXECUTE FUNCTION notify_entity_change()"
+    ),
+)
+# pg_trgm ships with Postgres contrib; the migration requires it, while create_all skips the index
+# on servers that do not have it, leaving only prefix search
+event.listen(
+    Client.__table__,
+    "after_create",
+    DDL(
+        """
+        DO $$
+        BEGIN
+            IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm') THEN
+                CREATE EXTENSION IF NOT EXISTS pg_trgm;
+                CREATE INDEX ix_client_name_trgm ON client USING gin (name gin_trgm_ops);
+            END IF;
+        END
+        $$
+        """
+    ),
+)
+event.listen(
+    Network.__table__,
+    "after_create",
+    DDL(
+        "CREATE TRIGGER network_entity_change AFTER INSERT OR UPDATE OR DELETE ON network "
+        "FOR EACH ROW EXECUTE FUNCTION notify_entity_change()"
+    ),
+)
+# Count writes per table for list ETags. Statement-level, so a bulk statement bumps the version
+# once, and statements that change no rows leave it alone
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL(
+        f"""
+        CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                PERFORM FROM old_rows LIMIT 1;
+            ELSE
+                PERFORM FROM new_rows LIMIT 1;
+            END IF;
+            IF NOT FOUND THEN
+                RETURN NULL;
+            END IF;
+            INSERT INTO table_version (table_name, shard, version)
+            VALUES (TG_TABLE_NAME, pg_backend_pid() %% {TABLE_VERSION_SHARDS}, 1)
+            ON CONFLICT (table_name, shard) DO UPDATE SET version = table_version.version + 1;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    ),
+)
+for table in (Client.__table__, Network.__table__):
+    for operation, transition in (
+        ("INSERT", "NEW TABLE AS new_rows"),
+        ("UPDATE", "NEW TABLE AS new_rows"),
+        ("DELETE", "OLD TABLE AS old_rows"),
+    ):
+        event.listen(
+            table,
+            "after_create",
+            DDL(
+                f"CREATE TRIGGER {table.name}_version_{operation.lower()} "
+                f"AFTER {operation} ON {table.name} REFERENCING {transition} "
+                "FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version()"
+            ),
+        )
+
+
+# Record each write statement's rows in the change outbox, set-based from the transition tables,
+# and wake the change feed once per statement
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL(
+        f"""
+        CREATE OR REPLACE FUNCTION record_changes() RETURNS trigger AS $$
+        DECLARE
+            recorded integer;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                INSERT INTO change (xid, table_name, op, entity_id, data)
+                SELECT
+                    pg_current_xact_id()::text::bigint, TG_TABLE_NAME, 'delete', o.id::text,
+                    to_jsonb(o)
+                FROM old_rows o;
+            ELSE
+                INSERT INTO change (xid, table_name, op, entity_id, data)
+                SELECT
+                    pg_current_xact_id()::text::bigint, TG_TABLE_NAME, lower(TG_OP), n.id::text,
+                    to_jsonb(n)
+                FROM new_rows n;
+            END IF;
+            GET DIAGNOSTICS recorded = ROW_COUNT;
+            IF recorded > 0 THEN
+                PERFORM pg_notify('{CHANGES_CHANNEL}', '');
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    ),
+)
+for table in (Client.__table__, Network.__table__, ClientNetwork.__table__):
+    for operation, transition in (
+        ("INSERT", "NEW TABLE AS new_rows"),
+        ("UPDATE", "NEW TABLE AS new_rows"),
+        ("DELETE", "OLD TABLE AS old_rows"),
+    ):
+        event.listen(
+            table,
+            "after_create",
+            DDL(
+                f"CREATE TRIGGER {table.name}_record_{operation.lower()} "
+                f"AFTER {operation} ON {table.name} REFERENCING {transition} "
+                "FOR EACH STATEMENT EXECUTE FUNCTION record_changes()"
+            ),
+        )
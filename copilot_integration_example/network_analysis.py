@@ -0,0 +1,87 @@
+from ipaddress import IPv4Address
+from itertools import chain
+from typing import Any, Dict, Iterable, List, NamedTuple, Tuple
+
+import numpy as np
+
+
+class Prefixes(NamedTuple):
+    """Networks as parallel arrays, sorted by address and, within an address, widest first."""
+
+    ids: np.ndarray
+    # First and one past the last address of each prefix, as int64 so that 2**32 fits
+    starts: np.ndarray
+    ends: np.ndarray
+    lengths: np.ndarray
+
+
+def load_prefixes(rows: Iterable[Tuple[int, int, int]]) -> Prefixes:
+    # rows are (id, network address as an integer, prefix length)
+    flat = np.fromiter(chain.from_iterable(rows), dtype=np.int64).reshape(-1, 3)
+    ids, starts, lengths = flat[:, 0], flat[:, 1], flat[:, 2]
+    ends = starts + (np.int64(1) << (32 - lengths))
+    order = np.lexsort((lengths, starts))
+    return Prefixes(ids[order], starts[order], ends[order], lengths[order])
+
+
+def prefix_text(start: int, length: int) -> str:
+    return f"{IPv4Address(int(start))}/{int(length)}"
+
+
+def network_at(prefixes: Prefixes, position: int) -> Dict[str, Any]:
+    return {
+        "id": int(prefixes.ids[position]),
+        "ipv4": prefix_text(prefixes.starts[position], prefixes.lengths[position]),
+    }
+
+
+def find_overlaps(prefixes: Prefixes) -> Tuple[np.ndarray, np.ndarray]:
+    # CIDR prefixes are either disjoint or nested, so a prefix overlaps an earlier one in address
+    # order exactly when it starts before the furthest end seen so far. The prefix that set that
+    # end is the widest one covering it. Returns positions of the covered prefixes and of their
+    # covering prefixes.
+    ends = prefixes.ends
+    if len(ends) < 2:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    furthest = np.maximum.accumulate(ends)
+    # Position of the prefix that set the furthest end, up to and including each position
+    sets_end = np.concatenate(([True], ends[1:] > furthest[:-1]))
+    setter = np.maximum.accumulate(np.where(sets_end, np.arange(len(ends)), 0))
+    covered = np.flatnonzero(prefixes.starts[1:] < furthest[:-1]) + 1
+    return covered, setter[covered - 1]
+
+
+def aggregate(prefixes: Prefixes) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # The fewest prefixes covering exactly the addresses of all networks, with the number of
+    # networks in each. Returns their starts, lengths and network counts, in address order.
+    starts, ends = prefixes.starts, prefixes.ends
+    if len(starts) == 0:
+        return (np.empty(0, dtype=np.int64),) * 3
+    # Merge overlapping and adjacent prefixes into ranges
+    furthest = np.maximum.accumulate(ends)
+    new_range = np.concatenate(([True], starts[1:] > furthest[:-1]))
+    range_starts = starts[new_range]
+    range_ends = furthest[np.concatenate((np.flatnonzero(new_range)[1:] - 1, [len(starts) - 1]))]
+
+    # Split each range into the largest aligned blocks, one block per range per round
+    block_starts: List[np.ndarray] = []
+    block_lengths: List[np.ndarray] = []
+    low, high = range_starts, range_ends
+    while len(low):
+        # A block may be no larger than the alignment of its start and the rest of the range
+        alignment = np.where(low == 0, np.int64(1) << 32, low & -low)
+        size = np.minimum(alignment, np.int64(1) << np.floor(np.log2(high - low)).astype(np.int64))
+        block_starts.append(low)
+        block_lengths.append(32 - np.log2(size).astype(np.int64))
+        low = low + size
+        remaining = low < high
+        low, high = low[remaining], high[remaining]
+    block_start = np.concatenate(block_starts)
+    block_length = np.concatenate(block_lengths)
+    order = np.argsort(block_start, kind="stable")
+    block_start, block_length = block_start[order], block_length[order]
+
+    # Every network falls into exactly one block
+    owner = np.searchsorted(block_start, starts, side="right") - 1
+    counts = np.bincount(owner, minlength=len(block_start))
+    return block_start, block_length, counts
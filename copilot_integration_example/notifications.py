@@ -0,0 +1,105 @@
+import logging
+import select
+import threading
+from collections import defaultdict
+from typing import Callable, DefaultDict, List, Optional, Tuple
+
+import psycopg2
+from sqlalchemy import Engine
+
+logger = logging.getLogger(__name__)
+
+# Channel the client/network triggers notify with "<table>:<id>" after each committed change;
+# inserted and updated networks append ":<ipv4>"
+ENTITY_CHANNEL = "entity_change"
+# Notified with an empty payload by every statement that adds rows to the change outbox
+CHANGES_CHANNEL = "change_feed"
+# Sent instead of per-row payloads by bulk writers that set app.suppress_notify; subscribers start
+# over as after a reconnect
+RESET_PAYLOAD = "*"
+
+POLL_INTERVAL = 1.0
+RECONNECT_DELAY = 1.0
+MAX_RECONNECT_DELAY = 30.0
+
+
+def split_entity_payload(payload: str) -> Tuple[str, str, Optional[str]]:
+    # (table, id, detail); detail is None when the payload has none, as for deletes
+    table, _, rest = payload.partition(":")
+    entity_id, separator, detail = rest.partition(":")
+    return table, entity_id, detail if separator else None
+
+
+class NotificationListener:
+    """Dispatch Postgres NOTIFY payloads to in-process handlers from a background thread.
+
+    The listener keeps one dedicated connection outside the pool. Notifications sent while it is
+    disconnected are lost, so every `on_reset` callback runs after each (re)connect, and the
+    callbacks of a channel run when RESET_PAYLOAD arrives on it.
+    """
+
+    def __init__(self, engine: Engine):
+        self._connect_args = engine.url.translate_connect_args(username="user", database="dbname")
+        self._handlers: DefaultDict[str, List[Callable[[str], None]]] = defaultdict(list)
+        self._reset_handlers: DefaultDict[str, List[Callable[[], None]]] = defaultdict(list)
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def subscribe(
+        self,
+        channel: str,
+        handler: Callable[[str], None],
+        on_reset: Optional[Callable[[], None]] = None,
+    ) -> None:
+        self._handlers[channel].append(handler)
+        if on_reset is not None:
+            self._reset_handlers[channel].append(on_reset)
+
+    def start(self) -> None:
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="notification-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=POLL_INTERVAL + 1)
+            self._thread = None
+
+    def _run(self) -> None:
+        delay = RECONNECT_DELAY
+        while not self._stopped.is_set():
+            try:
+                self._listen()
+                delay = RECONNECT_DELAY
+            except psycopg2.Error:
+                logger.warning(
+                    "Notification listener lost its connection, retrying in %.0fs", delay
+                )
+                self._stopped.wait(delay)
+                delay = min(delay * 2, MAX_RECONNECT_DELAY)
+
+    def _listen(self) -> None:
+        connection = psycopg2.connect(**self._connect_args)
+        try:
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                for channel in self._handlers:
+                    cursor.execute(f'LISTEN "{channel}"')
+            for handlers in self._reset_handlers.values():
+                for on_reset in handlers:
+                    on_reset()
+            while not self._stopped.is_set():
+                if select.select([connection], [], [], POLL_INTERVAL) == ([], [], []):
+                    continue
+                connection.poll()
+                while connection.notifies:
+                    notify = connection.notifies.pop(0)
+                    if notify.payload == RESET_PAYLOAD:
+                        for on_reset in self._reset_handlers.get(notify.channel, ()):
+                            on_reset()
+                        continue
+                    for handler in self._handlers.get(notify.channel, ()):
+                        handler(notify.payload)
+        finally:
+            connection.close()
@@ -0,0 +1,21 @@
+import base64
+import binascii
+from typing import Any, Callable, TypeVar
+
+from fastapi import HTTPException
+
+T = TypeVar("T")
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(key: Any) -> str:
+    return base64.urlsafe_b64encode(str(key).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, parse: Callable[[str], T]) -> T:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return parse(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
@@ -0,0 +1,100 @@
+import threading
+from ipaddress import IPv4Address, IPv4Network
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+MASKS = [(0xFFFFFFFF << (32 - length)) & 0xFFFFFFFF for length in range(33)]
+
+
+class _Tables:
+    def __init__(self):
+        # prefix length -> {network address: network id}
+        self.by_length: Dict[int, Dict[int, int]] = {}
+        # (length, mask, table) for each length in use, longest first
+        self.probes: Tuple[Tuple[int, int, Dict[int, int]], ...] = ()
+        # network id -> (network address, prefix length), to find the entry again on update/delete
+        self.prefixes: Dict[int, Tuple[int, int]] = {}
+
+
+class PrefixIndex:
+    """In-memory longest-prefix match over the networks table.
+
+    Prefixes live in one hash table per prefix length, so a lookup is at most one dict probe per
+    length in use (33 for IPv4), independent of the number of networks. Lookups do not lock;
+    writers serialize on a lock and a reload swaps in a fully built set of tables.
+    """
+
+    def __init__(self):
+        self._tables: Optional[_Tables] = None
+        self._lock = threading.RLock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._tables is not None
+
+    def ensure_loaded(self, rows: Callable[[], Iterable[Tuple[int, str]]]) -> None:
+        if self._tables is not None:
+            return
+        with self._lock:
+            if self._tables is None:
+                tables = _Tables()
+                for network_id, ipv4 in rows():
+                    self._add(tables, network_id, ipv4)
+                self._tables = tables
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tables = None
+
+    def add(self, network_id: int, ipv4: Optional[str]) -> None:
+        # Changes made before the first load are picked up by the load itself
+        with self._lock:
+            tables = self._tables
+            if tables is None:
+                return
+            self._discard(tables, network_id)
+            if ipv4 is not None:
+                self._add(tables, network_id, ipv4)
+
+    def discard(self, network_id: int) -> None:
+        with self._lock:
+            if self._tables is not None:
+                self._discard(self._tables, network_id)
+
+    def lookup(self, ip: IPv4Address) -> Optional[Tuple[int, str]]:
+        tables = self._tables
+        if tables is None:
+            return None
+        address = int(ip)
+        for length, mask, table in tables.probes:
+            network_id = table.get(address & mask)
+            if network_id is not None:
+                return network_id, f"{IPv4Address(address & mask)}/{length}"
+        return None
+
+    def __len__(self) -> int:
+        tables = self._tables
+        return 0 if tables is None else len(tables.prefixes)
+
+    @staticmethod
+    def _add(tables: _Tables, network_id: int, ipv4: str) -> None:
+        network = IPv4Network(ipv4)
+        address, length = int(network.network_address), network.prefixlen
+        if length not in tables.by_length:
+            tables.by_length[length] = {}
+            tables.probes = tuple(
+                (n, MASKS[n], tables.by_length[n]) for n in sorted(tables.by_length, reverse=True)
+            )
+        tables.by_length[length][address] = network_id
+        tables.prefixes[network_id] = (address, length)
+
+    @staticmethod
+    def _discard(tables: _Tables, network_id: int) -> None:
+        prefix = tables.prefixes.pop(network_id, None)
+        if prefix is not None:
+            address, length = prefix
+            tables.by_length[length].pop(address, None)
+
+
+# Networks by id for GET /networks/lookup; loaded on first use and kept current by crud writes and
+# change notifications
+network_index = PrefixIndex()
@@ -0,0 +1,120 @@
+import logging
+import threading
+from typing import Optional
+
+from sqlalchemy import Engine, event, text
+from sqlalchemy.exc import SQLAlchemyError
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+# Present on requests from a client that wrote recently; its reads then go to the primary
+STICKY_COOKIE = "read_primary"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# Seconds the replica is behind the primary; 0 when it has replayed everything it received or when
+# the URL actually points at a primary. NULL when no WAL receiver is streaming: a disconnected
+# replica has replayed all it received but falls further behind unnoticed. Roles without
+# pg_read_all_stats only see the receiver's pid, so a running receiver counts for them.
+LAG_QUERY = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN NOT EXISTS (
+            SELECT 1 FROM pg_stat_wal_receiver
+            WHERE status = 'streaming' OR (status IS NULL AND pid IS NOT NULL)
+        ) THEN NULL
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+    """
+)
+
+
+class ReplicaMonitor:
+    """Decide whether reads may go to the replica.
+
+    It must be reachable, streaming from the primary and at most `max_lag` seconds behind. The
+    state is refreshed by a background thread every `interval` seconds, so requests only read a
+    flag. A disconnect seen by any request marks the replica down until the next good check.
+    """
+
+    def __init__(self, replica: Optional[Engine], max_lag: float, interval: float):
+        self.replica = replica
+        self.max_lag = max_lag
+        self.interval = interval
+        self.available = replica is not None
+        self.lag: Optional[float] = None
+        self._stopped = threading.Event()
+        self._thread = None
+        if replica is not None:
+            self.watch(replica)
+
+    def watch(self, engine: Engine) -> None:
+        # Any request that loses its replica connection marks the replica down
+        event.listen(engine, "handle_error", self._on_error)
+
+    def check(self) -> bool:
+        try:
+            with self.replica.connect() as connection:
+                lag = connection.execute(LAG_QUERY).scalar()
+        except SQLAlchemyError as e:
+            if self.available:
+                logger.warning("Replica unavailable, reading from the primary: %s", e)
+            self.lag = None
+            self.available = False
+        else:
+            if lag is None:
+                if self.available:
+                    logger.warning("Replica is not streaming, reading from the primary")
+                self.lag = None
+                self.available = False
+                return False
+            self.lag = float(lag)
+            if self.lag > self.max_lag and self.available:
+                logger.warning("Replica is %.1fs behind, reading from the primary", self.lag)
+            self.available = self.lag <= self.max_lag
+        return self.available
+
+    def start(self) -> None:
+        if self.replica is None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="replica-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+    def _run(self) -> None:
+        self.check()
+        while not self._stopped.wait(self.interval):
+            self.check()
+
+    def _on_error(self, context) -> None:
+        if context.is_disconnect:
+            self.available = False
+
+
+class ReadYourWritesMiddleware:
+    """Mark clients that just wrote so that their reads stay on the primary for `window` seconds."""
+
+    def __init__(self, app: ASGIApp, window: float):
+        self.app = app
+        self.cookie = f"{STICKY_COOKIE}=1; Max-Age={int(window)}; Path=/; HttpOnly; SameSite=Lax"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                MutableHeaders(scope=message).append("Set-Cookie", self.cookie)
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
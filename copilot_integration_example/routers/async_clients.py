@@ -0,0 +1,105 @@
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Union
+from uuid import UUID
+from .. import async_crud, crud, models, schemas
+from ..coalesce import async_client_creates
+from ..database import get_async_db, get_async_read_db
+from ..etag import etag_matches, make_etag, not_modified, rows_etag
+from ..pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+from ..serialization import CLIENT_LIST, CLIENT_PAGE, json_response, row_dicts
+
+router = APIRouter(
+    prefix="/clients",
+    tags=["clients"],
+    responses={404: {"description": "Not found"}},
+)
+
+
+@router.post("/", response_model=schemas.Client)
+async def create_client(client: schemas.ClientCreate, db: AsyncSession = Depends(get_async_db)):
+    if async_client_creates.window > 0:
+        return await async_client_creates.submit(db, client)
+    return await async_crud.create_client(db=db, client=client)
+
+
+@router.get(
+    "/",
+    response_model=Union[List[schemas.Client], schemas.ClientMultiGet, schemas.ClientPage],
+)
+async def read_clients(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    ids: Optional[List[str]] = Query(None),
+    include_total: bool = False,
+    fields: Optional[List[str]] = Query(None),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    if ids is not None:
+        # Multi-get: found items in request order, ignoring skip/limit/cursor
+        if fields is not None:
+            raise HTTPException(status_code=400, detail="fields cannot be combined with ids")
+        valid_ids, invalid = crud.parse_ids(ids, crud.parse_uuid)
+        items, missing = await async_crud.get_clients_by_ids(db, valid_ids)
+        etag = rows_etag(items)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        response.headers["ETag"] = etag
+        return {"items": items, "missing": missing, "invalid": invalid}
+    columns = crud.select_fields(fields, crud.CLIENT_LIST_COLUMNS)
+    after = None
+    if cursor is not None:
+        if skip:
+            raise HTTPException(status_code=400, detail="skip cannot be combined with cursor")
+        after = decode_cursor(cursor, UUID)
+    # Read before the rows: a write committed in between can only make the ETag older than the body
+    etag = make_etag(await async_crud.table_version(db, models.Client))
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    clients = await async_crud.get_clients(db, skip=skip, limit=limit, after=after, columns=columns)
+    if clients and len(clients) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(clients[-1].id)
+    if include_total:
+        total, is_estimate = await async_crud.count_rows(db, models.Client)
+        page = {"items": row_dicts(clients), "total": total, "total_is_estimate": is_estimate}
+        return json_response(CLIENT_PAGE, page, response)
+    return json_response(CLIENT_LIST, row_dicts(clients), response)
+
+
+@router.get("/{client_id}", response_model=schemas.Client)
+async def read_client(
+    client_id: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    db_client = await async_crud.get_client(db, client_id=client_id)
+    if db_client is None:
+        raise HTTPException(status_code=404, detail="Client not found")
+    etag = make_etag(db_client.version)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    return db_client
+
+
+@router.put("/{client_id}", response_model=schemas.Client)
+async def update_client(
+    client_id: str, client: schemas.ClientCreate, db: AsyncSession = Depends(get_async_db)
+):
+    db_client = await async_crud.update_client(db, client_id=client_id, client=client)
+    if db_client is None:
+        raise HTTPException(status_code=404, detail="Client not found")
+    return db_client
+
+
+@router.delete("/{client_id}")
+async def delete_client(client_id: str, db: AsyncSession = Depends(get_async_db)):
+    success = await async_crud.delete_client(db, client_id=client_id)
+    if not success:
+        raise HTTPException(status_code=404, detail="Client not found")
+    return {"message": "Client deleted successfully"}
@@ -0,0 +1,106 @@
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Union
+from .. import async_crud, crud, models, schemas
+from ..coalesce import async_network_creates
+from ..database import get_async_db, get_async_read_db
+from ..etag import etag_matches, make_etag, not_modified, rows_etag
+from ..pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+from ..serialization import NETWORK_LIST, NETWORK_PAGE, json_response, row_dicts
+
+router = APIRouter(
+    prefix="/networks",
+    tags=["networks"],
+    responses={404: {"description": "Not found"}},
+)
+
+
+@router.post("/", response_model=schemas.Network)
+async def create_network(network: schemas.NetworkCreate, db: AsyncSession = Depends(get_async_db)):
+    if async_network_creates.window > 0:
+        return await async_network_creates.submit(db, network)
+    return await async_crud.create_network(db=db, network=network)
+
+
+@router.get(
+    "/",
+    response_model=Union[List[schemas.Network], schemas.NetworkMultiGet, schemas.NetworkPage],
+)
+async def read_networks(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    ids: Optional[List[str]] = Query(None),
+    include_total: bool = False,
+    fields: Optional[List[str]] = Query(None),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    if ids is not None:
+        # Multi-get: found items in request order, ignoring skip/limit/cursor
+        if fields is not None:
+            raise HTTPException(status_code=400, detail="fields cannot be combined with ids")
+        valid_ids, invalid = crud.parse_ids(ids, crud.parse_network_id)
+        items, missing = await async_crud.get_networks_by_ids(db, valid_ids)
+        etag = rows_etag(items)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        response.headers["ETag"] = etag
+        return {"items": items, "missing": missing, "invalid": invalid}
+    columns = crud.select_fields(fields, crud.NETWORK_LIST_COLUMNS)
+    after = None
+    if cursor is not None:
+        if skip:
+            raise HTTPException(status_code=400, detail="skip cannot be combined with cursor")
+        after = decode_cursor(cursor, int)
+    # Read before the rows: a write committed in between can only make the ETag older than the body
+    etag = make_etag(await async_crud.table_version(db, models.Network))
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    networks = await async_crud.get_networks(
+        db, skip=skip, limit=limit, after=after, columns=columns
+    )
+    if networks and len(networks) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(networks[-1].id)
+    if include_total:
+        total, is_estimate = await async_crud.count_rows(db, models.Network)
+        page = {"items": row_dicts(networks), "total": total, "total_is_estimate": is_estimate}
+        return json_response(NETWORK_PAGE, page, response)
+    return json_response(NETWORK_LIST, row_dicts(networks), response)
+
+
+@router.get("/{network_id}", response_model=schemas.Network)
+async def read_network(
+    network_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    db_network = await async_crud.get_network(db, network_id=network_id)
+    if db_network is None:
+        raise HTTPException(status_code=404, detail="Network not found")
+    etag = make_etag(db_network.version)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    return db_network
+
+
+@router.put("/{network_id}", response_model=schemas.Network)
+async def update_network(
+    network_id: int, network: schemas.NetworkCreate, db: AsyncSession = Depends(get_async_db)
+):
+    db_network = await async_crud.update_network(db, network_id=network_id, network=network)
+    if db_network is None:
+        raise HTTPException(status_code=404, detail="Network not found")
+    return db_network
+
+
+@router.delete("/{network_id}")
+async def delete_network(network_id: int, db: AsyncSession = Depends(get_async_db)):
+    success = await async_crud.delete_network(db, network_id=network_id)
+    if not success:
+        raise HTTPException(status_code=404, detail="Network not found")
+    return {"message": "Network deleted successfully"}
@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Header, Query, Request
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from .. import schemas
+from ..changes import (
+    MAX_CHANGES_PAGE,
+    MAX_CHANGES_WAIT,
+    change_events,
+    decode_change_cursor,
+    encode_change_cursor,
+    wait_for_changes,
+)
+
+router = APIRouter(
+    prefix="/changes",
+    tags=["changes"],
+)
+
+
+@router.get("", response_model=schemas.ChangePage)
+async def read_changes(
+    since: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=MAX_CHANGES_PAGE),
+    wait: float = Query(0, ge=0, le=MAX_CHANGES_WAIT),
+):
+    # Long-poll: with wait > 0, an empty page is only returned once `wait` seconds pass without
+    # changes
+    after = None if since is None else decode_change_cursor(since)
+    changes = await wait_for_changes(after, limit, wait)
+    cursor = encode_change_cursor(changes[-1]) if changes else since
+    return {"changes": changes, "cursor": cursor}
+
+
+@router.get("/stream", response_class=StreamingResponse)
+async def stream_changes(
+    request: Request,
+    since: Optional[str] = None,
+    last_event_id: Optional[str] = Header(None),
+):
+    # Reconnecting EventSource clients send the id of the last event they received
+    cursor = last_event_id or since
+    after = None if cursor is None else decode_change_cursor(cursor)
+    return StreamingResponse(
+        change_events(after, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
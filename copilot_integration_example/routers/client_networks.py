@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
+from .. import crud, schemas
+from ..database import read_session_factory
+from ..export import export_response
+
+router = APIRouter(
+    prefix="/client-networks",
+    tags=["client-networks"],
+)
+
+
+@router.get("/export", response_class=StreamingResponse)
+def export_client_networks(
+    export_format: schemas.ExportFormat = Query(schemas.ExportFormat.ndjson, alias="format"),
+):
+    return export_response(
+        read_session_factory(),
+        crud.export_client_networks_statement(),
+        export_format,
+        "client_networks",
+    )
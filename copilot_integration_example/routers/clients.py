@@ -1,8 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Body, Depends, HTTPException, Header, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
-from .. import crud, schemas
-from ..database import get_db
+from typing import Any, List, Optional, Union
+from uuid import UUID
+from .. import crud, models, schemas
+from ..coalesce import client_creates
+from ..database import get_db, get_read_db, read_session_factory
+from ..etag import etag_matches, make_etag, not_modified, rows_etag
+from ..export import export_response
+from ..pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+from ..serialization import CLIENT_LIST, CLIENT_PAGE, json_response, row_dicts
 
 router = APIRouter(
     prefix="/clients",
@@ -13,19 +20,110 @@ router = APIRouter(
 
 @router.post("/", response_model=schemas.Client)
 def create_client(client: schemas.ClientCreate, db: Session = Depends(get_db)):
+    if client_creates.window > 0:
+        return client_creates.submit(db, client)
     return crud.create_client(db=db, client=client)
 
 
-@router.get("/", response_model=List[schemas.Client])
-def read_clients(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return crud.get_clients(db, skip=skip, limit=limit)
+@router.post("/bulk", response_model=List[schemas.ClientBulkResult])
+def create_clients_bulk(clients: List[Any] = Body(...), db: Session = Depends(get_db)):
+    return crud.bulk_create_clients(db, clients)
+
+
+@router.get(
+    "/",
+    response_model=Union[List[schemas.Client], schemas.ClientMultiGet, schemas.ClientPage],
+)
+def read_clients(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    ids: Optional[List[str]] = Query(None),
+    include_total: bool = False,
+    fields: Optional[List[str]] = Query(None),
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_read_db),
+):
+    if ids is not None:
+        # Multi-get: found items in request order, ignoring skip/limit/cursor
+        if fields is not None:
+            raise HTTPException(status_code=400, detail="fields cannot be combined with ids")
+        valid_ids, invalid = crud.parse_ids(ids, crud.parse_uuid)
+        items, missing = crud.get_clients_by_ids(db, valid_ids)
+        etag = rows_etag(items)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        response.headers["ETag"] = etag
+        return {"items": items, "missing": missing, "invalid": invalid}
+    columns = crud.select_fields(fields, crud.CLIENT_LIST_COLUMNS)
+    after = None
+    if cursor is not None:
+        if skip:
+            raise HTTPException(status_code=400, detail="skip cannot be combined with cursor")
+        after = decode_cursor(cursor, UUID)
+    # Read before the rows: a write committed in between can only make the ETag older than the body
+    etag = make_etag(crud.table_version(db, models.Client))
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    clients = crud.get_clients(db, skip=skip, limit=limit, after=after, columns=columns)
+    if clients and len(clients) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(clients[-1].id)
+    if include_total:
+        total, is_estimate = crud.count_rows(db, models.Client)
+        page = {"items": row_dicts(clients), "total": total, "total_is_estimate": is_estimate}
+        return json_response(CLIENT_PAGE, page, response)
+    return json_response(CLIENT_LIST, row_dicts(clients), response)
+
+
+@router.get("/export", response_class=StreamingResponse)
+def export_clients(
+    export_format: schemas.ExportFormat = Query(schemas.ExportFormat.ndjson, alias="format"),
+):
+    return export_response(
+        read_session_factory(), crud.export_clients_statement(), export_format, "clients"
+    )
+
+
+@router.get("/search", response_model=List[schemas.Client])
+def search_clients(
+    q: str = Query(..., min_length=1, max_length=200),
+    mode: schemas.SearchMode = schemas.SearchMode.fuzzy,
+    limit: int = Query(20, ge=1, le=crud.MAX_SEARCH_RESULTS),
+    db: Session = Depends(get_read_db),
+):
+    return crud.search_clients(db, q=q, mode=mode, limit=limit)
+
+
+@router.get("/with-networks", response_model=List[schemas.ClientWithNetworks])
+def read_clients_with_networks(
+    response: Response,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+):
+    after = None if cursor is None else decode_cursor(cursor, UUID)
+    clients = crud.get_clients_with_networks(db, limit=limit, after=after)
+    if clients and len(clients) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(clients[-1].id)
+    return clients
 
 
 @router.get("/{client_id}", response_model=schemas.Client)
-def read_client(client_id: str, db: Session = Depends(get_db)):
+def read_client(
+    client_id: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
     db_client = crud.get_client(db, client_id=client_id)
     if db_client is None:
         raise HTTPException(status_code=404, detail="Client not found")
+    etag = make_etag(db_client.version)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
     return db_client
 
 
@@ -42,4 +140,32 @@ def delete_client(client_id: str, db: Session = Depends(get_db)):
     success = crud.delete_client(db, client_id=client_id)
     if not success:
         raise HTTPException(status_code=404, detail="Client not found")
-    return {"message": "Client deleted successfully"}
\ No newline at end of file
+    return {"message": "Client deleted successfully"}
+
+
+@router.get("/{client_id}/networks", response_model=List[schemas.Network])
+def read_client_networks(client_id: str, db: Session = Depends(get_read_db)):
+    networks = crud.get_client_networks(db, client_id=client_id)
+    if networks is None:
+        raise HTTPException(status_code=404, detail="Client not found")
+    return networks
+
+
+@router.post("/{client_id}/networks", response_model=schemas.ClientNetworkIds)
+def attach_client_networks(
+    client_id: str, links: schemas.ClientNetworkIds, db: Session = Depends(get_db)
+):
+    attached = crud.attach_networks(db, client_id=client_id, network_ids=links.network_ids)
+    if attached is None:
+        raise HTTPException(status_code=404, detail="Client not found")
+    return {"network_ids": attached}
+
+
+@router.delete("/{client_id}/networks", response_model=schemas.ClientNetworkIds)
+def detach_client_networks(
+    client_id: str, links: schemas.ClientNetworkIds, db: Session = Depends(get_db)
+):
+    detached = crud.detach_networks(db, client_id=client_id, network_ids=links.network_ids)
+    if detached is None:
+        raise HTTPException(status_code=404, detail="Client not found")
+    return {"network_ids": detached}
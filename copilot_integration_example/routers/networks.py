@@ -1,8 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Body, Depends, HTTPException, Header, Query, Response
+from fastapi.responses import StreamingResponse
+from ipaddress import IPv4Address
 from sqlalchemy.orm import Session
-from typing import List
-from .. import crud, schemas
-from ..database import get_db
+from typing import Any, List, Optional, Union
+from .. import crud, models, network_analysis, schemas
+from ..coalesce import network_creates
+from ..database import get_db, get_read_db, read_session_factory
+from ..etag import etag_matches, make_etag, not_modified, rows_etag
+from ..export import export_response
+from ..pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+from ..serialization import NETWORK_AGGREGATES, NETWORK_LIST, NETWORK_PAGE, json_response, row_dicts
 
 router = APIRouter(
     prefix="/networks",
@@ -13,19 +20,134 @@ router = APIRouter(
 
 @router.post("/", response_model=schemas.Network)
 def create_network(network: schemas.NetworkCreate, db: Session = Depends(get_db)):
+    if network_creates.window > 0:
+        return network_creates.submit(db, network)
     return crud.create_network(db=db, network=network)
 
 
-@router.get("/", response_model=List[schemas.Network])
-def read_networks(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return crud.get_networks(db, skip=skip, limit=limit)
+@router.post("/bulk", response_model=List[schemas.NetworkBulkResult])
+def create_networks_bulk(networks: List[Any] = Body(...), db: Session = Depends(get_db)):
+    return crud.bulk_create_networks(db, networks)
+
+
+@router.get(
+    "/",
+    response_model=Union[List[schemas.Network], schemas.NetworkMultiGet, schemas.NetworkPage],
+)
+def read_networks(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    ids: Optional[List[str]] = Query(None),
+    include_total: bool = False,
+    fields: Optional[List[str]] = Query(None),
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_read_db),
+):
+    if ids is not None:
+        # Multi-get: found items in request order, ignoring skip/limit/cursor
+        if fields is not None:
+            raise HTTPException(status_code=400, detail="fields cannot be combined with ids")
+        valid_ids, invalid = crud.parse_ids(ids, crud.parse_network_id)
+        items, missing = crud.get_networks_by_ids(db, valid_ids)
+        etag = rows_etag(items)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        response.headers["ETag"] = etag
+        return {"items": items, "missing": missing, "invalid": invalid}
+    columns = crud.select_fields(fields, crud.NETWORK_LIST_COLUMNS)
+    after = None
+    if cursor is not None:
+        if skip:
+            raise HTTPException(status_code=400, detail="skip cannot be combined with cursor")
+        after = decode_cursor(cursor, int)
+    # Read before the rows: a write committed in between can only make the ETag older than the body
+    etag = make_etag(crud.table_version(db, models.Network))
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    networks = crud.get_networks(db, skip=skip, limit=limit, after=after, columns=columns)
+    if networks and len(networks) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(networks[-1].id)
+    if include_total:
+        total, is_estimate = crud.count_rows(db, models.Network)
+        page = {"items": row_dicts(networks), "total": total, "total_is_estimate": is_estimate}
+        return json_response(NETWORK_PAGE, page, response)
+    return json_response(NETWORK_LIST, row_dicts(networks), response)
+
+
+@router.get("/export", response_class=StreamingResponse)
+def export_networks(
+    export_format: schemas.ExportFormat = Query(schemas.ExportFormat.ndjson, alias="format"),
+):
+    return export_response(
+        read_session_factory(), crud.export_networks_statement(), export_format, "networks"
+    )
+
+
+@router.get("/lookup", response_model=schemas.Network)
+def lookup_network(ip: IPv4Address, db: Session = Depends(get_db)):
+    # Longest-prefix match against the in-memory index
+    match = crud.lookup_network(db, ip)
+    if match is None:
+        raise HTTPException(status_code=404, detail="No network contains this address")
+    network_id, ipv4 = match
+    return {"id": network_id, "ipv4": ipv4}
+
+
+@router.get("/containing", response_model=List[schemas.Network])
+def read_networks_containing(ip: IPv4Address, db: Session = Depends(get_read_db)):
+    return crud.get_networks_containing(db, ip)
+
+
+@router.get("/overlaps", response_model=schemas.NetworkOverlapPage)
+def read_network_overlaps(skip: int = 0, limit: int = 1000, db: Session = Depends(get_read_db)):
+    # Networks inside a wider network, in address order
+    prefixes = network_analysis.load_prefixes(crud.get_network_prefixes(db))
+    covered, covering = network_analysis.find_overlaps(prefixes)
+    items = [
+        {
+            "network": network_analysis.network_at(prefixes, i),
+            "covered_by": network_analysis.network_at(prefixes, j),
+        }
+        for i, j in zip(covered[skip : skip + limit], covering[skip : skip + limit])
+    ]
+    return {"items": items, "total": len(covered)}
+
+
+@router.get("/aggregate", response_model=List[schemas.NetworkAggregate])
+def read_network_aggregate(
+    response: Response, min_networks: int = 1, db: Session = Depends(get_read_db)
+):
+    # The fewest prefixes covering exactly the addresses of all networks; min_networks=2 leaves the
+    # prefixes that summarize several networks
+    prefixes = network_analysis.load_prefixes(crud.get_network_prefixes(db))
+    starts, lengths, counts = network_analysis.aggregate(prefixes)
+    keep = counts >= min_networks
+    aggregates = [
+        {"ipv4": network_analysis.prefix_text(start, length), "networks": count}
+        for start, length, count in zip(
+            starts[keep].tolist(), lengths[keep].tolist(), counts[keep].tolist()
+        )
+    ]
+    return json_response(NETWORK_AGGREGATES, aggregates, response)
 
 
 @router.get("/{network_id}", response_model=schemas.Network)
-def read_network(network_id: int, db: Session = Depends(get_db)):
+def read_network(
+    network_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
     db_network = crud.get_network(db, network_id=network_id)
     if db_network is None:
         raise HTTPException(status_code=404, detail="Network not found")
+    etag = make_etag(db_network.version)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
     return db_network
 
 
@@ -42,4 +164,12 @@ def delete_network(network_id: int, db: Session = Depends(get_db)):
     success = crud.delete_network(db, network_id=network_id)
     if not success:
         raise HTTPException(status_code=404, detail="Network not found")
-    return {"message": "Network deleted successfully"}
\ No newline at end of file
+    return {"message": "Network deleted successfully"}
+
+
+@router.get("/{network_id}/clients", response_model=List[schemas.Client])
+def read_network_clients(network_id: int, db: Session = Depends(get_read_db)):
+    clients = crud.get_network_clients(db, network_id=network_id)
+    if clients is None:
+        raise HTTPException(status_code=404, detail="Network not found")
+    return clients
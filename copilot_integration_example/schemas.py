@@ -1,5 +1,8 @@
-from pydantic import BaseModel, ConfigDict
-from typing import Optional
+from datetime import datetime
+from enum import Enum
+from ipaddress import IPv4Network
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+from typing import Any, Dict, List, Optional, TypedDict
 from uuid import UUID
 
 
@@ -20,6 +23,17 @@ class Client(ClientBase):
 class NetworkBase(BaseModel):
     ipv4: Optional[str] = None
 
+    @field_validator("ipv4", mode="before")
+    @classmethod
+    def normalize_ipv4(cls, value):
+        # Same rules as the cidr column: host bits must be zero, a bare address is a /32
+        if value is None:
+            return None
+        try:
+            return str(IPv4Network(str(value)))
+        except ValueError as e:
+            raise ValueError(f"Invalid IPv4 network: {e}")
+
 
 class NetworkCreate(NetworkBase):
     pass
@@ -28,4 +42,127 @@ class NetworkCreate(NetworkBase):
 class Network(NetworkBase):
     id: int
 
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ClientMultiGet(BaseModel):
+    items: List[Client]
+    missing: List[UUID]
+    invalid: List[str]
+
+
+class NetworkMultiGet(BaseModel):
+    items: List[Network]
+    missing: List[int]
+    invalid: List[str]
+
+
+class ClientPage(BaseModel):
+    items: List[Client]
+    total: int
+    total_is_estimate: bool
+
+
+class NetworkPage(BaseModel):
+    items: List[Network]
+    total: int
+    total_is_estimate: bool
+
+
+# Plain-dict shapes of Client and Network, for serializing list pages without building models
+class ClientRow(TypedDict):
+    id: UUID
+    name: str
+
+
+class NetworkRow(TypedDict):
+    id: int
+    ipv4: Optional[str]
+
+
+class ClientRowPage(TypedDict):
+    items: List[ClientRow]
+    total: int
+    total_is_estimate: bool
+
+
+class NetworkRowPage(TypedDict):
+    items: List[NetworkRow]
+    total: int
+    total_is_estimate: bool
+
+
+class NetworkAggregateRow(TypedDict):
+    ipv4: str
+    networks: int
+
+
+class NetworkOverlap(BaseModel):
+    network: Network
+    # The widest network containing it
+    covered_by: Network
+
+
+class NetworkOverlapPage(BaseModel):
+    items: List[NetworkOverlap]
+    total: int
+
+
+class NetworkAggregate(BaseModel):
+    ipv4: str
+    # Networks inside this prefix
+    networks: int
+
+
+class ClientWithNetworks(Client):
+    networks: List[Network] = []
+
+
+class ClientNetworkIds(BaseModel):
+    network_ids: List[int]
+
+
+class Change(BaseModel):
+    table: str = Field(validation_alias="table_name")
+    op: str
+    entity_id: str
+    data: Dict[str, Any]
+    changed_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ChangePage(BaseModel):
+    changes: List[Change]
+    # Pass back as ?since= for the changes after these; unchanged when there were none
+    cursor: Optional[str]
+
+
+class BulkItemStatus(str, Enum):
+    created = "created"
+    duplicate = "duplicate"
+    invalid = "invalid"
+
+
+class BulkItemResult(BaseModel):
+    index: int
+    status: BulkItemStatus
+    detail: Optional[str] = None
+
+
+class ClientBulkResult(BulkItemResult):
+    id: Optional[UUID] = None
+
+
+class NetworkBulkResult(BulkItemResult):
+    id: Optional[int] = None
+
+
+class SearchMode(str, Enum):
+    prefix = "prefix"
+    fuzzy = "fuzzy"
+
+
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
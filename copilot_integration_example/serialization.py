@@ -0,0 +1,29 @@
+from typing import Any, Dict, List, Sequence
+
+from fastapi import Response
+from pydantic import TypeAdapter
+from sqlalchemy import Row
+
+from . import schemas
+
+# Serializers are compiled once here instead of per request
+CLIENT_LIST = TypeAdapter(List[schemas.ClientRow])
+CLIENT_PAGE = TypeAdapter(schemas.ClientRowPage)
+NETWORK_LIST = TypeAdapter(List[schemas.NetworkRow])
+NETWORK_PAGE = TypeAdapter(schemas.NetworkRowPage)
+NETWORK_AGGREGATES = TypeAdapter(List[schemas.NetworkAggregateRow])
+
+
+def row_dicts(rows: Sequence[Row]) -> List[Dict[str, Any]]:
+    if not rows:
+        return []
+    keys = rows[0]._fields
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def json_response(adapter: TypeAdapter, content: Any, response: Response) -> Response:
+    # Serialized straight to JSON bytes without validating against the response_model. FastAPI only
+    # copies headers set on the injected `response` (cursor, ETag) to responses it builds itself.
+    return Response(
+        adapter.dump_json(content), media_type="application/json", headers=response.headers
+    )
@@ -0,0 +1,127 @@
+import asyncio
+
+import pytest
+
+from copilot_integration_example.admission import (
+    ADMISSION_ROUTERS,
+    QUEUE_FULL,
+    QUEUE_TIMEOUT,
+    Budget,
+    admission_budgets,
+    default_limits,
+)
+from copilot_integration_example.database import DB_MAX_OVERFLOW, DB_POOL_SIZE
+from tests.test_metrics import sample
+
+
+def budget(limit=1, queue_size=1, queue_timeout=1.0):
+    return Budget("clients", "read", limit, queue_size, queue_timeout)
+
+
+class TestDefaultLimits:
+    """Test deriving the default limits from the connection pool"""
+
+    def test_split(self):
+        assert default_limits(15, 2) == (4, 3)
+        assert default_limits(40, 2) == (13, 7)
+
+    def test_at_least_one_slot(self):
+        assert default_limits(1, 2) == (1, 1)
+
+    def test_within_pool(self):
+        for connections in range(4, 100):
+            read, write = default_limits(connections, 2)
+            assert 2 * (read + write) <= connections
+
+    def test_module_defaults(self):
+        # Unless a limit is set explicitly, the budgets together fit in the pool
+        limits = sum(
+            admission_budgets[router, kind].limit
+            for router in ADMISSION_ROUTERS
+            for kind in ("read", "write")
+        )
+        assert limits <= DB_POOL_SIZE + DB_MAX_OVERFLOW
+
+
+class TestBudget:
+    """Test admitting, queueing and rejecting requests"""
+
+    def test_queue_then_admit(self):
+        limited = budget()
+
+        async def run():
+            assert await limited.acquire() is None
+            queued = asyncio.ensure_future(limited.acquire())
+            await asyncio.sleep(0)
+            assert limited.queued == 1
+            assert await limited.acquire() == QUEUE_FULL
+            limited.release()
+            assert await queued is None
+            assert (limited.in_flight, limited.queued) == (1, 0)
+            limited.release()
+            assert limited.in_flight == 0
+
+        asyncio.run(run())
+        assert limited.rejected == {QUEUE_FULL: 1}
+
+    def test_queue_timeout(self):
+        limited = budget(queue_timeout=0.01)
+
+        async def run():
+            await limited.acquire()
+            assert await limited.acquire() == QUEUE_TIMEOUT
+            limited.release()
+            assert limited.in_flight == 0
+
+        asyncio.run(run())
+        assert sum(limited.queue_wait.counts) == 1
+
+    def test_cancelled_waiter_passes_slot_on(self):
+        limited = budget(queue_size=2)
+
+        async def run():
+            await limited.acquire()
+            cancelled = asyncio.ensure_future(limited.acquire())
+            waiting = asyncio.ensure_future(limited.acquire())
+            await asyncio.sleep(0)
+            limited.release()
+            # Cancelled after the slot was handed to it, before it resumed
+            cancelled.cancel()
+            assert await waiting is None
+            with pytest.raises(asyncio.CancelledError):
+                await cancelled
+            assert limited.in_flight == 1
+
+        asyncio.run(run())
+
+
+class TestAdmissionMiddleware:
+    """Test shedding load per router and kind of request"""
+
+    @pytest.fixture
+    def saturated_client_reads(self, monkeypatch):
+        # Every read of /clients queues and times out
+        reads = admission_budgets["clients", "read"]
+        monkeypatch.setattr(reads, "limit", 0)
+        monkeypatch.setattr(reads, "queue_timeout", 0.01)
+        return reads
+
+    def test_rejects_with_retry_after(self, client, saturated_client_reads):
+        response = client.get("/clients/")
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "1"
+        # Writes and other routers have their own budgets
+        assert client.post("/clients", json={"name": "Admitted"}).status_code == 200
+        assert client.get("/networks/").status_code == 200
+        assert client.get("/health").status_code == 200
+
+    def test_async(self, async_client, saturated_client_reads):
+        assert async_client.get("/clients/").status_code == 503
+
+    def test_metrics(self, client, saturated_client_reads):
+        labels = {"router": "clients", "kind": "read", "reason": QUEUE_TIMEOUT}
+        before = sample(client.get("/metrics").text, "admission_rejected_total", **labels) or 0
+        client.get("/clients/")
+        after = client.get("/metrics").text
+        assert sample(after, "admission_rejected_total", **labels) == before + 1
+        assert sample(after, "admission_in_flight", router="networks", kind="write") == 0
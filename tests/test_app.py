@@ -0,0 +1,82 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import httpx
+import pytest
+
+from app import DEDICATED_CONNECTIONS, pool_sizes
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestPoolSizes:
+    """Test fitting the pools of all workers into the connection budget"""
+
+    def test_configured_sizes_that_fit_are_kept(self):
+        assert pool_sizes(budget=100, workers=4, engines=1, pool_size=5, max_overflow=10) == (5, 10)
+
+    def test_scaled_down_to_budget(self):
+        size, overflow = pool_sizes(budget=90, workers=8, engines=1, pool_size=5, max_overflow=10)
+        assert (size, overflow) == (3, 6)
+        assert 8 * (size + overflow + DEDICATED_CONNECTIONS) <= 90
+
+    def test_async_engine_shares_budget(self):
+        size, overflow = pool_sizes(budget=90, workers=4, engines=2, pool_size=5, max_overflow=10)
+        assert 4 * (2 * (size + overflow) + DEDICATED_CONNECTIONS) <= 90
+        assert size >= 1
+
+    def test_budget_too_small(self):
+        with pytest.raises(ValueError):
+            pool_sizes(budget=10, workers=4, engines=1, pool_size=5, max_overflow=10)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class TestLauncher:
+    """Test serving from forked workers and draining them on SIGTERM"""
+
+    def test_drains_in_flight_requests(self):
+        port = free_port()
+        env = dict(
+            os.environ, PYTHONPATH=ROOT, DB_CONNECTION_BUDGET="40", WORKER_GRACEFUL_TIMEOUT="10"
+        )
+        command = [sys.executable, os.path.join(ROOT, "app.py"), "--host", "127.0.0.1"]
+        server = subprocess.Popen(command + ["--port", str(port), "--workers", "2"], env=env)
+        base_url = f"http://127.0.0.1:{port}"
+        try:
+            for _ in range(100):
+                try:
+                    if httpx.get(f"{base_url}/health").status_code == 200:
+                        break
+                except httpx.TransportError:
+                    time.sleep(0.1)
+            else:
+                pytest.fail("launcher did not start")
+
+            # A long poll is in flight when the launcher is told to stop
+            responses = []
+            poll = threading.Thread(
+                target=lambda: responses.append(
+                    httpx.get(f"{base_url}/changes", params={"wait": 2}, timeout=10)
+                )
+            )
+            poll.start()
+            time.sleep(0.5)
+            server.send_signal(signal.SIGTERM)
+            poll.join()
+            assert server.wait(timeout=15) == 0
+        finally:
+            if server.poll() is None:
+                server.kill()
+        assert responses[0].status_code == 200
+        with pytest.raises(httpx.TransportError):
+            httpx.get(f"{base_url}/health")
@@ -0,0 +1,89 @@
+import inspect
+from uuid import uuid4
+
+import pytest
+
+from copilot_integration_example.routers import async_clients, async_networks
+
+
+class TestAsyncRoutes:
+    """Test the async handlers that replace the core routes when DB_ASYNC is set"""
+
+    def test_core_routes_are_async(self, async_client):
+        endpoints = {
+            (route.path, method): route.endpoint
+            for route in async_client.app.routes
+            for method in getattr(route, "methods", ())
+        }
+        for router in (async_clients.router, async_networks.router):
+            for route in router.routes:
+                for method in route.methods:
+                    assert endpoints[(route.path, method)] is route.endpoint
+                    assert inspect.iscoroutinefunction(route.endpoint)
+
+    def test_client_lifecycle(self, async_client):
+        response = async_client.post("/clients", json={"name": "Async Client"})
+        assert response.status_code == 200
+        client_id = response.json()["id"]
+
+        assert async_client.get(f"/clients/{client_id}").json()["name"] == "Async Client"
+        assert async_client.post("/clients", json={"name": "Async Client"}).status_code == 400
+
+        response = async_client.put(f"/clients/{client_id}", json={"name": "Renamed"})
+        assert response.json() == {"id": client_id, "name": "Renamed"}
+
+        assert async_client.delete(f"/clients/{client_id}").status_code == 200
+        assert async_client.get(f"/clients/{client_id}").status_code == 404
+        assert async_client.delete(f"/clients/{uuid4()}").status_code == 404
+        assert async_client.get("/clients/not-a-uuid").status_code == 404
+
+    def test_network_lifecycle(self, async_client):
+        response = async_client.post("/networks", json={"ipv4": "10.0.0.0/8"})
+        assert response.status_code == 200
+        network_id = response.json()["id"]
+
+        assert async_client.post("/networks", json={"ipv4": "10.0.0.0/8"}).status_code == 400
+        response = async_client.put(f"/networks/{network_id}", json={"ipv4": "10.1.0.0/16"})
+        assert response.json() == {"id": network_id, "ipv4": "10.1.0.0/16"}
+        assert async_client.put("/networks/999999", json={"ipv4": "10.2.0.0/16"}).status_code == 404
+
+        assert async_client.delete(f"/networks/{network_id}").status_code == 200
+        assert async_client.get(f"/networks/{network_id}").status_code == 404
+
+    def test_cursor_pagination(self, async_client):
+        for i in range(5):
+            async_client.post("/networks", json={"ipv4": f"192.168.{i}.0/24"})
+
+        first = async_client.get("/networks?limit=3")
+        second = async_client.get(f"/networks?limit=3&cursor={first.headers['X-Next-Cursor']}")
+        ids = [n["id"] for n in first.json() + second.json()]
+        assert len(ids) == 5
+        assert ids == sorted(set(ids))
+
+    def test_sync_only_routes_still_served(self, async_client):
+        async_client.post("/clients", json={"name": "Exported"})
+
+        response = async_client.get("/clients/export")
+        assert response.status_code == 200
+        assert "Exported" in response.text
+
+        response = async_client.post("/networks/bulk", json=[{"ipv4": "10.0.0.0/8"}])
+        assert response.json()[0]["status"] == "created"
+
+    def test_multi_get(self, async_client):
+        created = [
+            async_client.post("/networks", json={"ipv4": f"10.{i}.0.0/16"}).json()
+            for i in range(2)
+        ]
+        response = async_client.get("/networks/", params={"ids": f"{created[1]['id']},9999,x"})
+        assert response.json() == {"items": [created[1]], "missing": [9999], "invalid": ["x"]}
+        client = async_client.post("/clients", json={"name": "Async"}).json()
+        response = async_client.get("/clients/", params={"ids": client["id"]})
+        assert response.json() == {"items": [client], "missing": [], "invalid": []}
+
+    @pytest.mark.query_budget(4)
+    def test_list_total(self, async_client):
+        async_client.post("/clients", json={"name": "Async"})
+        body = async_client.get("/clients/", params={"include_total": True}).json()
+        assert body["total"] == 1
+        assert body["total_is_estimate"] is False
@@ -0,0 +1,163 @@
+import threading
+import time
+
+import pytest
+from sqlalchemy import text
+
+from copilot_integration_example.api import clear_counts
+from copilot_integration_example.cache import LRUCache, count_cache, entity_cache, entity_key
+from copilot_integration_example.notifications import (
+    CHANGES_CHANNEL,
+    ENTITY_CHANNEL,
+    NotificationListener,
+    split_entity_payload,
+)
+from tests.conftest import TestingSessionLocal, engine
+
+
+class TestLRUCache:
+    """Test the LRU/TTL cache used for entity reads"""
+
+    def test_get_set(self):
+        cache = LRUCache(maxsize=2, ttl=60)
+        assert cache.get("a") is None
+        cache.set("a", 1)
+        assert cache.get("a") == 1
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert cache.stats()["evictions"] == 1
+
+    def test_expires_after_ttl(self):
+        cache = LRUCache(maxsize=2, ttl=0.01)
+        cache.set("a", 1)
+        time.sleep(0.02)
+        assert cache.get("a") is None
+        assert cache.stats()["expirations"] == 1
+
+    def test_stale_generation_is_not_stored(self):
+        cache = LRUCache(maxsize=2, ttl=60)
+        generation = cache.generation
+        cache.invalidate("a")
+        cache.set("a", 1, generation)
+        assert cache.get("a") is None
+
+    def test_disabled(self):
+        cache = LRUCache(maxsize=0, ttl=60)
+        cache.set("a", 1)
+        assert cache.get("a") is None
+
+
+class TestEntityCache:
+    """Test read-through caching of single client and network reads"""
+
+    def test_client_read_is_cached(self, client, statements):
+        client_id = client.post("/clients", json={"name": "Cached"}).json()["id"]
+        assert client.get(f"/clients/{client_id}").json()["name"] == "Cached"
+        assert client.get(f"/clients/{client_id}").json()["name"] == "Cached"
+        assert [s.split()[0] for s in statements] == ["INSERT", "SELECT"]
+
+    def test_client_update_and_delete_invalidate(self, client):
+        client_id = client.post("/clients", json={"name": "Before"}).json()["id"]
+        client.get(f"/clients/{client_id}")
+        client.put(f"/clients/{client_id}", json={"name": "After"})
+        assert client.get(f"/clients/{client_id}").json()["name"] == "After"
+        client.delete(f"/clients/{client_id}")
+        assert client.get(f"/clients/{client_id}").status_code == 404
+
+    def test_missing_rows_are_not_cached(self, client):
+        client.get("/networks/1")
+        assert entity_cache.stats()["size"] == 0
+
+    def test_network_read_is_cached(self, async_client, statements):
+        network_id = async_client.post("/networks", json={"ipv4": "10.0.0.0/8"}).json()["id"]
+        async_client.get(f"/networks/{network_id}")
+        async_client.get(f"/networks/{network_id}")
+        assert str(entity_cache.get(entity_key("network", network_id)).ipv4) == "10.0.0.0/8"
+        async_client.put(f"/networks/{network_id}", json={"ipv4": "10.1.0.0/16"})
+        assert async_client.get(f"/networks/{network_id}").json()["ipv4"] == "10.1.0.0/16"
+
+
+class TestChangeNotifications:
+    """Test that committed changes are published for other workers"""
+
+    def test_update_and_delete_notify(self, client):
+        client_id = client.post("/clients", json={"name": "Watched"}).json()["id"]
+        listening = threading.Event()
+        received = []
+        done = threading.Event()
+
+        def handle(payload):
+            received.append(payload)
+            if len(received) == 2:
+                done.set()
+
+        listener = NotificationListener(engine)
+        listener.subscribe(ENTITY_CHANNEL, handle, on_reset=listening.set)
+        listener.start()
+        try:
+            assert listening.wait(5)
+            client.put(f"/clients/{client_id}", json={"name": "Renamed"})
+            client.delete(f"/clients/{client_id}")
+            assert done.wait(5)
+        finally:
+            listener.stop()
+        assert received == [entity_key("client", client_id)] * 2
+
+    def test_network_notifications_carry_cidr(self, client):
+        listening = threading.Event()
+        received = []
+        done = threading.Event()
+
+        def handle(payload):
+            received.append(payload)
+            if len(received) == 3:
+                done.set()
+
+        listener = NotificationListener(engine)
+        listener.subscribe(ENTITY_CHANNEL, handle, on_reset=listening.set)
+        listener.start()
+        try:
+            assert listening.wait(5)
+            network_id = client.post("/networks/", json={"ipv4": "10.0.0.0/8"}).json()["id"]
+            client.put(f"/networks/{network_id}", json={"ipv4": "10.1.0.0/16"})
+            client.delete(f"/networks/{network_id}")
+            assert done.wait(5)
+        finally:
+            listener.stop()
+        assert [split_entity_payload(payload) for payload in received] == [
+            ("network", str(network_id), "10.0.0.0/8"),
+            ("network", str(network_id), "10.1.0.0/16"),
+            ("network", str(network_id), None),
+        ]
+
+    @pytest.mark.query_budget(4)
+    def test_insert_by_another_worker_drops_counts(self, client):
+        listening = threading.Event()
+        cleared = threading.Event()
+        listener = NotificationListener(engine)
+        listener.subscribe(CHANGES_CHANNEL, clear_counts, on_reset=listening.set)
+        listener.subscribe(CHANGES_CHANNEL, lambda payload: cleared.set())
+        listener.start()
+        try:
+            assert listening.wait(5)
+            count_cache.set("client", 0)
+            # Client inserts send no entity notification
+            with TestingSessionLocal() as db:
+                insert = "INSERT INTO client (id, name) VALUES (gen_random_uuid(), 'Remote')"
+                db.execute(text(insert))
+                db.commit()
+            assert cleared.wait(5)
+        finally:
+            listener.stop()
+        assert count_cache.get("client") is None
+        assert client.get("/clients/", params={"include_total": True}).json()["total"] == 1
@@ -0,0 +1,119 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+from copilot_integration_example import changes
+from copilot_integration_example.changes import ChangeSignal, change_events
+from copilot_integration_example.pagination import encode_cursor
+
+
+def feed(client, **params):
+    response = client.get("/changes", params=params)
+    assert response.status_code == 200
+    return response.json()
+
+
+class TestChangeFeed:
+    """Test reading committed writes from the change feed"""
+
+    def test_writes_in_commit_order(self, client):
+        created = client.post("/clients", json={"name": "Fed"}).json()
+        network = client.post("/networks", json={"ipv4": "10.0.0.0/8"}).json()
+        client.post(f"/clients/{created['id']}/networks", json={"network_ids": [network["id"]]})
+        client.put(f"/clients/{created['id']}", json={"name": "Renamed"})
+        client.delete(f"/clients/{created['id']}")
+        page = feed(client)
+        assert [(c["table"], c["op"]) for c in page["changes"]] == [
+            ("client", "insert"),
+            ("network", "insert"),
+            ("client_network", "insert"),
+            ("client", "update"),
+            ("client", "delete"),
+            # The link goes with the client, in the same transaction
+            ("client_network", "delete"),
+        ]
+        assert page["changes"][0]["entity_id"] == created["id"]
+        assert page["changes"][3]["data"]["name"] == "Renamed"
+        assert page["changes"][4]["data"]["name"] == "Renamed"
+
+    def test_resume_from_cursor(self, client):
+        client.post("/clients", json={"name": "First"})
+        first = feed(client, limit=1)
+        assert len(first["changes"]) == 1
+        client.post("/clients", json={"name": "Second"})
+        rest = feed(client, since=first["cursor"])
+        assert [c["data"]["name"] for c in rest["changes"]] == ["Second"]
+        assert feed(client, since=rest["cursor"]) == {"changes": [], "cursor": rest["cursor"]}
+
+    def test_invalid_cursor(self, client):
+        assert client.get("/changes", params={"since": "not-a-cursor"}).status_code == 400
+        assert client.get("/changes", params={"since": encode_cursor("1")}).status_code == 400
+
+    @pytest.mark.query_budget(4)
+    def test_long_poll_times_out(self, client, monkeypatch):
+        monkeypatch.setattr(changes, "RECHECK_INTERVAL", 0.05)
+        client.post("/clients", json={"name": "Seen"})
+        cursor = feed(client)["cursor"]
+        assert feed(client, since=cursor, wait=0.12) == {"changes": [], "cursor": cursor}
+
+    def test_async(self, async_client):
+        async_client.post("/clients", json={"name": "Fed"})
+        assert [c["op"] for c in feed(async_client)["changes"]] == ["insert"]
+
+
+class TestChangeSignal:
+    """Test waking change feed waiters"""
+
+    def test_notify_from_thread(self):
+        signal = ChangeSignal()
+
+        async def wait():
+            event = signal.waiter()
+            threading.Timer(0.01, signal.notify).start()
+            await asyncio.wait_for(event.wait(), 1)
+            # The next waiter waits for the next notification
+            assert not signal.waiter().is_set()
+
+        asyncio.run(wait())
+
+    def test_new_event_loop(self):
+        signal = ChangeSignal()
+
+        async def waiter():
+            return signal.waiter()
+
+        first = asyncio.run(waiter())
+        # Notifying a closed loop is a no-op
+        signal.notify()
+        assert asyncio.run(waiter()) is not first
+
+
+class TestChangeStream:
+    """Test the Server-Sent Events stream of changes"""
+
+    def test_events(self, client):
+        client.post("/clients", json={"name": "Streamed"})
+        client.post("/networks", json={"ipv4": "10.0.0.0/8"})
+        polls = []
+
+        async def is_disconnected():
+            polls.append(None)
+            return len(polls) > 1
+
+        async def collect():
+            return [event async for event in change_events(None, is_disconnected)]
+
+        events = asyncio.run(collect())
+        assert len(events) == 2
+        lines = events[0].splitlines()
+        assert lines[1] == "event: change"
+        assert json.loads(lines[2].removeprefix("data: "))["data"]["name"] == "Streamed"
+        # The id of the last event resumes after it
+        last_id = events[1].splitlines()[0].removeprefix("id: ")
+        assert feed(client, since=last_id)["changes"] == []
+
+    def test_invalid_last_event_id(self, client):
+        response = client.get("/changes/stream", headers={"Last-Event-ID": "not-a-cursor"})
+        assert response.status_code == 400
@@ -0,0 +1,168 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from copilot_integration_example import coalesce, crud, schemas
+from copilot_integration_example.coalesce import AsyncWriteCoalescer, WriteCoalescer
+from tests.conftest import TestingSessionLocal, async_app
+
+
+def echo_flush(batches):
+    def flush(db, items):
+        batches.append(items)
+        return [ValueError(item) if item < 0 else item * 10 for item in items]
+
+    return flush
+
+
+class TestWriteCoalescer:
+    """Test batching concurrent submits from threads"""
+
+    def test_full_batch_does_not_wait(self):
+        batches = []
+        coalescer = WriteCoalescer(echo_flush(batches), window=10, max_batch=4, max_waiting=4)
+        with ThreadPoolExecutor(4) as pool:
+            results = list(pool.map(lambda item: coalescer.submit(None, item), [1, 2, 3, 4]))
+        assert results == [10, 20, 30, 40]
+        assert [sorted(batch) for batch in batches] == [[1, 2, 3, 4]]
+
+    def test_own_exception(self):
+        coalescer = WriteCoalescer(echo_flush([]), window=0.05, max_batch=10, max_waiting=10)
+        with ThreadPoolExecutor(2) as pool:
+            failed = pool.submit(coalescer.submit, None, -1)
+            succeeded = pool.submit(coalescer.submit, None, 1)
+            assert succeeded.result() == 10
+            with pytest.raises(ValueError):
+                failed.result()
+
+    def test_flush_error_reaches_every_caller(self):
+        def flush(db, items):
+            raise RuntimeError("database went away")
+
+        coalescer = WriteCoalescer(flush, window=0.05, max_batch=10, max_waiting=10)
+        with ThreadPoolExecutor(3) as pool:
+            futures = [pool.submit(coalescer.submit, None, item) for item in range(3)]
+            for future in futures:
+                with pytest.raises(RuntimeError):
+                    future.result()
+
+    def test_overflow_gets_a_new_leader(self):
+        batches = []
+        coalescer = WriteCoalescer(echo_flush(batches), window=0.05, max_batch=2, max_waiting=5)
+        with ThreadPoolExecutor(5) as pool:
+            results = list(pool.map(lambda item: coalescer.submit(None, item), range(5)))
+        assert results == [0, 10, 20, 30, 40]
+        assert sorted(len(batch) for batch in batches) in ([1, 2, 2], [1, 1, 1, 2], [1, 1, 1, 1, 1])
+        assert all(len(batch) <= 2 for batch in batches)
+
+    def test_waiting_threads_are_bounded(self):
+        batches = []
+        coalescer = WriteCoalescer(echo_flush(batches), window=1, max_batch=10, max_waiting=1)
+        with ThreadPoolExecutor(3) as pool:
+            leader = pool.submit(coalescer.submit, None, 1)
+            time.sleep(0.05)
+            follower = pool.submit(coalescer.submit, None, 2)
+            time.sleep(0.05)
+            # Does not wait out the window for a thread slot
+            assert pool.submit(coalescer.submit, None, 3).result(timeout=0.5) == 30
+            assert (leader.result(), follower.result()) == (10, 20)
+        assert [sorted(batch) for batch in batches] == [[3], [1, 2]]
+
+
+class TestAsyncWriteCoalescer:
+    """Test batching concurrent submits on the event loop"""
+
+    def test_batches(self):
+        batches = []
+
+        async def flush(db, items):
+            return echo_flush(batches)(db, items)
+
+        coalescer = AsyncWriteCoalescer(flush, window=0.05, max_batch=3)
+
+        async def submit(item):
+            try:
+                return await coalescer.submit(None, item)
+            except ValueError:
+                return "failed"
+
+        async def run():
+            return await asyncio.gather(*(submit(item) for item in [1, -1, 2, 3, 4]))
+
+        assert asyncio.run(run()) == [10, "failed", 20, 30, 40]
+        assert batches == [[1, -1, 2], [3, 4]]
+
+    def test_cancelled_leader_hands_off(self):
+        coalescer = AsyncWriteCoalescer(
+            lambda db, items: asyncio.sleep(0, list(items)), window=0.05, max_batch=10
+        )
+
+        async def run():
+            leader = asyncio.ensure_future(coalescer.submit(None, "leader"))
+            follower = asyncio.ensure_future(coalescer.submit(None, "follower"))
+            await asyncio.sleep(0)
+            leader.cancel()
+            return await follower
+
+        assert asyncio.run(run()) == "follower"
+
+
+class TestCoalescedCreates:
+    """Test writing coalesced creates"""
+
+    def test_clients(self, client):
+        existing = client.post("/clients", json={"name": "Existing"}).json()
+        names = ["New", "Existing", "New", "Other"]
+        with TestingSessionLocal() as db:
+            results = crud.create_clients(db, [schemas.ClientCreate(name=name) for name in names])
+        assert [r.name if not isinstance(r, HTTPException) else r.status_code for r in results] == [
+            "New", 400, 400, "Other",
+        ]
+        assert results[0].id != existing["id"]
+        assert client.get(f"/clients/{results[0].id}").json()["name"] == "New"
+
+    def test_networks(self, client):
+        client.post("/networks", json={"ipv4": "10.0.0.0/8"})
+        addresses = [None, "10.0.0.0/8", "192.168.0.0/16", None]
+        with TestingSessionLocal() as db:
+            networks = [schemas.NetworkCreate(ipv4=ipv4) for ipv4 in addresses]
+            results = crud.create_networks(db, networks)
+        assert isinstance(results[1], HTTPException)
+        assert results[1].detail == "Network IPv4 already exists"
+        assert results[2].ipv4 == "192.168.0.0/16"
+        assert results[0].id != results[3].id and results[0].ipv4 is None
+        assert len(client.get("/networks/").json()) == 4
+
+    def test_concurrent_posts(self, client, monkeypatch):
+        monkeypatch.setattr(coalesce.client_creates, "window", 0.05)
+        barrier = threading.Barrier(6)
+
+        def post(name):
+            barrier.wait()
+            return client.post("/clients", json={"name": name})
+
+        with ThreadPoolExecutor(6) as pool:
+            responses = list(pool.map(post, ["a", "b", "c", "d", "e", "a"]))
+        assert sorted(r.status_code for r in responses) == [200] * 5 + [400]
+        for body in [r.json() for r in responses if r.status_code == 200]:
+            assert client.get(f"/clients/{body['id']}").json() == body
+
+    def test_concurrent_async_posts(self, async_client, monkeypatch):
+        monkeypatch.setattr(coalesce.async_network_creates, "window", 0.05)
+
+        # One event loop for all requests, as under uvicorn
+        async def post_all():
+            transport = httpx.ASGITransport(app=async_app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+                addresses = ["10.0.0.0/8", "10.0.0.0/8", None, "192.168.0.0/16"]
+                posts = (http.post("/networks/", json={"ipv4": a}) for a in addresses)
+                return await asyncio.gather(*posts)
+
+        responses = asyncio.run(post_all())
+        assert [r.status_code for r in responses].count(400) == 1
+        assert len(async_client.get("/networks/").json()) == 3
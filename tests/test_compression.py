@@ -0,0 +1,69 @@
+import pytest
+
+from copilot_integration_example.compression import preferred_encoding
+
+
+class TestPreferredEncoding:
+    """Test negotiating the response encoding from Accept-Encoding"""
+
+    @pytest.mark.parametrize(
+        "accept_encoding, expected",
+        [
+            ("", None),
+            ("identity", None),
+            ("gzip, deflate", "gzip"),
+            ("gzip, deflate, br, zstd", "br"),
+            ("br;q=0.5, gzip", "gzip"),
+            ("br;q=0, gzip;q=0", None),
+            ("*", "br"),
+            ("*;q=0.1, gzip;q=0.5", "gzip"),
+            ("GZIP;Q=1", "gzip"),
+            ("br;q=bad, gzip", "gzip"),
+        ],
+    )
+    def test_negotiation(self, accept_encoding, expected):
+        assert preferred_encoding(accept_encoding) == expected
+
+
+def create_clients(client, count):
+    clients = [{"name": f"Compressed client {i}"} for i in range(count)]
+    response = client.post("/clients/bulk", json=clients)
+    assert response.status_code == 200
+
+
+class TestCompression:
+    """Test compressing large responses and leaving small ones alone"""
+
+    def test_brotli_and_gzip(self, client):
+        create_clients(client, 100)
+        plain = client.get("/clients/", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in plain.headers
+        for encoding in ("br", "gzip"):
+            response = client.get("/clients/", headers={"Accept-Encoding": encoding})
+            assert response.headers["content-encoding"] == encoding
+            assert response.headers["vary"] == "Accept-Encoding"
+            assert int(response.headers["content-length"]) < len(plain.content) / 2
+            # Decoded by the client
+            assert response.json() == plain.json()
+
+    def test_small_responses_are_not_compressed(self, client):
+        create_clients(client, 1)
+        response = client.get("/clients/", headers={"Accept-Encoding": "br, gzip"})
+        assert "content-encoding" not in response.headers
+        response = client.get("/health", headers={"Accept-Encoding": "br"})
+        assert "content-encoding" not in response.headers
+
+    def test_compressed_etag_is_weak(self, client):
+        create_clients(client, 100)
+        plain = client.get("/clients/", headers={"Accept-Encoding": "identity"})
+        response = client.get("/clients/", headers={"Accept-Encoding": "br"})
+        assert response.headers["etag"] == f"W/{plain.headers['etag']}"
+        headers = {"Accept-Encoding": "br", "If-None-Match": response.headers["etag"]}
+        revalidated = client.get("/clients/", headers=headers)
+        assert revalidated.status_code == 304
+
+    def test_export_stream_is_compressed(self, client):
+        create_clients(client, 100)
+        response = client.get("/clients/export", headers={"Accept-Encoding": "br"})
+        assert response.headers["content-encoding"] == "br"
+        assert len(response.text.splitlines()) == 100
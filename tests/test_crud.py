@@ -1,5 +1,18 @@
+import csv
+import io
+import json
 from uuid import uuid4
 
+import pytest
+from sqlalchemy import text
+
+from copilot_integration_example import crud, schemas
+from copilot_integration_example.api import refresh_network_index
+from copilot_integration_example.cache import count_cache, entity_cache
+from copilot_integration_example.models import ClientNetwork
+from copilot_integration_example.query_stats import QueryStats, current_stats
+from tests.conftest import TestingSessionLocal
+
 
 class TestClientCRUD:
     """Test Client CRUD operations"""
@@ -221,4 +234,623 @@ class TestPagination:
         response = client.get("/networks?skip=2&limit=3")
         assert response.status_code == 200
         data = response.json()
-        assert len(data) == 3
\ No newline at end of file
+        assert len(data) == 3
+
+    def test_clients_cursor_pagination(self, client):
+        for i in range(5):
+            client.post("/clients", json={"name": f"Client {i}"})
+
+        seen = []
+        response = client.get("/clients?limit=2")
+        while True:
+            assert response.status_code == 200
+            seen.extend(c["id"] for c in response.json())
+            next_cursor = response.headers.get("X-Next-Cursor")
+            if next_cursor is None:
+                break
+            response = client.get(f"/clients?limit=2&cursor={next_cursor}")
+
+        assert len(seen) == 5
+        assert seen == sorted(seen)
+
+    def test_networks_cursor_pagination(self, client):
+        for i in range(5):
+            client.post("/networks", json={"ipv4": f"192.168.{i}.0/24"})
+
+        first = client.get("/networks?limit=3")
+        assert len(first.json()) == 3
+        second = client.get(f"/networks?limit=3&cursor={first.headers['X-Next-Cursor']}")
+        assert second.status_code == 200
+        ids = [n["id"] for n in first.json() + second.json()]
+        assert len(ids) == 5
+        assert ids == sorted(set(ids))
+        assert "X-Next-Cursor" not in second.headers
+
+    def test_invalid_cursor(self, client):
+        response = client.get("/networks?cursor=not-a-cursor")
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Invalid cursor"
+
+    def test_cursor_with_skip_rejected(self, client):
+        response = client.get("/networks?skip=1&cursor=MQ")
+        assert response.status_code == 400
+
+
+class TestBulkCreate:
+    """Test bulk create endpoints"""
+
+    def test_bulk_create_clients(self, client):
+        existing = client.post("/clients", json={"name": "Existing"}).json()
+
+        response = client.post(
+            "/clients/bulk",
+            json=[
+                {"name": "New 1"},
+                {"name": "Existing"},
+                {"nope": 1},
+                {"name": "New 1"},
+                {"name": "New 2"},
+            ],
+        )
+        assert response.status_code == 200
+        data = response.json()
+        statuses = ["created", "duplicate", "invalid", "duplicate", "created"]
+        assert [r["status"] for r in data] == statuses
+        assert [r["index"] for r in data] == [0, 1, 2, 3, 4]
+        assert data[1]["id"] == existing["id"]
+        assert data[3]["id"] == data[0]["id"]
+        assert data[2]["id"] is None
+        assert data[2]["detail"]
+
+        names = {c["name"] for c in client.get("/clients").json()}
+        assert names == {"Existing", "New 1", "New 2"}
+
+    @pytest.mark.query_budget(3)
+    def test_bulk_create_networks(self, client):
+        existing = client.post("/networks", json={"ipv4": "10.0.0.0/8"}).json()
+
+        response = client.post(
+            "/networks/bulk",
+            json=[{"ipv4": "10.0.0.0/8"}, {"ipv4": "192.168.0.0/16"}, {}, {"ipv4": None}, "bad"],
+        )
+        assert response.status_code == 200
+        data = response.json()
+        statuses = ["duplicate", "created", "created", "created", "invalid"]
+        assert [r["status"] for r in data] == statuses
+        assert data[0]["id"] == existing["id"]
+        assert len({data[1]["id"], data[2]["id"], data[3]["id"]}) == 3
+        assert client.get(f"/networks/{data[3]['id']}").json()["ipv4"] is None
+
+    @pytest.mark.query_budget(3)
+    def test_bulk_create_spans_batches(self, client, monkeypatch):
+        monkeypatch.setattr("copilot_integration_example.crud.BULK_BATCH_SIZE", 2)
+        networks = [{"ipv4": f"172.16.{i}.0/24"} for i in range(5)]
+        response = client.post("/networks/bulk", json=networks)
+        assert [r["status"] for r in response.json()] == ["created"] * 5
+        assert len(client.get("/networks").json()) == 5
+
+    def test_bulk_create_requires_array(self, client):
+        response = client.post("/clients/bulk", json={"name": "Not a list"})
+        assert response.status_code == 422
+
+
+class TestExport:
+    """Test streaming export endpoints"""
+
+    def test_export_clients_ndjson(self, client, monkeypatch):
+        monkeypatch.setattr("copilot_integration_example.export.EXPORT_BATCH_SIZE", 2)
+        created = [client.post("/clients", json={"name": f"Client {i}"}).json() for i in range(5)]
+
+        response = client.get("/clients/export")
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert sorted(rows, key=lambda r: r["name"]) == sorted(created, key=lambda r: r["name"])
+
+    def test_export_networks_csv(self, client):
+        first = client.post("/networks", json={"ipv4": "10.0.0.0/8"}).json()
+        second = client.post("/networks", json={}).json()
+
+        response = client.get("/networks/export?format=csv")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+        assert 'filename="networks.csv"' in response.headers["content-disposition"]
+        assert list(csv.reader(io.StringIO(response.text))) == [
+            ["id", "ipv4"],
+            [str(first["id"]), "10.0.0.0/8"],
+            [str(second["id"]), ""],
+        ]
+
+    def test_export_client_networks(self, client):
+        client_id = client.post("/clients", json={"name": "Linked"}).json()["id"]
+        network_id = client.post("/networks", json={"ipv4": "10.0.0.0/8"}).json()["id"]
+        with TestingSessionLocal() as db:
+            db.add(ClientNetwork(client_id=client_id, network_id=network_id))
+            db.commit()
+
+        response = client.get("/client-networks/export")
+        assert response.status_code == 200
+        [row] = [json.loads(line) for line in response.text.splitlines()]
+        assert row["client_id"] == client_id
+        assert row["network_id"] == network_id
+
+    def test_export_invalid_format(self, client):
+        response = client.get("/clients/export?format=xml")
+        assert response.status_code == 422
+
+
+class TestRoundTrips:
+    """Test that each write is a single statement"""
+
+    def test_client_writes(self, client, statements):
+        client_id = client.post("/clients", json={"name": "Client"}).json()["id"]
+        client.put(f"/clients/{client_id}", json={"name": "Renamed"})
+        client.delete(f"/clients/{client_id}")
+        assert [s.split()[0] for s in statements] == ["INSERT", "UPDATE", "DELETE"]
+        assert all("RETURNING" in s for s in statements)
+
+    def test_client_writes_not_found(self, client, statements):
+        assert client.put(f"/clients/{uuid4()}", json={"name": "Nobody"}).status_code == 404
+        assert client.delete(f"/clients/{uuid4()}").status_code == 404
+        assert client.put("/clients/not-a-uuid", json={"name": "Nobody"}).status_code == 404
+        assert len(statements) == 2
+
+    def test_client_update_duplicate_name(self, client, statements):
+        client.post("/clients", json={"name": "Taken"})
+        client_id = client.post("/clients", json={"name": "Free"}).json()["id"]
+        response = client.put(f"/clients/{client_id}", json={"name": "Taken"})
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Client name already exists"
+        assert len(statements) == 3
+
+    def test_network_writes(self, client, statements):
+        network_id = client.post("/networks", json={"ipv4": "10.0.0.0/8"}).json()["id"]
+        client.put(f"/networks/{network_id}", json={"ipv4": "10.1.0.0/16"})
+        client.delete(f"/networks/{network_id}")
+        assert [s.split()[0] for s in statements] == ["INSERT", "UPDATE", "DELETE"]
+        assert all("RETURNING" in s for s in statements)
+
+
+class TestNetworkLookup:
+    """Test CIDR validation and containment lookups"""
+
+    def test_ipv4_is_normalized(self, client):
+        assert client.post("/networks", json={"ipv4": "10.0.0.1"}).json()["ipv4"] == "10.0.0.1/32"
+
+    def test_invalid_ipv4(self, client):
+        assert client.post("/networks", json={"ipv4": "not-a-network"}).status_code == 422
+        assert client.post("/networks", json={"ipv4": "10.0.0.1/8"}).status_code == 422
+        assert client.post("/networks", json={"ipv4": "10.0.0.0/33"}).status_code == 422
+
+    def test_lookup_longest_prefix(self, client):
+        client.post("/networks", json={"ipv4": "10.0.0.0/8"})
+        subnet_id = client.post("/networks", json={"ipv4": "10.1.0.0/16"}).json()["id"]
+        response = client.get("/networks/lookup", params={"ip": "10.1.2.3"})
+        assert response.status_code == 200
+        assert response.json() == {"id": subnet_id, "ipv4": "10.1.0.0/16"}
+        response = client.get("/networks/lookup", params={"ip": "10.2.0.1"})
+        assert response.json()["ipv4"] == "10.0.0.0/8"
+
+    def test_lookup_no_match(self, client):
+        client.post("/networks", json={"ipv4": "10.0.0.0/8"})
+        assert client.get("/networks/lookup", params={"ip": "192.168.0.1"}).status_code == 404
+        assert client.get("/networks/lookup", params={"ip": "not-an-ip"}).status_code == 422
+
+    def test_lookup_follows_writes(self, client):
+        network_id = client.post("/networks", json={"ipv4": "10.0.0.0/8"}).json()["id"]
+        assert client.get("/networks/lookup", params={"ip": "10.1.2.3"}).status_code == 200
+        client.put(f"/networks/{network_id}", json={"ipv4": "172.16.0.0/12"})
+        assert client.get("/networks/lookup", params={"ip": "10.1.2.3"}).status_code == 404
+        response = client.get("/networks/lookup", params={"ip": "172.16.1.1"})
+        assert response.json()["id"] == network_id
+        client.post("/networks/bulk", json=[{"ipv4": "172.16.1.0/24"}])
+        response = client.get("/networks/lookup", params={"ip": "172.16.1.1"})
+        assert response.json()["ipv4"] == "172.16.1.0/24"
+        client.delete(f"/networks/{network_id}")
+        assert client.get("/networks/lookup", params={"ip": "172.16.2.1"}).status_code == 404
+
+    def test_containing(self, client):
+        client.post("/networks", json={"ipv4": "10.0.0.0/8"})
+        client.post("/networks", json={"ipv4": "10.1.0.0/16"})
+        client.post("/networks", json={"ipv4": "192.168.0.0/16"})
+        response = client.get("/networks/containing", params={"ip": "10.1.2.3"})
+        assert [n["ipv4"] for n in response.json()] == ["10.1.0.0/16", "10.0.0.0/8"]
+
+    def test_containing_uses_gist_index(self):
+        with TestingSessionLocal() as db:
+            db.execute(text("SET LOCAL enable_seqscan = off"))
+            explain = text("EXPLAIN SELECT id FROM network WHERE ipv4 >>= '10.1.2.3'")
+            plan = db.execute(explain).scalars().all()
+        assert any("ix_network_ipv4_gist" in line for line in plan)
+
+    def test_refresh_from_notification(self, client):
+        assert client.get("/networks/lookup", params={"ip": "10.0.0.1"}).status_code == 404
+        with TestingSessionLocal() as db:
+            # A row written by another worker
+            insert = text("INSERT INTO network (ipv4) VALUES ('10.0.0.0/8') RETURNING id")
+            network_id = db.execute(insert).scalar()
+            db.commit()
+        # Applied from the notification payload alone
+        refresh_network_index(f"network:{network_id}:10.0.0.0/8")
+        assert client.get("/networks/lookup", params={"ip": "10.0.0.1"}).json()["id"] == network_id
+        refresh_network_index(f"network:{network_id}:")
+        assert client.get("/networks/lookup", params={"ip": "10.0.0.1"}).status_code == 404
+        refresh_network_index(f"network:{network_id}:10.0.0.0/8")
+        refresh_network_index(f"network:{network_id}")
+        assert client.get("/networks/lookup", params={"ip": "10.0.0.1"}).status_code == 404
+
+
+class TestClientNetworks:
+    """Test attaching, detaching and listing client networks"""
+
+    def create(self, client, clients=1, networks=3):
+        client_ids = [
+            client.post("/clients", json={"name": f"Client {i}"}).json()["id"]
+            for i in range(clients)
+        ]
+        network_ids = [
+            client.post("/networks", json={"ipv4": f"10.{i}.0.0/16"}).json()["id"]
+            for i in range(networks)
+        ]
+        return client_ids, network_ids
+
+    def test_attach_and_list(self, client):
+        (client_id,), network_ids = self.create(client)
+        response = client.post(
+            f"/clients/{client_id}/networks", json={"network_ids": network_ids[:2]}
+        )
+        assert response.status_code == 200
+        assert response.json() == {"network_ids": network_ids[:2]}
+        response = client.get(f"/clients/{client_id}/networks")
+        assert [n["id"] for n in response.json()] == network_ids[:2]
+        response = client.get(f"/networks/{network_ids[0]}/clients")
+        assert [c["id"] for c in response.json()] == [client_id]
+
+    def test_attach_skips_existing_and_unknown(self, client, statements):
+        (client_id,), network_ids = self.create(client)
+        client.post(f"/clients/{client_id}/networks", json={"network_ids": network_ids[:2]})
+        statements.clear()
+        response = client.post(
+            f"/clients/{client_id}/networks", json={"network_ids": network_ids + [9999]}
+        )
+        assert response.json() == {"network_ids": network_ids[2:]}
+        assert len(statements) == 1
+        assert len(client.get(f"/clients/{client_id}/networks").json()) == 3
+
+    def test_detach(self, client, statements):
+        (client_id,), network_ids = self.create(client)
+        client.post(f"/clients/{client_id}/networks", json={"network_ids": network_ids})
+        statements.clear()
+        response = client.request(
+            "DELETE",
+            f"/clients/{client_id}/networks",
+            json={"network_ids": network_ids[:2] + [9999]},
+        )
+        assert response.json() == {"network_ids": network_ids[:2]}
+        assert len(statements) == 1
+        networks = client.get(f"/clients/{client_id}/networks").json()
+        assert [n["id"] for n in networks] == network_ids[2:]
+
+    def test_unknown_client(self, client):
+        _, network_ids = self.create(client, clients=0)
+        for client_id in (str(uuid4()), "not-a-uuid"):
+            assert client.get(f"/clients/{client_id}/networks").status_code == 404
+            links = {"network_ids": network_ids}
+            response = client.post(f"/clients/{client_id}/networks", json=links)
+            assert response.status_code == 404
+            response = client.request("DELETE", f"/clients/{client_id}/networks", json=links)
+            assert response.status_code == 404
+        assert client.get("/networks/9999/clients").status_code == 404
+
+    def test_empty_lists(self, client):
+        (client_id,), network_ids = self.create(client, networks=1)
+        assert client.get(f"/clients/{client_id}/networks").json() == []
+        assert client.get(f"/networks/{network_ids[0]}/clients").json() == []
+        response = client.post(f"/clients/{client_id}/networks", json={"network_ids": []})
+        assert response.json() == {"network_ids": []}
+
+    def test_links_removed_with_client(self, client):
+        (client_id,), network_ids = self.create(client)
+        client.post(f"/clients/{client_id}/networks", json={"network_ids": network_ids})
+        client.delete(f"/clients/{client_id}")
+        assert client.get(f"/networks/{network_ids[0]}/clients").json() == []
+
+    def test_list_with_networks(self, client):
+        client_ids, network_ids = self.create(client, clients=3)
+        for client_id in client_ids:
+            client.post(f"/clients/{client_id}/networks", json={"network_ids": network_ids[:2]})
+        response = client.get("/clients/with-networks", params={"limit": 2})
+        data = response.json()
+        assert [c["id"] for c in data] == sorted(client_ids)[:2]
+        assert all([n["id"] for n in c["networks"]] == network_ids[:2] for c in data)
+        response = client.get(
+            "/clients/with-networks", params={"cursor": response.headers["X-Next-Cursor"]}
+        )
+        assert [c["id"] for c in response.json()] == sorted(client_ids)[2:]
+
+    def test_list_with_networks_query_count(self, client, statements):
+        """Listing clients with their networks costs the same number of queries for any page size"""
+        counts = []
+        for clients in (2, 20):
+            client_ids, network_ids = self.create(client, clients=clients)
+            for client_id in client_ids:
+                client.post(f"/clients/{client_id}/networks", json={"network_ids": network_ids})
+            statements.clear()
+            assert len(client.get("/clients/with-networks").json()) == clients
+            counts.append(len(statements))
+            for client_id in client_ids:
+                client.delete(f"/clients/{client_id}")
+            for network_id in network_ids:
+                client.delete(f"/networks/{network_id}")
+        assert counts == [2, 2]
+
+
+class TestQueryStats:
+    """Test per-request query accounting"""
+
+    def test_server_timing_header(self, client):
+        client_id = client.post("/clients", json={"name": "Timed"}).json()["id"]
+        entity_cache.clear()
+        response = client.get(f"/clients/{client_id}")
+        assert response.headers["server-timing"].startswith("db;dur=")
+        assert response.headers["server-timing"].endswith('desc="1 queries"')
+        response = client.get(f"/clients/{client_id}")
+        assert response.headers["server-timing"].endswith('desc="0 queries"')
+
+    def test_query_budget_exceeded(self, client):
+        client.post("/networks", json={"ipv4": "10.0.0.0/8"})
+        with pytest.raises(AssertionError, match="over its budget of 2"):
+            client.post("/networks/bulk", json=[{"ipv4": None}, {"ipv4": "10.0.0.0/8"}])
+
+    def test_slow_query_log(self, client, monkeypatch, caplog):
+        monkeypatch.setattr("copilot_integration_example.query_stats.SLOW_QUERY_MS", 0.001)
+        with caplog.at_level("WARNING", logger="copilot_integration_example.query_stats"):
+            client.get("/clients")
+        assert "Slow query" in caplog.text
+
+    def test_failed_statement(self):
+        stats = QueryStats()
+        token = current_stats.set(stats)
+        try:
+            with TestingSessionLocal() as db:
+                with pytest.raises(Exception, match="division by zero"):
+                    db.execute(text("SELECT 1 / 0"))
+                db.rollback()
+                db.execute(text("SELECT 1"))
+                # Nothing is left behind on the connection by the statement that failed
+                assert "query_start_time" not in db.connection().info
+        finally:
+            current_stats.reset(token)
+        assert stats.count == 1
+
+
+class TestMultiGet:
+    """Test fetching many clients or networks by id"""
+
+    def test_clients(self, client, statements):
+        created = [client.post("/clients", json={"name": f"Client {i}"}).json() for i in range(3)]
+        missing = str(uuid4())
+        entity_cache.clear()
+        statements.clear()
+        response = client.get(
+            "/clients/", params={"ids": f"{created[2]['id']},{missing},not-a-uuid", "limit": 1}
+        )
+        assert response.status_code == 200
+        assert response.json() == {
+            "items": [created[2]],
+            "missing": [missing],
+            "invalid": ["not-a-uuid"],
+        }
+        assert len(statements) == 1
+        assert "ANY" in statements[0]
+
+    def test_repeated_and_duplicate_ids(self, client):
+        created = [client.post("/clients", json={"name": f"Client {i}"}).json() for i in range(3)]
+        ids = [created[1]["id"], created[0]["id"], created[1]["id"]]
+        response = client.get("/clients/", params={"ids": ids})
+        assert response.json()["items"] == [created[1], created[0]]
+
+    def test_served_from_cache(self, client, statements):
+        created = [client.post("/clients", json={"name": f"Client {i}"}).json() for i in range(2)]
+        client.get("/clients/", params={"ids": ",".join(c["id"] for c in created)})
+        statements.clear()
+        client.get(f"/clients/{created[0]['id']}")
+        response = client.get("/clients/", params={"ids": ",".join(c["id"] for c in created)})
+        assert response.json()["items"] == created
+        assert statements == []
+
+    def test_networks(self, client, statements):
+        created = [
+            client.post("/networks", json={"ipv4": f"10.{i}.0.0/16"}).json() for i in range(3)
+        ]
+        statements.clear()
+        ids = f"{created[0]['id']},{created[2]['id']},9999,abc,99999999999"
+        response = client.get("/networks/", params={"ids": ids})
+        assert response.json() == {
+            "items": [created[0], created[2]],
+            "missing": [9999],
+            "invalid": ["abc", "99999999999"],
+        }
+        assert len(statements) == 1
+
+    def test_too_many_ids(self, client):
+        response = client.get("/networks/", params={"ids": ",".join(str(i) for i in range(1001))})
+        assert response.status_code == 400
+
+    def test_plain_list_unchanged(self, client):
+        client.post("/networks", json={"ipv4": "10.0.0.0/8"})
+        assert isinstance(client.get("/networks/").json(), list)
+
+
+@pytest.fixture
+def pg_trgm():
+    with TestingSessionLocal() as db:
+        installed = db.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).first()
+    if installed is None:
+        pytest.skip("pg_trgm is not available on the test database")
+
+
+def explain(db, statement):
+    db.execute(text("SET LOCAL enable_seqscan = off"))
+    sql = str(statement.compile(bind=db.get_bind(), compile_kwargs={"literal_binds": True}))
+    return "\n".join(db.execute(text("EXPLAIN " + sql)).scalars())
+
+
+class TestSearch:
+    """Test searching clients by name"""
+
+    names = ["Acme Corp", "acme labs", "Acmeville", "Apex", "Beta 100% Acme", "Bacme_1"]
+
+    def create_clients(self, client):
+        for name in self.names:
+            client.post("/clients", json={"name": name})
+
+    def test_prefix(self, client):
+        self.create_clients(client)
+        response = client.get("/clients/search", params={"q": "ACME", "mode": "prefix"})
+        assert response.status_code == 200
+        assert [c["name"] for c in response.json()] == ["Acme Corp", "acme labs", "Acmeville"]
+
+    def test_prefix_wildcards_are_literal(self, client):
+        self.create_clients(client)
+        response = client.get("/clients/search", params={"q": "bacme_", "mode": "prefix"})
+        assert [c["name"] for c in response.json()] == ["Bacme_1"]
+        response = client.get("/clients/search", params={"q": "%", "mode": "prefix"})
+        assert response.json() == []
+
+    def test_limit(self, client):
+        self.create_clients(client)
+        response = client.get("/clients/search", params={"q": "a", "mode": "prefix", "limit": 2})
+        assert len(response.json()) == 2
+        assert client.get("/clients/search", params={"q": "a", "limit": 101}).status_code == 422
+        assert client.get("/clients/search", params={"q": ""}).status_code == 422
+
+    def test_prefix_uses_index(self):
+        with TestingSessionLocal() as db:
+            plan = explain(db, crud.search_clients_statement("acme", schemas.SearchMode.prefix, 20))
+        assert "ix_client_name_prefix" in plan
+
+    def test_fuzzy(self, client, pg_trgm):
+        self.create_clients(client)
+        response = client.get("/clients/search", params={"q": "acme"})
+        names = [c["name"] for c in response.json()]
+        # Prefix matches first, then substring and similar names
+        assert set(names[:3]) == {"Acme Corp", "acme labs", "Acmeville"}
+        assert "Beta 100% Acme" in names[3:]
+        assert "Apex" not in names
+
+    def test_fuzzy_tolerates_typos(self, client, pg_trgm):
+        self.create_clients(client)
+        response = client.get("/clients/search", params={"q": "Acmevile"})
+        assert response.json()[0]["name"] == "Acmeville"
+
+    def test_fuzzy_uses_index(self, pg_trgm):
+        with TestingSessionLocal() as db:
+            plan = explain(db, crud.search_clients_statement("acme", schemas.SearchMode.fuzzy, 20))
+        assert "ix_client_name_trgm" in plan
+
+
+class TestListTotals:
+    """Test the total count envelope of the list endpoints"""
+
+    @pytest.mark.query_budget(4)
+    def test_exact_total(self, client):
+        for i in range(3):
+            client.post("/clients", json={"name": f"Client {i}"})
+        response = client.get("/clients/", params={"include_total": True, "limit": 2})
+        body = response.json()
+        assert [c["name"] for c in body["items"]] == ["Client 0", "Client 1"]
+        assert body["total"] == 3
+        assert body["total_is_estimate"] is False
+        assert "x-next-cursor" in response.headers
+
+    @pytest.mark.query_budget(4)
+    def test_total_cached_and_invalidated(self, client, statements):
+        network = client.post("/networks", json={"ipv4": "10.0.0.0/8"}).json()
+        assert client.get("/networks/", params={"include_total": True}).json()["total"] == 1
+        statements.clear()
+        assert client.get("/networks/", params={"include_total": True}).json()["total"] == 1
+        # The table version and the page, but no count
+        assert len(statements) == 2
+        client.post("/networks", json={"ipv4": "10.1.0.0/16"})
+        assert client.get("/networks/", params={"include_total": True}).json()["total"] == 2
+        client.delete(f"/networks/{network['id']}")
+        assert client.get("/networks/", params={"include_total": True}).json()["total"] == 1
+
+    @pytest.mark.query_budget(3)
+    def test_estimate_for_large_tables(self, client, monkeypatch):
+        with TestingSessionLocal() as db:
+            db.execute(text("INSERT INTO network (ipv4) SELECT NULL FROM generate_series(1, 500)"))
+            db.execute(text("ANALYZE network"))
+            db.commit()
+        monkeypatch.setattr(crud, "COUNT_ESTIMATE_THRESHOLD", 100)
+        body = client.get("/networks/", params={"include_total": True, "limit": 1}).json()
+        assert body["total_is_estimate"] is True
+        assert body["total"] == 500
+        assert len(body["items"]) == 1
+
+    def test_bare_list_by_default(self, client):
+        client.post("/clients", json={"name": "Client"})
+        assert isinstance(client.get("/clients/").json(), list)
+        assert count_cache.stats()["size"] == 0
+
+
+class TestListSerialization:
+    """Test that list pages serialized from plain rows match the response models"""
+
+    def test_networks(self, client, async_client):
+        created = [
+            client.post("/networks", json={"ipv4": "10.0.0.0/8"}).json(),
+            client.post("/networks", json={"ipv4": "192.168.1.1"}).json(),
+            client.post("/networks", json={}).json(),
+        ]
+        for app_client in (client, async_client):
+            response = app_client.get("/networks/")
+            assert response.headers["content-type"] == "application/json"
+            assert response.json() == created
+            assert [schemas.Network(**network) for network in response.json()]
+
+    def test_clients(self, client):
+        created = client.post("/clients", json={"name": 'Quote " and \\ backslash'}).json()
+        assert client.get("/clients/").json() == [created]
+
+
+class TestSparseFieldsets:
+    """Test restricting list pages to the fields asked for"""
+
+    def test_selects_only_requested_columns(self, client, statements):
+        client.post("/clients", json={"name": "Client"})
+        statements.clear()
+        body = client.get("/clients/", params={"fields": "id"}).json()
+        assert list(body[0]) == ["id"]
+        page_query = statements[-1]
+        assert "client.name" not in page_query and "client.id" in page_query
+
+    def test_fields_in_any_form(self, client, async_client):
+        created = client.post("/networks", json={"ipv4": "10.0.0.0/8"}).json()
+        for app_client in (client, async_client):
+            assert app_client.get("/networks/", params={"fields": "ipv4"}).json() == [created]
+            assert app_client.get("/networks/?fields=id&fields=ipv4").json() == [created]
+            response = app_client.get("/networks/", params={"fields": "id,"})
+            assert response.json() == [{"id": created["id"]}]
+
+    @pytest.mark.query_budget(4)
+    def test_with_cursor_and_total(self, client):
+        for i in range(3):
+            client.post("/clients", json={"name": f"Client {i}"})
+        response = client.get(
+            "/clients/", params={"fields": "id", "limit": 2, "include_total": True}
+        )
+        assert [list(item) for item in response.json()["items"]] == [["id"], ["id"]]
+        assert response.json()["total"] == 3
+        cursor = response.headers["x-next-cursor"]
+        rest = client.get("/clients/", params={"fields": "id", "cursor": cursor}).json()
+        assert len(rest) == 1
+
+    def test_invalid_fields(self, client, async_client):
+        for app_client in (client, async_client):
+            response = app_client.get("/clients/", params={"fields": "name,secret"})
+            assert response.status_code == 400
+            assert "secret" in response.json()["detail"]
+            response = app_client.get("/networks/", params={"fields": "id", "ids": "1"})
+            assert response.status_code == 400
@@ -0,0 +1,132 @@
+import pytest
+from sqlalchemy import Connection, text
+
+from copilot_integration_example import crud, models
+from copilot_integration_example.etag import etag_matches
+from tests.conftest import TestingSessionLocal, engine
+
+
+def backend_shard(connection: Connection) -> int:
+    statement = text("SELECT pg_backend_pid() % :shards")
+    return connection.execute(statement, {"shards": models.TABLE_VERSION_SHARDS}).scalar()
+
+
+class TestEtagMatches:
+    """Test If-None-Match parsing"""
+
+    @pytest.mark.parametrize(
+        "header, expected",
+        [
+            (None, False),
+            ('"1"', True),
+            ('W/"1"', True),
+            ('"2", "1"', True),
+            ('"2"', False),
+            ("*", True),
+        ],
+    )
+    def test_matches(self, header, expected):
+        assert etag_matches(header, '"1"') is expected
+
+
+class TestItemEtags:
+    """Test conditional GET of single clients and networks"""
+
+    def test_not_modified(self, client, statements):
+        created = client.post("/clients", json={"name": "Polled"}).json()
+        response = client.get(f"/clients/{created['id']}")
+        etag = response.headers["etag"]
+        statements.clear()
+        response = client.get(f"/clients/{created['id']}", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+        # Answered from the entity cache
+        assert statements == []
+
+    def test_update_changes_etag(self, client):
+        created = client.post("/networks", json={"ipv4": "10.0.0.0/8"}).json()
+        etag = client.get(f"/networks/{created['id']}").headers["etag"]
+        client.put(f"/networks/{created['id']}", json={"ipv4": "10.1.0.0/16"})
+        response = client.get(f"/networks/{created['id']}", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.json()["ipv4"] == "10.1.0.0/16"
+        assert response.headers["etag"] != etag
+
+    def test_async(self, async_client):
+        created = async_client.post("/clients", json={"name": "Polled"}).json()
+        etag = async_client.get(f"/clients/{created['id']}").headers["etag"]
+        response = async_client.get(f"/clients/{created['id']}", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+
+
+class TestListEtags:
+    """Test conditional GET of list pages"""
+
+    def test_not_modified_without_reading_rows(self, client, statements):
+        client.post("/clients", json={"name": "Listed"})
+        etag = client.get("/clients/").headers["etag"]
+        statements.clear()
+        response = client.get("/clients/", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert len(statements) == 1
+        assert "table_version" in statements[0]
+
+    @pytest.mark.parametrize("path", ["/clients/", "/networks/"])
+    def test_writes_change_etag(self, client, path):
+        etag = client.get(path).headers["etag"]
+        body = {"name": "New"} if path == "/clients/" else {"ipv4": "10.0.0.0/8"}
+        created = client.post(path, json=body).json()
+        response = client.get(path, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        etag = response.headers["etag"]
+        client.delete(f"{path}{created['id']}")
+        assert client.get(path, headers={"If-None-Match": etag}).status_code == 200
+
+    def test_other_table_keeps_etag(self, client):
+        etag = client.get("/networks/").headers["etag"]
+        client.post("/clients", json={"name": "Elsewhere"})
+        assert client.get("/networks/", headers={"If-None-Match": etag}).status_code == 304
+
+    def test_no_op_write_keeps_etag(self, client):
+        client.post("/clients", json={"name": "Unchanged"})
+        etag = client.get("/clients/").headers["etag"]
+        with TestingSessionLocal() as db:
+            db.execute(text("UPDATE client SET name = name WHERE false"))
+            db.execute(text("DELETE FROM client WHERE false"))
+            db.commit()
+        assert client.get("/clients/", headers={"If-None-Match": etag}).status_code == 304
+
+    def test_concurrent_writers_do_not_wait(self):
+        # Two open transactions on backends in different shards
+        connections = [engine.connect(), engine.connect()]
+        try:
+            while backend_shard(connections[-1]) == backend_shard(connections[0]):
+                connections.append(engine.connect())
+            first, second = connections[0], connections[-1]
+            insert = text("INSERT INTO client (id, name) VALUES (gen_random_uuid(), :name)")
+            first.execute(insert, {"name": "First"})
+            # Fails instead of waiting for the first transaction's counter row
+            second.execute(text("SET LOCAL lock_timeout = '1s'"))
+            second.execute(insert, {"name": "Second"})
+            second.commit()
+            first.commit()
+        finally:
+            for connection in connections:
+                connection.close()
+        with TestingSessionLocal() as db:
+            assert crud.table_version(db, models.Client) == 2
+
+    def test_multi_get(self, client):
+        created = [client.post("/clients", json={"name": f"Client {i}"}).json() for i in range(2)]
+        params = {"ids": ",".join(c["id"] for c in created)}
+        etag = client.get("/clients/", params=params).headers["etag"]
+        headers = {"If-None-Match": etag}
+        assert client.get("/clients/", params=params, headers=headers).status_code == 304
+        client.put(f"/clients/{created[1]['id']}", json={"name": "Renamed"})
+        assert client.get("/clients/", params=params, headers=headers).status_code == 200
+
+    def test_async(self, async_client):
+        async_client.post("/networks", json={"ipv4": "10.0.0.0/8"})
+        etag = async_client.get("/networks/").headers["etag"]
+        assert async_client.get("/networks/", headers={"If-None-Match": etag}).status_code == 304
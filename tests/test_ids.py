@@ -0,0 +1,49 @@
+import time
+from unittest import mock
+
+from copilot_integration_example import ids
+
+
+class TestUUID7:
+    """Test time-ordered id generation"""
+
+    def test_version_and_variant(self):
+        value = ids._uuid7()
+        assert value.version == 7
+        assert value.variant == "specified in RFC 4122"
+
+    def test_timestamp(self):
+        before = time.time_ns() // 1_000_000
+        value = ids._uuid7()
+        after = time.time_ns() // 1_000_000
+        assert before <= value.int >> 80 <= after + 1
+
+    def test_monotonic(self):
+        values = [ids._uuid7() for _ in range(10000)]
+        assert values == sorted(values)
+        assert len(set(values)) == len(values)
+
+    def test_monotonic_when_clock_goes_back(self):
+        first = ids._uuid7()
+        with mock.patch("time.time_ns", return_value=0):
+            second = ids._uuid7()
+        assert second > first
+
+    def test_counter_overflow_advances_timestamp(self):
+        with mock.patch("time.time_ns", return_value=time.time_ns()):
+            values = [ids._uuid7() for _ in range(5000)]
+        assert values == sorted(values)
+        assert values[-1].int >> 80 > values[0].int >> 80
+
+
+class TestClientIds:
+    """Test that new clients get time-ordered ids"""
+
+    def test_created_clients_sort_in_creation_order(self, client):
+        created = [
+            client.post("/clients", json={"name": f"Client {i}"}).json()["id"] for i in range(5)
+        ]
+        bulk = client.post("/clients/bulk", json=[{"name": "Bulk 1"}, {"name": "Bulk 2"}])
+        created += [r["id"] for r in bulk.json()]
+        assert all(client_id[14] == "7" for client_id in created)
+        assert [c["id"] for c in client.get("/clients/").json()] == created
@@ -0,0 +1,123 @@
+import io
+import json
+import threading
+
+from sqlalchemy import text
+
+from copilot_integration_example import load
+from copilot_integration_example.notifications import ENTITY_CHANNEL, NotificationListener
+from tests.conftest import engine
+
+
+def ndjson(*records):
+    return io.StringIO("".join(json.dumps(record) + "\n" for record in records))
+
+
+class TestLoadClients:
+    """Test bulk loading clients"""
+
+    def test_csv(self, client):
+        existing = client.post("/clients", json={"name": "Existing"}).json()
+        file = io.StringIO("id,name\n,Alpha\n,Beta\n,Alpha\n,Existing\n,\n")
+        stats = load.load_file(engine, "clients", file, "csv")
+        assert (stats.read, stats.inserted, stats.skipped, stats.rejected) == (5, 2, 2, 1)
+        names = [c["name"] for c in client.get("/clients/").json()]
+        assert sorted(names) == ["Alpha", "Beta", "Existing"]
+        assert client.get(f"/clients/{existing['id']}").json() == existing
+
+    def test_keeps_ids(self, client):
+        exported = {"id": "0190f7a4-1111-7000-8000-000000000001", "name": "Exported"}
+        file = ndjson(exported, {"id": "not-a-uuid", "name": "Bad"})
+        load.load_file(engine, "clients", file, "ndjson")
+        assert client.get(f"/clients/{exported['id']}").json() == exported
+
+    def test_export_round_trip(self, client):
+        client.post("/clients", json={"name": "One"})
+        client.post("/clients", json={"name": "Two"})
+        exported = client.get("/clients/export", params={"format": "csv"}).text
+        client.delete(f"/clients/{client.get('/clients/').json()[0]['id']}")
+        stats = load.load_file(engine, "clients", io.StringIO(exported), "csv")
+        assert (stats.inserted, stats.skipped) == (1, 1)
+        assert len(client.get("/clients/").json()) == 2
+
+
+class TestLoadNetworks:
+    """Test bulk loading networks"""
+
+    def test_ndjson(self, client):
+        file = ndjson(
+            {"ipv4": "10.0.0.0/8"},
+            {"ipv4": "10.0.0.1/8"},
+            {"ipv4": "10.0.0.0/8"},
+            {"ipv4": None},
+            {"ipv4": "192.168.1.1"},
+        )
+        file = io.StringIO(file.getvalue() + "not json\n")
+        stats = load.load_file(engine, "networks", file, "ndjson")
+        assert (stats.read, stats.inserted, stats.skipped, stats.rejected) == (6, 3, 1, 2)
+        ipv4s = [n["ipv4"] for n in client.get("/networks/").json()]
+        assert ipv4s == ["10.0.0.0/8", None, "192.168.1.1/32"]
+
+    def test_explicit_ids_advance_sequence(self, client):
+        load.load_file(engine, "networks", ndjson({"id": 40, "ipv4": "10.0.0.0/8"}), "ndjson")
+        created = client.post("/networks", json={"ipv4": "10.1.0.0/16"}).json()
+        assert created["id"] > 40
+
+
+class TestLoadLinks:
+    """Test bulk loading client-network links"""
+
+    def test_skips_unknown_and_duplicates(self, client):
+        client_id = client.post("/clients", json={"name": "Linked"}).json()["id"]
+        network_id = client.post("/networks", json={"ipv4": "10.0.0.0/8"}).json()["id"]
+        file = io.StringIO(
+            "client_id,network_id\n"
+            f"{client_id},{network_id}\n"
+            f"{client_id},{network_id}\n"
+            f"{client_id},{network_id + 1}\n"
+            f"0190f7a4-1111-7000-8000-000000000001,{network_id}\n"
+            f"{client_id},x\n"
+        )
+        stats = load.load_file(engine, "links", file, "csv")
+        assert (stats.read, stats.inserted, stats.skipped, stats.rejected) == (5, 1, 3, 1)
+        networks = client.get(f"/clients/{client_id}/networks").json()
+        assert [n["id"] for n in networks] == [network_id]
+
+
+class TestLoadNotifications:
+    """Test that a load publishes one reset instead of a notification per row"""
+
+    def test_single_reset(self):
+        listening = threading.Event()
+        reset = threading.Event()
+        received = []
+
+        def on_reset():
+            if listening.is_set():
+                reset.set()
+            listening.set()
+
+        listener = NotificationListener(engine)
+        listener.subscribe(ENTITY_CHANNEL, received.append, on_reset=on_reset)
+        listener.start()
+        try:
+            assert listening.wait(5)
+            file = ndjson(*({"ipv4": f"10.{i}.0.0/16"} for i in range(50)))
+            load.load_file(engine, "networks", file, "ndjson")
+            assert reset.wait(5)
+        finally:
+            listener.stop()
+        assert received == []
+
+
+class TestLoadCommand:
+    """Test the command line entry point"""
+
+    def test_main(self, tmp_path, monkeypatch, capsys):
+        monkeypatch.setattr("copilot_integration_example.database.engine", engine)
+        path = tmp_path / "clients.csv"
+        path.write_text("name\nAlpha\nBeta\n")
+        assert load.main(["clients", str(path)]) == 0
+        assert "2 rows read, 2 inserted, 0 skipped, 0 rejected" in capsys.readouterr().err
+        with engine.connect() as connection:
+            assert connection.execute(text("SELECT count(*) FROM client")).scalar() == 2
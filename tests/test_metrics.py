@@ -0,0 +1,68 @@
+import re
+
+from sqlalchemy import create_engine, text
+
+from copilot_integration_example.metrics import Histogram, TimedQueuePool, render_metrics
+from tests.conftest import SQLALCHEMY_DATABASE_URL
+
+
+def sample(text, metric, **labels):
+    rendered = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    match = re.search(rf"^{re.escape(metric)}{{{re.escape(rendered)}}} (\S+)$", text, re.MULTILINE)
+    return None if match is None else float(match.group(1))
+
+
+class TestHistogram:
+    """Test histogram bucketing"""
+
+    def test_observe(self):
+        histogram = Histogram(buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 5.0):
+            histogram.observe(value)
+        assert histogram.counts == [2, 1, 1]
+        assert histogram.sum == 5.65
+
+
+class TestMetricsEndpoint:
+    """Test the Prometheus metrics endpoint"""
+
+    def test_route_templates(self, client):
+        client_id = client.post("/clients", json={"name": "Measured"}).json()["id"]
+        before = client.get("/metrics").text
+        client.get(f"/clients/{client_id}")
+        client.get("/clients/not-a-uuid")
+        client.get("/no-such-path")
+        after = client.get("/metrics")
+
+        assert after.headers["content-type"].startswith("text/plain; version=0.0.4")
+        labels = {"method": "GET", "route": "/clients/{client_id}"}
+        for status, increase in (("200", 1), ("404", 1)):
+            previous = sample(before, "http_requests_total", **labels, status=status) or 0
+            current = sample(after.text, "http_requests_total", **labels, status=status)
+            assert current == previous + increase
+        assert client_id not in after.text
+        unmatched = {"method": "GET", "route": "<unmatched>", "status": "404"}
+        assert sample(after.text, "http_requests_total", **unmatched) >= 1
+        count = sample(after.text, "http_request_duration_seconds_count", **labels)
+        inf_bucket = sample(after.text, "http_request_duration_seconds_bucket", **labels, le="+Inf")
+        assert inf_bucket == count
+        assert sample(after.text, "http_requests_in_progress", **labels) == 0
+        assert sample(after.text, "http_requests_in_progress", method="GET", route="/metrics") == 1
+
+    def test_method_not_allowed(self, client):
+        client.patch("/clients/")
+        text = client.get("/metrics").text
+        labels = {"method": "PATCH", "route": "/clients/", "status": "405"}
+        assert sample(text, "http_requests_total", **labels) >= 1
+
+    def test_pool_metrics(self):
+        engine = create_engine(SQLALCHEMY_DATABASE_URL, poolclass=TimedQueuePool, pool_size=2)
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+            rendered = render_metrics({"test": engine.pool})
+            assert sample(rendered, "db_pool_checked_out", pool="test") == 1
+            assert sample(rendered, "db_pool_size", pool="test") == 2
+        rendered = render_metrics({"test": engine.pool})
+        assert sample(rendered, "db_pool_checked_out", pool="test") == 0
+        assert sample(rendered, "db_pool_wait_seconds_count", pool="test") == 1
+        engine.dispose()
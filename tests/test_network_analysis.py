@@ -0,0 +1,129 @@
+import random
+from ipaddress import IPv4Network, collapse_addresses
+
+from copilot_integration_example.network_analysis import (
+    aggregate,
+    find_overlaps,
+    load_prefixes,
+    prefix_text,
+)
+
+
+def prefixes(*networks):
+    rows = []
+    for network_id, ipv4 in enumerate(networks, start=1):
+        network = IPv4Network(ipv4)
+        rows.append((network_id, int(network.network_address), network.prefixlen))
+    return load_prefixes(rows)
+
+
+def random_networks(count, seed):
+    rng = random.Random(seed)
+    networks = set()
+    while len(networks) < count:
+        length = rng.randint(8, 32)
+        networks.add(IPv4Network((rng.getrandbits(32) & ~((1 << (32 - length)) - 1), length)))
+    return sorted(networks)
+
+
+def overlap_pairs(loaded):
+    covered, covering = find_overlaps(loaded)
+    return [(int(loaded.ids[i]), int(loaded.ids[j])) for i, j in zip(covered, covering)]
+
+
+def aggregates(loaded):
+    starts, lengths, counts = aggregate(loaded)
+    return [
+        (prefix_text(start, length), int(count))
+        for start, length, count in zip(starts, lengths, counts)
+    ]
+
+
+class TestOverlaps:
+    """Test finding networks inside wider networks"""
+
+    def test_reports_widest_covering_network(self):
+        loaded = prefixes(
+            "10.1.2.0/24", "10.0.0.0/8", "10.1.0.0/16", "192.168.0.0/16", "10.255.0.0/16"
+        )
+        assert overlap_pairs(loaded) == [(3, 2), (1, 2), (5, 2)]
+
+    def test_disjoint_and_adjacent_networks(self):
+        assert overlap_pairs(prefixes("10.0.0.0/24", "10.0.1.0/24", "10.0.2.0/23")) == []
+        assert overlap_pairs(prefixes()) == []
+
+    def test_matches_pairwise_check(self):
+        networks = random_networks(2000, seed=1) + [IPv4Network("0.0.0.0/1")]
+        loaded = prefixes(*networks)
+        expected = set()
+        for i, network in enumerate(networks, start=1):
+            wider = [
+                j
+                for j, other in enumerate(networks, start=1)
+                if other != network and network.subnet_of(other)
+            ]
+            if wider:
+                expected.add((i, min(wider, key=lambda j: networks[j - 1].prefixlen)))
+        assert set(overlap_pairs(loaded)) == expected
+
+
+class TestAggregate:
+    """Test summarizing networks into the fewest covering prefixes"""
+
+    def test_merges_adjacent_and_nested_networks(self):
+        loaded = prefixes(
+            "10.0.0.0/24", "10.0.1.0/24", "10.0.0.128/25", "10.0.3.0/24", "0.0.0.0/32"
+        )
+        assert aggregates(loaded) == [("0.0.0.0/32", 1), ("10.0.0.0/23", 3), ("10.0.3.0/24", 1)]
+
+    def test_whole_address_space(self):
+        loaded = prefixes("0.0.0.0/1", "128.0.0.0/1", "255.255.255.255/32")
+        assert aggregates(loaded) == [("0.0.0.0/0", 3)]
+
+    def test_matches_collapse_addresses(self):
+        networks = random_networks(2000, seed=2)
+        networks += [IPv4Network("10.0.0.0/9"), IPv4Network("10.128.0.0/9")]
+        result = aggregates(prefixes(*networks))
+        assert [IPv4Network(ipv4) for ipv4, _ in result] == list(collapse_addresses(networks))
+        assert sum(count for _, count in result) == len(networks)
+
+
+class TestAnalyticsEndpoints:
+    """Test GET /networks/overlaps and /networks/aggregate"""
+
+    def create(self, client, *networks):
+        return [client.post("/networks", json={"ipv4": ipv4}).json()["id"] for ipv4 in networks]
+
+    def test_overlaps(self, client):
+        wide, inner, _, _ = self.create(client, "10.0.0.0/8", "10.1.0.0/16", "192.168.0.0/24", None)
+        response = client.get("/networks/overlaps")
+        assert response.status_code == 200
+        assert response.json() == {
+            "items": [
+                {
+                    "network": {"id": inner, "ipv4": "10.1.0.0/16"},
+                    "covered_by": {"id": wide, "ipv4": "10.0.0.0/8"},
+                }
+            ],
+            "total": 1,
+        }
+
+    def test_overlaps_paged(self, client):
+        self.create(client, "10.0.0.0/8", "10.1.0.0/16", "10.2.0.0/16", "10.3.0.0/16")
+        page = client.get("/networks/overlaps", params={"skip": 1, "limit": 1}).json()
+        assert page["total"] == 3
+        assert [item["network"]["ipv4"] for item in page["items"]] == ["10.2.0.0/16"]
+
+    def test_aggregate(self, client):
+        self.create(client, "10.0.0.0/24", "10.0.1.0/24", "10.0.1.0/25", "192.168.0.0/24", None)
+        assert client.get("/networks/aggregate").json() == [
+            {"ipv4": "10.0.0.0/23", "networks": 3},
+            {"ipv4": "192.168.0.0/24", "networks": 1},
+        ]
+        assert client.get("/networks/aggregate", params={"min_networks": 2}).json() == [
+            {"ipv4": "10.0.0.0/23", "networks": 3}
+        ]
+
+    def test_empty(self, client):
+        assert client.get("/networks/overlaps").json() == {"items": [], "total": 0}
+        assert client.get("/networks/aggregate").json() == []
@@ -0,0 +1,43 @@
+from ipaddress import IPv4Address
+
+from copilot_integration_example.prefix_index import PrefixIndex
+
+
+def loaded(*networks):
+    index = PrefixIndex()
+    index.ensure_loaded(lambda: list(enumerate(networks, start=1)))
+    return index
+
+
+class TestPrefixIndex:
+    """Test the in-memory longest-prefix match"""
+
+    def test_not_loaded(self):
+        index = PrefixIndex()
+        index.add(1, "10.0.0.0/8")
+        assert not index.loaded
+        assert index.lookup(IPv4Address("10.0.0.1")) is None
+
+    def test_longest_prefix_wins(self):
+        index = loaded("0.0.0.0/0", "10.0.0.0/8", "10.1.0.0/16", "10.1.2.3/32")
+        assert index.lookup(IPv4Address("10.1.2.3")) == (4, "10.1.2.3/32")
+        assert index.lookup(IPv4Address("10.1.2.4")) == (3, "10.1.0.0/16")
+        assert index.lookup(IPv4Address("10.2.0.0")) == (2, "10.0.0.0/8")
+        assert index.lookup(IPv4Address("192.168.0.1")) == (1, "0.0.0.0/0")
+
+    def test_add_replaces_and_discard_removes(self):
+        index = loaded("10.0.0.0/8")
+        index.add(1, "192.168.0.0/16")
+        assert index.lookup(IPv4Address("10.0.0.1")) is None
+        assert index.lookup(IPv4Address("192.168.1.1")) == (1, "192.168.0.0/16")
+        index.add(2, None)
+        index.discard(1)
+        assert index.lookup(IPv4Address("192.168.1.1")) is None
+        assert len(index) == 0
+
+    def test_clear(self):
+        index = loaded("10.0.0.0/8")
+        index.clear()
+        assert not index.loaded
+        index.ensure_loaded(lambda: [(5, "10.0.0.0/8")])
+        assert index.lookup(IPv4Address("10.0.0.1")) == (5, "10.0.0.0/8")